@@ -1,11 +1,15 @@
 from dotenv import load_dotenv
 load_dotenv()
 from fastapi import APIRouter, HTTPException, Query
-from app.services.ai_service import get_company_diagnosis_service, get_forecast_analysis_service
+from app.services.ai_service import get_company_diagnosis_service, get_forecast_analysis_service, stream_company_diagnosis_service, stream_forecast_analysis_service
+from app.core.sse import sse_response
+from app.core.profiling import ProfiledAPIRoute
+from app.core.coalescing import coalesced
 
-router = APIRouter(prefix="/ai")
+router = APIRouter(prefix="/ai", route_class=ProfiledAPIRoute)
 
 @router.get("/diagnosis/{company_id}")
+@coalesced
 def get_company_diagnosis(company_id: str):
     try:
         diagnosis = get_company_diagnosis_service(company_id)
@@ -16,6 +20,7 @@ def get_company_diagnosis(company_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/forecast/{company_id}")
+@coalesced
 def get_forecast_analysis(company_id: str, n_months: int = Query(6, ge=1, le=24, description="Número de meses para prever (3 a 24)")):
     try:
         analysis = get_forecast_analysis_service(company_id, n_months)
@@ -24,3 +29,27 @@ def get_forecast_analysis(company_id: str, n_months: int = Query(6, ge=1, le=24,
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/diagnosis/{company_id}/stream")
+def stream_company_diagnosis(company_id: str):
+    """
+    Diagnóstico em streaming (Server-Sent Events)
+    """
+    try:
+        return sse_response(stream_company_diagnosis_service(company_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/forecast/{company_id}/stream")
+def stream_forecast_analysis(company_id: str, n_months: int = Query(6, ge=1, le=24, description="Número de meses para prever (3 a 24)")):
+    """
+    Análise de previsão em streaming (Server-Sent Events)
+    """
+    try:
+        return sse_response(stream_forecast_analysis_service(company_id, n_months))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,30 @@
-from fastapi import APIRouter, HTTPException
-from app.services.companies_service import get_company_ids_service, get_company_details_service
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel
+from app.services.companies_service import get_company_ids_service, get_company_details_service, get_company_details_batch_service, search_companies_service, get_similar_companies_service, get_company_anomalies_service, get_latest_anomalies_service
 from app.services.data_store import data_store
+from app.services.time_index import check_window
+from app.core.profiling import ProfiledAPIRoute
+from app.core.encoding import encoded_response
 
 
-router = APIRouter(prefix="/companies")
+router = APIRouter(prefix="/companies", route_class=ProfiledAPIRoute)
+
+MAX_BATCH_SIZE = 1000
+
+
+class CompanyDetailsBatchRequest(BaseModel):
+    company_ids: List[str]
 
 
 @router.get("/")
-def get_companies():
+def get_companies(request: Request):
     try:
         companies_df = data_store.companies_df
-        return companies_df.to_dict(orient="records")
+        return encoded_response(request, companies_df, tabular=True)
+    except HTTPException:
+        raise
     except (FileNotFoundError, ValueError) as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -23,10 +37,64 @@ def get_company_ids():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/search")
+def search_companies(
+    sector: Optional[str] = Query(None, description="Setor/CNAE"),
+    moment: Optional[str] = Query(None, description="Momento da empresa (Início, Crescimento, Maturidade, Declínio)"),
+    sort_by: str = Query("revenue", description="revenue, margin, growth, volatility ou age"),
+    order: str = Query("desc"),
+    min_age: Optional[float] = None,
+    max_age: Optional[float] = None,
+    min_revenue: Optional[float] = None,
+    max_revenue: Optional[float] = None,
+    min_margin: Optional[float] = None,
+    max_margin: Optional[float] = None,
+    min_growth: Optional[float] = None,
+    max_growth: Optional[float] = None,
+    min_volatility: Optional[float] = None,
+    max_volatility: Optional[float] = None,
+    limit: int = Query(20, ge=1, le=500),
+    offset: int = Query(0, ge=0)
+):
+    try:
+        ranges = {
+            "age": (min_age, max_age),
+            "revenue": (min_revenue, max_revenue),
+            "margin": (min_margin, max_margin),
+            "growth": (min_growth, max_growth),
+            "volatility": (min_volatility, max_volatility)
+        }
+        return search_companies_service(sort_by, order, sector, moment, ranges, limit, offset)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/anomalies")
+def get_latest_anomalies(
+    months: int = Query(1, ge=1, le=24, description="Últimos meses do snapshot incluídos no feed"),
+    metric: Optional[str] = Query(None, description="receita, despesa ou fluxo_liq"),
+    sector: Optional[str] = Query(None, description="Setor/CNAE"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    try:
+        return get_latest_anomalies_service(months, metric, sector, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{company_id}/details")
-def get_company_details(company_id: str):
+def get_company_details(
+    company_id: str,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to")
+):
     try:
-        result = get_company_details_service(company_id)
+        check_window(date_from, date_to)
+        result = get_company_details_service(company_id, date_from, date_to)
         if result is None:
             raise HTTPException(status_code=404, detail="Company not found")
         return result
@@ -35,3 +103,49 @@ def get_company_details(company_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/{company_id}/similar")
+def get_similar_companies(
+    company_id: str,
+    k: int = Query(10, ge=1, le=100),
+    sector: Optional[str] = Query(None, description="Restringe os vizinhos a um setor/CNAE")
+):
+    try:
+        return get_similar_companies_service(company_id, k, sector)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{company_id}/anomalies")
+def get_company_anomalies(
+    company_id: str,
+    metric: Optional[str] = Query(None, description="receita, despesa ou fluxo_liq")
+):
+    try:
+        return get_company_anomalies_service(company_id, metric)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/details:batch")
+def get_company_details_batch(
+    request: Request,
+    body: CompanyDetailsBatchRequest,
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula (ex.: kpis,benchmarking)"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to")
+):
+    if len(body.company_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"O lote aceita no máximo {MAX_BATCH_SIZE} empresas.")
+    try:
+        check_window(date_from, date_to)
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        return encoded_response(request, get_company_details_batch_service(body.company_ids, selected_fields, date_from, date_to))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
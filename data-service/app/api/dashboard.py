@@ -1,10 +1,44 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from starlette.concurrency import run_in_threadpool
 
-from fastapi import APIRouter, Query
+from app.services.dashboard_service import get_dashboard_data, SCATTER_GRID_SIZE, SCATTER_MAX_POINTS
+from app.services.time_index import check_window
+from app.core.profiling import ProfiledAPIRoute
+from app.core.coalescing import coalesced
+from app.core.encoding import encoded_response
 
-from app.services.dashboard_service import get_dashboard_data
-
-router = APIRouter()
+router = APIRouter(route_class=ProfiledAPIRoute)
 
 @router.get("/dashboard")
-def get_dashboard(cnae: str = Query(default="Todos os Setores", description="Setor/CNAE para filtrar os dados")):
-    return get_dashboard_data(cnae)
+async def get_dashboard(
+    request: Request,
+    cnae: str = Query(default="Todos os Setores", description="Setor/CNAE para filtrar os dados"),
+    date_from: Optional[date] = Query(None, alias="from", description="Data inicial (inclusive) da janela de análise"),
+    date_to: Optional[date] = Query(None, alias="to", description="Data final (inclusive) da janela de análise"),
+    scatter: str = Query("points", description="points (uma entrada por empresa) ou lod (grade agregada / pontos no viewport)"),
+    revenue_min: Optional[float] = Query(None, description="Viewport do gráfico receita x despesa (modo lod)"),
+    revenue_max: Optional[float] = None,
+    expense_min: Optional[float] = None,
+    expense_max: Optional[float] = None,
+    grid_size: int = Query(SCATTER_GRID_SIZE, ge=4, le=256),
+    max_points: int = Query(SCATTER_MAX_POINTS, ge=1, le=20000)
+):
+    check_window(date_from, date_to)
+    bounds = (revenue_min, revenue_max, expense_min, expense_max)
+    viewport = None
+    if any(bound is not None for bound in bounds):
+        if any(bound is None for bound in bounds):
+            raise HTTPException(status_code=400, detail="Viewport requer revenue_min, revenue_max, expense_min e expense_max.")
+        if revenue_min > revenue_max or expense_min > expense_max:
+            raise HTTPException(status_code=400, detail="Viewport inválido: mínimo maior que máximo.")
+        viewport = bounds
+    data = await _dashboard_data(cnae, date_from, date_to, scatter, viewport, grid_size, max_points)
+    return await run_in_threadpool(encoded_response, request, data)
+
+
+@coalesced
+def _dashboard_data(cnae: str, date_from: Optional[date], date_to: Optional[date], scatter: str,
+                    viewport: Optional[tuple], grid_size: int, max_points: int):
+    return get_dashboard_data(cnae, date_from, date_to, scatter, viewport, grid_size, max_points)
@@ -1,15 +1,23 @@
+from datetime import date
+from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 from app.services.forecast_service import get_cashflow_forecast
+from app.services.time_index import check_window
+from app.core.profiling import ProfiledAPIRoute
 
-router = APIRouter(prefix="/forecast")
+router = APIRouter(prefix="/forecast", route_class=ProfiledAPIRoute)
 
 @router.get("/{company_id}")
 def get_forecast(
     company_id: str,
-    n_months: int = Query(6, ge=1, le=24)
+    n_months: int = Query(6, ge=1, le=24),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    model: str = Query("linear", description="Modelo de previsão: linear, holt_winters ou seasonal_naive")
 ):
     try:
-        result = get_cashflow_forecast(company_id, n_months)
+        check_window(date_from, date_to)
+        result = get_cashflow_forecast(company_id, n_months, date_from, date_to, model)
         return result
     except HTTPException:
         raise
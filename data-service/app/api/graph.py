@@ -1,7 +1,24 @@
+from typing import List
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from app.core.config import CONTAGION_MAX_ROUNDS, ECOSYSTEM_EDGE_SOURCE
 from app.services.graph_service import graph_service
+from app.services.graph_export_service import export_graph
+from app.services.ecosystem_analytics import compute_ecosystem_analytics
+from app.services.contagion_service import simulate_contagion
+from app.core.profiling import ProfiledAPIRoute
+
+router = APIRouter(prefix="/graph", route_class=ProfiledAPIRoute)
+
+
+class ContagionRequest(BaseModel):
+    company_ids: List[str]
+    shock: float = Field(1.0, gt=0, le=1, description="Fração da perda das empresas que quebram (1 = quebra total)")
+    max_rounds: int = Field(CONTAGION_MAX_ROUNDS, ge=1, le=100)
+    top_n: int = Field(20, ge=1, le=500)
+    source: str = Field(ECOSYSTEM_EDGE_SOURCE, description="datastore ou neo4j")
 
-router = APIRouter(prefix="/graph")
 
 @router.get("/nodes")
 def get_nodes():
@@ -37,3 +54,51 @@ def get_clusters(limit: int = Query(500, ge=1, le=2000)):
         return {"edges": graph_service.get_clusters(limit)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ecosystem")
+def get_ecosystem_analytics(
+    source: str = Query("datastore", description="datastore ou neo4j"),
+    top_n: int = Query(10, ge=1, le=100),
+    pagerank_budget: float = Query(10.0, gt=0, le=120, description="Orçamento de tempo do PageRank (s)"),
+    communities_budget: float = Query(10.0, gt=0, le=120, description="Orçamento de tempo da detecção de comunidades (s)")
+):
+    """
+    Métricas do ecossistema sobre o grafo completo, com o tempo de cada etapa
+    """
+    try:
+        return compute_ecosystem_analytics(source, top_n=top_n, pagerank_budget=pagerank_budget, communities_budget=communities_budget)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/export")
+def export_edges(
+    export_format: str = Query("csv", alias="format", description="csv, graphml, arrow ou parquet"),
+    source: str = Query("neo4j", description="neo4j ou datastore")
+):
+    """
+    Exporta todas as arestas do grafo em streaming, bloco a bloco
+    """
+    try:
+        content, media_type, filename = export_graph(export_format, source)
+        return StreamingResponse(content, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/contagion")
+def simulate_company_failure(body: ContagionRequest):
+    """
+    Simula a quebra de uma ou mais empresas e a propagação das perdas (DebtRank)
+    pelo grafo completo de pagamentos
+    """
+    if len(body.company_ids) == 0:
+        raise HTTPException(status_code=400, detail="Informe ao menos uma empresa.")
+    try:
+        return simulate_contagion(body.company_ids, body.shock, body.max_rounds, body.top_n, body.source)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,15 @@
+from typing import Optional
 from fastapi import APIRouter, HTTPException
-from app.services.graph_ai_service import generate_ecosystem_summary, generate_company_network_analysis
+from app.services.graph_ai_service import generate_ecosystem_summary, generate_company_network_analysis, stream_ecosystem_summary, stream_company_network_analysis
+from app.core.sse import sse_response
+from app.core.profiling import ProfiledAPIRoute
+from app.core.coalescing import coalesced
 
-router = APIRouter(prefix="/graph-ai")
+router = APIRouter(prefix="/graph-ai", route_class=ProfiledAPIRoute)
 
 @router.get("/ecosystem-summary")
-def get_ecosystem_summary(limit: int = 200, threshold: float = 0.7):
+@coalesced
+def get_ecosystem_summary(limit: Optional[int] = None, threshold: float = 0.7):
     """
     Gera um resumo executivo do ecossistema completo
     """
@@ -17,6 +22,7 @@ def get_ecosystem_summary(limit: int = 200, threshold: float = 0.7):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/company-analysis/{company_id}")
+@coalesced
 def get_company_analysis(company_id: str):
     """
     Gera uma análise de cadeia de valor para uma empresa específica
@@ -27,4 +33,28 @@ def get_company_analysis(company_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ecosystem-summary/stream")
+def stream_ecosystem_summary_endpoint(limit: Optional[int] = None, threshold: float = 0.7):
+    """
+    Resumo do ecossistema em streaming (Server-Sent Events)
+    """
+    try:
+        return sse_response(stream_ecosystem_summary(limit, threshold))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/company-analysis/{company_id}/stream")
+def stream_company_analysis(company_id: str):
+    """
+    Análise de cadeia de valor em streaming (Server-Sent Events)
+    """
+    try:
+        return sse_response(stream_company_network_analysis(company_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
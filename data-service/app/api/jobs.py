@@ -0,0 +1,60 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from app.core.job_queue import job_queue, JOB_HANDLERS, JOB_STATUSES
+from app.services.ai_jobs import get_job_results
+from app.core.profiling import ProfiledAPIRoute
+
+router = APIRouter(prefix="/jobs", route_class=ProfiledAPIRoute)
+
+
+class JobRequest(BaseModel):
+    type: str = Field(description="diagnose_sector, diagnose_companies ou precompute_diagnoses")
+    params: dict = Field(default_factory=dict)
+
+
+@router.post("", status_code=202)
+def submit_job(body: JobRequest):
+    if body.type not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Tipo de job '{body.type}' inválido. Opções: {', '.join(sorted(JOB_HANDLERS))}.")
+    if body.type == "diagnose_sector" and not body.params.get("sector"):
+        raise HTTPException(status_code=400, detail="O job diagnose_sector requer o parâmetro 'sector'.")
+    if body.type == "diagnose_companies" and not body.params.get("company_ids"):
+        raise HTTPException(status_code=400, detail="O job diagnose_companies requer o parâmetro 'company_ids'.")
+    try:
+        return job_queue.submit(body.type, body.params)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("")
+def list_jobs(status: Optional[str] = Query(None), limit: int = Query(50, ge=1, le=500)):
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status '{status}' inválido. Opções: {', '.join(JOB_STATUSES)}.")
+    try:
+        return {"jobs": job_queue.list(status, limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: int):
+    job = job_queue.get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if job["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job ainda em execução (status: {job['status']}).")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    try:
+        return get_job_results(job)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
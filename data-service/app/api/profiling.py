@@ -0,0 +1,18 @@
+import os
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+from app.core.profiling import is_admin, profile_path
+
+router = APIRouter(prefix="/profiles")
+
+@router.get("/{request_id}")
+def get_profile(request_id: str, request: Request):
+    """
+    Retorna o perfil speedscope salvo para uma requisição (restrito a administradores)
+    """
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores.")
+    path = profile_path(os.path.basename(request_id))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Perfil não encontrado.")
+    return FileResponse(path, media_type="application/json")
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from app.services.data_store import data_store
+from app.services.sectors_service import get_sector_benchmarks_service
+from app.core.profiling import ProfiledAPIRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledAPIRoute)
 
 @router.get("/sectors/")
 def get_sectors():
@@ -10,3 +12,12 @@ def get_sectors():
         return sectors_df.to_dict(orient="records")
     except (FileNotFoundError, ValueError) as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/sectors/{cnae:path}/benchmarks")
+def get_sector_benchmarks(cnae: str):
+    try:
+        return get_sector_benchmarks_service(cnae)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
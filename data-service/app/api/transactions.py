@@ -1,12 +1,70 @@
-from fastapi import APIRouter, HTTPException
+from datetime import date, datetime
+from typing import List, Optional
+import pandas
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
 from app.services.data_store import data_store
+from app.services.transactions_service import append_transactions_service, read_transactions_file
+from app.services.time_index import check_window
+from app.core.profiling import ProfiledAPIRoute
+from app.core.encoding import encoded_response
+
+router = APIRouter(route_class=ProfiledAPIRoute)
+
+
+class TransactionRecord(BaseModel):
+    id_pgto: str
+    id_rcbe: str
+    vl: float
+    dt_refe: datetime
+    ds_tran: str
+
+
+class TransactionsAppendRequest(BaseModel):
+    transactions: List[TransactionRecord]
 
-router = APIRouter()
 
 @router.get("/transactions/")
-def get_transactions():
+def get_transactions(
+    request: Request,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to")
+):
+    check_window(date_from, date_to)
     try:
-        transactions_df = data_store.transactions_df
-        return transactions_df.to_dict(orient="records")
+        transactions_df = data_store.transactions_between(date_from, date_to)
+        return encoded_response(request, transactions_df, tabular=True)
+    except HTTPException:
+        raise
     except (FileNotFoundError, ValueError) as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/transactions:append")
+def append_transactions(body: TransactionsAppendRequest):
+    try:
+        transactions_df = pandas.DataFrame([record.model_dump() for record in body.transactions], columns=list(TransactionRecord.model_fields))
+        return append_transactions_service(transactions_df)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/transactions:append-file")
+async def append_transactions_file(request: Request):
+    """
+    Mesmo que /transactions:append, com o corpo sendo um arquivo CSV (text/csv)
+    ou Parquet (application/vnd.apache.parquet).
+    """
+    content = await request.body()
+    try:
+        transactions_df = await run_in_threadpool(read_transactions_file, content, request.headers.get("content-type"))
+        return await run_in_threadpool(append_transactions_service, transactions_df)
+    except HTTPException:
+        raise
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Arquivo inválido: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
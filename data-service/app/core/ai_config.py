@@ -1,13 +1,34 @@
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
+from app.core.startup_profile import lazy_module
 
 class AIConfig:
     def __init__(self):
-        load_dotenv()
-        self.api_key = os.getenv('API_KEY')
-        if not self.api_key:
-            raise RuntimeError("API Key Not found. Please set the API_KEY environment variable.")
-        self.client = OpenAI(api_key=self.api_key)
+        self.api_key = None
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            load_dotenv()
+            if os.getenv('LLM_PROVIDER', 'openai') == 'fake':
+                from app.core.fake_llm import FakeLLMClient
+                self._client = FakeLLMClient(
+                    first_token_latency=float(os.getenv('FAKE_LLM_FIRST_TOKEN_LATENCY', '0')),
+                    token_latency=float(os.getenv('FAKE_LLM_TOKEN_LATENCY', '0'))
+                )
+                return self._client
+            self.api_key = os.getenv('API_KEY')
+            if not self.api_key:
+                raise RuntimeError("API Key Not found. Please set the API_KEY environment variable.")
+            openai = lazy_module("openai")
+            self._client = openai.OpenAI(api_key=self.api_key)
+        return self._client
+
+    def set_client(self, client):
+        """
+        Substitui o cliente OpenAI (ex.: por um cliente local falso em testes).
+        """
+        self._client = client
 
 ai_config = AIConfig()
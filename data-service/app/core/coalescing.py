@@ -0,0 +1,77 @@
+import asyncio
+from functools import wraps
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+
+def _shared_error(error: BaseException):
+    """
+    Exceção nova para quem aguardou a execução de outra requisição, encadeada à
+    original (`__cause__`). HTTPException mantém status, detalhe e cabeçalhos.
+    """
+    if isinstance(error, HTTPException):
+        return HTTPException(status_code=error.status_code, detail=error.detail, headers=error.headers)
+    return RuntimeError(f"Execução compartilhada falhou: {error!r}")
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave: a primeira executa a função no
+    threadpool e as demais aguardam um asyncio.Future no event loop, sem ocupar
+    threads do pool, e recebem o mesmo resultado. Nada é guardado depois que a
+    chamada termina; não é um cache.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key, function):
+        # Sem await entre a consulta e o registro: atômico no event loop
+        call = self._calls.get(key)
+        leader = call is None
+        if leader:
+            call = asyncio.ensure_future(run_in_threadpool(function))
+            self._calls[key] = call
+            call.add_done_callback(lambda finished: self._finish(key, finished))
+            self.executions += 1
+        else:
+            self.shared += 1
+
+        try:
+            # shield: se o cliente da primeira requisição desconectar, as demais ainda recebem o resultado
+            return await asyncio.shield(call)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            if leader:
+                raise
+            raise _shared_error(error) from error
+
+    def _finish(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # Marca a exceção como consumida mesmo que ninguém mais aguarde
+            call.exception()
+
+    def stats(self):
+        return {"executions": self.executions, "shared": self.shared, "in_flight": len(self._calls)}
+
+
+request_coalescer = SingleFlight()
+
+
+def coalesced(endpoint):
+    """
+    Decorador para funções síncronas chamadas por endpoints: requisições
+    simultâneas à mesma rota com os mesmos parâmetros compartilham uma única
+    execução. A função decorada passa a ser assíncrona (use `await`).
+    """
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        key = (endpoint.__module__, endpoint.__qualname__, args, tuple(sorted(kwargs.items())))
+        return await request_coalescer.do(key, lambda: endpoint(*args, **kwargs))
+    return wrapper
@@ -0,0 +1,154 @@
+import zlib
+
+from app.core.config import COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY, COMPRESSION_ZSTD_LEVEL
+
+# Tipos que não se beneficiam de compressão ou que precisam chegar ao cliente sem buffer
+UNCOMPRESSED_MEDIA_TYPES = ("text/event-stream", "application/vnd.apache.parquet", "application/zip", "application/gzip", "image/")
+
+
+def _available_encodings():
+    # Ordem de preferência do servidor em caso de empate no q do cliente
+    encodings = []
+    try:
+        import zstandard  # noqa: F401
+        encodings.append("zstd")
+    except ImportError:
+        pass
+    try:
+        import brotli  # noqa: F401
+        encodings.append("br")
+    except ImportError:
+        pass
+    encodings.append("gzip")
+    return encodings
+
+
+AVAILABLE_ENCODINGS = _available_encodings()
+
+
+def negotiate_encoding(accept_encoding: str):
+    """
+    Escolhe a codificação pelo header Accept-Encoding (com pesos q), usando a
+    ordem de AVAILABLE_ENCODINGS para desempatar. Retorna None se nenhuma servir.
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        weight = 1.0
+        for parameter in parts[1:]:
+            if parameter.startswith("q="):
+                try:
+                    weight = float(parameter[2:])
+                except ValueError:
+                    weight = 0.0
+        weights[parts[0].lower()] = weight
+    candidates = [(weights.get(encoding, weights.get("*", 0.0)), -position, encoding)
+                  for position, encoding in enumerate(AVAILABLE_ENCODINGS)]
+    weight, _, encoding = max(candidates)
+    return encoding if weight > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            import zstandard
+            self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            import brotli
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool):
+        """
+        Comprime um bloco. Blocos intermediários são descarregados (flush) para que
+        respostas em streaming continuem chegando ao cliente aos poucos.
+        """
+        if self.encoding == "br":
+            output = self._compressor.process(data)
+            return output + (self._compressor.finish() if final else self._compressor.flush())
+        output = self._compressor.compress(data)
+        if final:
+            return output + self._compressor.flush()
+        if self.encoding == "zstd":
+            return output + self._compressor.flush(self._flush_block)
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respostas com gzip, br ou zstd conforme o
+    Accept-Encoding. Respostas de um único bloco só são comprimidas a partir de
+    `minimum_size` bytes; respostas em streaming são comprimidas bloco a bloco.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+
+class _CompressingSend:
+    def __init__(self, send, encoding, minimum_size):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = start_message.get("headers", [])
+            if not self._compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(start_message)
+            else:
+                self.compressor = _Compressor(self.encoding)
+                headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+                headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+                headers.append((b"vary", b"Accept-Encoding"))
+                body = self.compressor.compress(body, final=not more_body)
+                if not more_body:
+                    headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                await self.send({**start_message, "headers": headers})
+                await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+        await self.send({"type": "http.response.body", "body": self.compressor.compress(body, final=not more_body), "more_body": more_body})
+
+    def _compressible(self, headers):
+        for name, value in headers:
+            name = name.lower()
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type" and value.decode("latin-1").lower().startswith(UNCOMPRESSED_MEDIA_TYPES):
+                return False
+        return True
@@ -11,4 +11,85 @@ EXCEL_FILE_PATH = os.path.join(BASE_DIR, "data", "Challenge FIAP - Bases.xlsx")
 # Configurações do Neo4j
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
-NEO4J_PASS = os.getenv("NEO4J_PASS", "password")
\ No newline at end of file
+NEO4J_PASS = os.getenv("NEO4J_PASS", "password")
+# "neo4j" ou "memory" (grafo em memória a partir do DataStore, sem Neo4j)
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+
+# Carga da planilha
+EXCEL_LOADER_CHUNK_SIZE = int(os.getenv("EXCEL_LOADER_CHUNK_SIZE", "50000"))
+
+# Profiling por requisição (desativado por padrão)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "1"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", os.path.join(BASE_DIR, "profiles"))
+
+# Exportação do grafo
+GRAPH_EXPORT_CHUNK_SIZE = int(os.getenv("GRAPH_EXPORT_CHUNK_SIZE", "10000"))
+
+# Análise do ecossistema (grafo completo)
+ECOSYSTEM_EDGE_SOURCE = os.getenv("ECOSYSTEM_EDGE_SOURCE", "datastore")
+ECOSYSTEM_PAGERANK_BUDGET_SECONDS = float(os.getenv("ECOSYSTEM_PAGERANK_BUDGET_SECONDS", "10"))
+ECOSYSTEM_COMMUNITIES_BUDGET_SECONDS = float(os.getenv("ECOSYSTEM_COMMUNITIES_BUDGET_SECONDS", "10"))
+
+# Gateway de chamadas ao LLM
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "2"))
+LLM_BURST = int(os.getenv("LLM_BURST", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# Threads do threadpool que roda os endpoints síncronos (padrão do AnyIO: 40) e a
+# fração dele que chamadas ao LLM (em andamento + na fila) podem ocupar. A espera é
+# síncrona, então LLM_MAX_QUEUE fica limitada por essa fração (6 com os padrões), não
+# pela taxa do provedor: rajadas acima disso recebem 429 antes do limite do provedor
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+LLM_MAX_POOL_SHARE = float(os.getenv("LLM_MAX_POOL_SHARE", "0.25"))
+
+# Fonte dos dados: "excel" (planilha única), "csv" ou "parquet" (um arquivo por base)
+DATA_SOURCE_FORMAT = os.getenv("DATA_SOURCE_FORMAT", "excel")
+COMPANIES_SOURCE_PATH = os.getenv("COMPANIES_SOURCE_PATH", os.path.join(BASE_DIR, "data", "empresas.csv"))
+TRANSACTIONS_SOURCE_PATH = os.getenv("TRANSACTIONS_SOURCE_PATH", os.path.join(BASE_DIR, "data", "transacoes.csv"))
+SOURCE_CHUNK_SIZE = int(os.getenv("SOURCE_CHUNK_SIZE", "500000"))
+CSV_SEPARATOR = os.getenv("CSV_SEPARATOR", ",")
+
+# Backend analítico das transações: "pandas" (tudo em memória) ou "duckdb"
+# (consultas sobre os arquivos CSV/Parquet de TRANSACTIONS_SOURCE_PATH, com RAM limitada)
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", "pandas")
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "2GB")
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", "4"))
+DUCKDB_TEMP_DIRECTORY = os.getenv("DUCKDB_TEMP_DIRECTORY", os.path.join(BASE_DIR, "data", "duckdb_tmp"))
+
+# Compressão das respostas (negociada por Accept-Encoding; br e zstd dependem dos pacotes brotli e zstandard)
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+
+# Simulação de contágio (DebtRank) sobre o grafo de pagamentos
+CONTAGION_MAX_ROUNDS = int(os.getenv("CONTAGION_MAX_ROUNDS", "20"))
+
+# Fila local de jobs (SQLite, sem broker externo)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(BASE_DIR, "data", "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "900"))
+# Pré-cálculo dos diagnósticos de IA após cada carga dos dados (maiores empresas por receita).
+# Opt-in: cada diagnóstico é uma chamada paga ao provedor de LLM
+AI_PRECOMPUTE_ON_RELOAD = os.getenv("AI_PRECOMPUTE_ON_RELOAD", "false").lower() == "true"
+AI_PRECOMPUTE_LIMIT = int(os.getenv("AI_PRECOMPUTE_LIMIT", "200"))
+# Tentativas extras de um diagnóstico dentro de um job quando o gateway responde 429
+AI_JOB_MAX_RETRIES = int(os.getenv("AI_JOB_MAX_RETRIES", "8"))
+
+# Tracing por requisição: spans em JSON no log ("log"), em arquivo JSONL ("file") ou desligado ("none").
+# Opt-in: exportar uma linha por span tem custo em cada requisição
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACING_OUTPUT_PATH = os.getenv("TRACING_OUTPUT_PATH", os.path.join(BASE_DIR, "traces", "spans.jsonl"))
+
+# Detecção de anomalias no fluxo mensal: janela móvel de meses anteriores, histórico mínimo e limiar do z robusto
+ANOMALY_WINDOW_MONTHS = int(os.getenv("ANOMALY_WINDOW_MONTHS", "6"))
+ANOMALY_MIN_HISTORY = int(os.getenv("ANOMALY_MIN_HISTORY", "4"))
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "3.5"))
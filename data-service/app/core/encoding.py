@@ -0,0 +1,98 @@
+import datetime
+
+import numpy
+import pandas
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+JSON_MEDIA_TYPES = ("application/json", "application/*", "*/*")
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# O formato depende do Accept: caches precisam guardar uma variante por Accept
+VARY_HEADERS = {"Vary": "Accept"}
+
+
+def _is_available(module_name):
+    try:
+        __import__(module_name)
+        return True
+    except ImportError:
+        return False
+
+
+def _accepted_media_types(accept: str):
+    weighted = []
+    for position, item in enumerate((accept or "").split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        weight = 1.0
+        for parameter in parts[1:]:
+            if parameter.startswith("q="):
+                try:
+                    weight = float(parameter[2:])
+                except ValueError:
+                    weight = 0.0
+        if weight > 0:
+            weighted.append((-weight, position, parts[0].lower()))
+    return [media_type for _, _, media_type in sorted(weighted)]
+
+
+def negotiate_media_type(accept: str, tabular: bool):
+    """
+    Formato da resposta pelo header Accept: "json", "msgpack" ou "arrow" (este só
+    para respostas em formato de tabela). Sem Accept, ou sem nenhum formato
+    suportado (ou com o pacote necessário instalado), responde JSON.
+    """
+    media_types = _accepted_media_types(accept)
+    if not media_types:
+        return "json"
+    for media_type in media_types:
+        if media_type in JSON_MEDIA_TYPES:
+            return "json"
+        if media_type in MSGPACK_MEDIA_TYPES and _is_available("msgpack"):
+            return "msgpack"
+        if media_type == ARROW_MEDIA_TYPE and tabular and _is_available("pyarrow"):
+            return "arrow"
+    return "json"
+
+
+def _msgpack_default(value):
+    if value is pandas.NaT:
+        return None
+    if isinstance(value, (pandas.Timestamp, datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, numpy.generic):
+        return value.item()
+    if isinstance(value, numpy.ndarray):
+        return value.tolist()
+    raise TypeError(f"Tipo não serializável em MessagePack: {type(value).__name__}")
+
+
+def encoded_response(request: Request, payload, tabular: bool = False):
+    """
+    Devolve `payload` no formato pedido pelo Accept (JSON, MessagePack ou Arrow
+    IPC), sempre com `Vary: Accept`. DataFrames são enviados como lista de registros.
+    """
+    media_format = negotiate_media_type(request.headers.get("accept"), tabular)
+    if media_format == "json":
+        if isinstance(payload, pandas.DataFrame):
+            payload = payload.to_dict(orient="records")
+        return JSONResponse(content=jsonable_encoder(payload), headers=VARY_HEADERS)
+
+    if media_format == "arrow":
+        import pyarrow
+        import pyarrow.ipc
+        frame = payload if isinstance(payload, pandas.DataFrame) else pandas.DataFrame(payload)
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE, headers=VARY_HEADERS)
+
+    import msgpack
+    if isinstance(payload, pandas.DataFrame):
+        payload = payload.to_dict(orient="records")
+    content = msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+    return Response(content=content, media_type=MSGPACK_MEDIA_TYPES[0], headers=VARY_HEADERS)
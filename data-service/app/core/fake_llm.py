@@ -0,0 +1,49 @@
+import time
+from types import SimpleNamespace
+
+DEFAULT_TEXT = (
+    "Resposta gerada pelo cliente LLM local para testes. "
+    "O conteúdo não vem de um modelo real e serve apenas para validar o fluxo da API."
+)
+
+
+class FakeLLMClient:
+    """
+    Cliente local com a mesma interface usada de `openai.OpenAI`
+    (`client.chat.completions.create`), com latência configurável para o
+    primeiro trecho e para cada trecho seguinte. Suporta `stream=True`.
+    """
+
+    def __init__(self, text: str = DEFAULT_TEXT, first_token_latency: float = 0.0, token_latency: float = 0.0):
+        self.text = text
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _tokens(self, max_tokens):
+        words = self.text.split(" ")
+        if max_tokens:
+            words = words[:max_tokens]
+        return [word if index == 0 else f" {word}" for index, word in enumerate(words)]
+
+    def _create(self, model=None, messages=None, max_tokens=None, temperature=None, stream=False, **kwargs):
+        self.calls += 1
+        tokens = self._tokens(max_tokens)
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in messages or [])
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(tokens), total_tokens=prompt_tokens + len(tokens))
+        if stream:
+            include_usage = bool((kwargs.get("stream_options") or {}).get("include_usage"))
+            return self._stream(tokens, usage if include_usage else None)
+        time.sleep(self.first_token_latency + self.token_latency * max(len(tokens) - 1, 0))
+        message = SimpleNamespace(content="".join(tokens), role="assistant")
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    def _stream(self, tokens, usage=None):
+        for index, token in enumerate(tokens):
+            time.sleep(self.first_token_latency if index == 0 else self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token), finish_reason=None)], usage=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")], usage=None)
+        if usage is not None:
+            # Como a OpenAI com stream_options={"include_usage": True}: um último evento só com o uso
+            yield SimpleNamespace(choices=[], usage=usage)
@@ -0,0 +1,231 @@
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.core.config import JOBS_DB_PATH, JOB_POLL_INTERVAL_SECONDS, JOB_STALE_SECONDS
+from app.core.tracing import request_trace, span
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+# Funções que executam cada tipo de job: handler(params, report_progress) -> resultado (JSON)
+JOB_HANDLERS = {}
+_worker_numbers = itertools.count(1)
+
+
+def job_handler(job_type: str):
+    def register(function):
+        JOB_HANDLERS[job_type] = function
+        return function
+    return register
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobQueue:
+    """
+    Fila de jobs persistida em SQLite. Qualquer processo com acesso ao arquivo
+    pode enfileirar ou consumir jobs; a reserva de um job é uma transação
+    exclusiva, então dois workers nunca executam o mesmo job.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB_PATH):
+        self.db_path = db_path
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def connect(self):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._create_tables()
+                    self._initialized = True
+        return self._open()
+
+    def _open(self):
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _create_tables(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        connection = self._open()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress_done INTEGER NOT NULL DEFAULT 0,
+                    progress_total INTEGER,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    heartbeat_at REAL,
+                    finished_at TEXT
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+        finally:
+            connection.close()
+
+    def submit(self, job_type: str, params: dict = None):
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type '{job_type}'. Options: {', '.join(sorted(JOB_HANDLERS))}.")
+        connection = self.connect()
+        try:
+            cursor = connection.execute(
+                "INSERT INTO jobs (type, params, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (job_type, json.dumps(params or {}), _now())
+            )
+            return self.get(cursor.lastrowid)
+        finally:
+            connection.close()
+
+    def get(self, job_id: int, include_result: bool = False):
+        connection = self.connect()
+        try:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            connection.close()
+        return _job_record(row, include_result) if row is not None else None
+
+    def list(self, status: str = None, limit: int = 50):
+        connection = self.connect()
+        try:
+            if status is None:
+                rows = connection.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = connection.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)).fetchall()
+        finally:
+            connection.close()
+        return [_job_record(row) for row in rows]
+
+    def claim(self, worker: str):
+        """
+        Reserva o job enfileirado mais antigo. Jobs "running" sem heartbeat há mais
+        de JOB_STALE_SECONDS (worker morto) voltam para a fila antes da reserva.
+        """
+        connection = self.connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                    (time.time() - JOB_STALE_SECONDS,)
+                )
+                row = connection.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (worker, _now(), time.time(), row["id"])
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.close()
+        return _job_record(row) if row is not None else None
+
+    def report_progress(self, job_id: int, done: int, total: int = None):
+        connection = self.connect()
+        try:
+            connection.execute(
+                "UPDATE jobs SET progress_done = ?, progress_total = COALESCE(?, progress_total), heartbeat_at = ? WHERE id = ?",
+                (done, total, time.time(), job_id)
+            )
+        finally:
+            connection.close()
+
+    def finish(self, job_id: int, result=None, error: str = None):
+        connection = self.connect()
+        try:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error else "succeeded", json.dumps(result) if result is not None else None, error, _now(), job_id)
+            )
+        finally:
+            connection.close()
+
+
+def _job_record(row, include_result=False):
+    record = {
+        "id": row["id"],
+        "type": row["type"],
+        "status": row["status"],
+        "progress": {"done": row["progress_done"], "total": row["progress_total"]},
+        "error": row["error"],
+        "worker": row["worker"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+        "params": json.loads(row["params"])
+    }
+    if include_result:
+        record["result"] = json.loads(row["result"]) if row["result"] else None
+    return record
+
+
+class JobWorker:
+    """
+    Consome a fila executando os handlers registrados. Roda em threads dentro da
+    API (JOB_WORKERS) ou em processos separados (scripts/job_worker.py).
+    """
+
+    def __init__(self, queue: JobQueue, name: str = None, poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        self.queue = queue
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{next(_worker_numbers)}"
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def run_once(self):
+        job = self.queue.claim(self.name)
+        if job is None:
+            return False
+        handler = JOB_HANDLERS.get(job["type"])
+        # Cada job é um trace próprio, identificado pelo id do job
+        with request_trace(f"job-{job['id']}"), span(f"job.{job['type']}", **{"job.id": job["id"], "worker": self.name}) as current:
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler registered for job type '{job['type']}'.")
+                result = handler(job["params"], lambda done, total=None: self.queue.report_progress(job["id"], done, total))
+                self.queue.finish(job["id"], result=result)
+            except Exception as error:
+                current.end(error)
+                # O traceback fica só no log; a API devolve apenas a mensagem
+                logger.exception("Job %s (%s) falhou", job["id"], job["type"])
+                self.queue.finish(job["id"], error=f"{type(error).__name__}: {error}")
+        return True
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except sqlite3.Error:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run_forever, name=f"job-worker-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+job_queue = JobQueue()
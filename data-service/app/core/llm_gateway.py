@@ -0,0 +1,189 @@
+import math
+import random
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.core.config import (
+    LLM_MAX_CONCURRENCY, LLM_RATE_PER_SECOND, LLM_BURST, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS, THREADPOOL_SIZE, LLM_MAX_POOL_SHARE
+)
+from app.core.tracing import span
+
+
+def _overloaded(retry_after: float, detail: str):
+    return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+def pool_queue_limit(max_queue: int, max_concurrency: int, pool_size=THREADPOOL_SIZE, pool_share=LLM_MAX_POOL_SHARE):
+    """
+    Tamanho da fila limitado pelo threadpool: quem espera vaga e quem já tem vaga
+    (inclusive dormindo no token bucket ou no backoff) ocupa uma thread, então no
+    máximo `pool_share` do pool fica presa no LLM e o resto atende as demais rotas.
+    O preço é recusar rajadas que o provedor ainda aceitaria (ver README).
+    """
+    return max(0, min(max_queue, int(pool_size * pool_share) - max_concurrency))
+
+
+def is_rate_limit_error(error: Exception):
+    return type(error).__name__ == "RateLimitError" or getattr(error, "status_code", None) == 429
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def expected_wait(self, position: int):
+        """
+        Estimativa de espera (s) para quem está na posição `position` da fila.
+        """
+        with self._lock:
+            tokens = min(self.capacity, self.tokens + (time.monotonic() - self.updated_at) * self.rate)
+        return max(0.0, (position + 1 - tokens) / self.rate)
+
+    def acquire(self, deadline: float):
+        """
+        Bloqueia até haver uma ficha disponível. Retorna False se o prazo acabar antes.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class LLMGateway:
+    """
+    Ponto único de saída para o provedor de LLM: limita chamadas simultâneas,
+    aplica um token bucket de requisições por segundo, mantém uma fila de espera
+    limitada e repete chamadas recusadas por rate limit com backoff exponencial e
+    jitter. As esperas bloqueiam threads do pool, então a fila é dimensionada pelo
+    threadpool (`pool_queue_limit`) e a requisição recebe 429 com Retry-After logo
+    na entrada quando a fila está cheia ou a espera estimada passa do timeout.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, rate_per_second=LLM_RATE_PER_SECOND, burst=LLM_BURST,
+                 max_queue=LLM_MAX_QUEUE, queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE_SECONDS, backoff_max=LLM_BACKOFF_MAX_SECONDS):
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_queue = pool_queue_limit(max_queue, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.waiting = 0
+        self.rejected = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _acquire_slot(self):
+        with span("llm.acquire_slot") as current:
+            current.set(waiting=self.waiting)
+            self._wait_for_slot()
+
+    def _wait_for_slot(self):
+        if self.slots.acquire(blocking=False):
+            return
+        with self._lock:
+            position = self.waiting
+            if position >= self.max_queue:
+                self.rejected += 1
+                raise _overloaded((position + 1) / self.bucket.rate, "Muitas análises de IA na fila. Tente novamente em instantes.")
+            expected = self.bucket.expected_wait(position)
+            if expected > self.queue_timeout:
+                self.rejected += 1
+                raise _overloaded(expected, "Limite de requisições ao serviço de IA atingido.")
+            self.waiting += 1
+        try:
+            acquired = self.slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise _overloaded(self.queue_timeout, "Tempo de espera por uma vaga no serviço de IA esgotado.")
+
+    def _call_with_retries(self, function):
+        deadline = time.monotonic() + self.queue_timeout
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(deadline):
+                raise _overloaded(1 / self.bucket.rate, "Limite de requisições ao serviço de IA atingido.")
+            try:
+                return function()
+            except Exception as error:
+                if not is_rate_limit_error(error) or attempt >= self.max_retries:
+                    if is_rate_limit_error(error):
+                        raise _overloaded(self.backoff_max, "O provedor de IA recusou a requisição por limite de uso.")
+                    raise
+                backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                time.sleep(random.uniform(0, backoff))
+                deadline = time.monotonic() + self.queue_timeout
+
+    def call(self, function):
+        self._acquire_slot()
+        try:
+            return self._call_with_retries(function)
+        finally:
+            self.slots.release()
+
+    def open_stream(self, function):
+        """
+        Abre uma chamada em streaming. A vaga é reservada já na abertura (para que o
+        429 saia antes da resposta começar) e liberada quando o stream termina ou é fechado.
+        """
+        self._acquire_slot()
+        try:
+            stream = self._call_with_retries(function)
+        except BaseException:
+            self.slots.release()
+            raise
+        return _GatewayStream(stream, self.slots.release)
+
+    def stats(self):
+        return {"waiting": self.waiting, "max_queue": self.max_queue, "rejected": self.rejected, "retries": self.retries}
+
+
+class _GatewayStream:
+    def __init__(self, stream, release):
+        self._iterator = iter(stream)
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._release()
+
+    def __del__(self):
+        self.close()
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,181 @@
+import hmac
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+
+from app.core.config import PROFILING_ENABLED, PROFILING_ADMIN_TOKEN, PROFILING_INTERVAL_MS, PROFILING_OUTPUT_DIR
+from app.core.tracing import REQUEST_ID_HEADER, REQUEST_ID_PATTERN, current_request_id
+
+PROFILE_HEADER = "x-profile"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+
+active_sampler: ContextVar[Optional["RequestSampler"]] = ContextVar("active_sampler", default=None)
+
+
+class RequestSampler:
+    """
+    Profiler por amostragem: uma thread auxiliar lê periodicamente a pilha das
+    threads que estão executando o handler da requisição.
+    """
+
+    def __init__(self, interval_ms: float = PROFILING_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.thread_ids = set()
+        self.samples = []
+        self.started_at = None
+        self.finished_at = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.finished_at = time.perf_counter()
+
+    @contextmanager
+    def track_current_thread(self):
+        ident = threading.get_ident()
+        self.thread_ids.add(ident)
+        try:
+            yield
+        finally:
+            self.thread_ids.discard(ident)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.thread_ids):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples.append(_stack(frame))
+
+    def to_speedscope(self, name: str):
+        frame_index = {}
+        frames = []
+        samples = []
+        for stack in self.samples:
+            indexes = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                indexes.append(frame_index[key])
+            samples.append(indexes)
+        duration = (self.finished_at or time.perf_counter()) - (self.started_at or 0)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "santander-insights",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": samples,
+                "weights": [self.interval] * len(samples)
+            }]
+        }
+
+
+def _stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _profiled(endpoint):
+    if getattr(endpoint, "__profiled__", False):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            sampler = active_sampler.get()
+            if sampler is None:
+                return await endpoint(*args, **kwargs)
+            with sampler.track_current_thread():
+                return await endpoint(*args, **kwargs)
+    else:
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            sampler = active_sampler.get()
+            if sampler is None:
+                return endpoint(*args, **kwargs)
+            with sampler.track_current_thread():
+                return endpoint(*args, **kwargs)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledAPIRoute(APIRoute):
+    """
+    Rota que permite ao profiler identificar a thread do handler. Com o profiling
+    desativado o endpoint é registrado sem nenhum wrapper.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        if PROFILING_ENABLED:
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def is_admin(request: Request):
+    token = request.headers.get(ADMIN_TOKEN_HEADER)
+    return bool(PROFILING_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_ADMIN_TOKEN)
+
+
+def profile_path(request_id: str):
+    return os.path.join(PROFILING_OUTPUT_DIR, f"{request_id}.speedscope.json")
+
+
+async def profile_request(request: Request, call_next):
+    """
+    Middleware registrado apenas quando PROFILING_ENABLED está ativo. Requisições
+    com `X-Profile: 1` e um `X-Admin-Token` válido são amostradas e o perfil é
+    salvo em formato speedscope, identificado pelo id da requisição.
+    """
+    if request.headers.get(PROFILE_HEADER) != "1" or not is_admin(request):
+        return await call_next(request)
+
+    # Mesmo id do trace da requisição, para cruzar o perfil com os spans
+    request_id = current_request_id() or request.headers.get(REQUEST_ID_HEADER, "")
+    if not REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+
+    sampler = RequestSampler()
+    token = active_sampler.set(sampler)
+    sampler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        sampler.stop()
+        active_sampler.reset(token)
+
+    os.makedirs(PROFILING_OUTPUT_DIR, exist_ok=True)
+    with open(profile_path(request_id), "w", encoding="utf-8") as profile_file:
+        json.dump(sampler.to_speedscope(f"{request.method} {request.url.path}"), profile_file)
+
+    response.headers["X-Profile-Id"] = request_id
+    return response
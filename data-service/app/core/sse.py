@@ -0,0 +1,26 @@
+import json
+from fastapi.responses import StreamingResponse
+
+def _event(data, event=None):
+    payload = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+def sse_response(tokens):
+    """
+    Envia cada trecho gerado como um evento SSE. Erros durante a geração viram um
+    evento `error`, já que o status HTTP foi enviado com o primeiro byte.
+    """
+    def events():
+        try:
+            for token in tokens:
+                yield _event({"token": token})
+        except Exception as e:
+            yield _event({"detail": str(e)}, event="error")
+            return
+        yield _event({}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,58 @@
+import importlib
+import time
+from contextlib import contextmanager
+
+from app.core.tracing import span
+
+
+class StartupProfile:
+    """
+    Registra o tempo de importação de módulos pesados e de cada etapa de
+    inicialização, para acompanhar o custo de cold start dos workers.
+    """
+
+    def __init__(self):
+        self.imports = {}
+        self.stages = {}
+
+    def record_import(self, module_name: str, seconds: float):
+        self.imports[module_name] = seconds
+
+    def import_module(self, module_name: str):
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if module_name not in self.imports:
+            self.record_import(module_name, time.perf_counter() - started)
+        return module
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            with span(f"stage.{name}"):
+                yield
+        finally:
+            self.stages[name] = time.perf_counter() - started
+
+    def report(self):
+        return {
+            "imports_ms": {name: round(seconds * 1000, 2) for name, seconds in self.imports.items()},
+            "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()}
+        }
+
+    def print_report(self):
+        report = self.report()
+        print("Perfil de inicialização:")
+        for section in ("imports_ms", "stages_ms"):
+            for name, milliseconds in report[section].items():
+                print(f"  {section[:-3]:<8} {name:<40} {milliseconds:>10.2f} ms")
+
+
+def lazy_module(module_name: str):
+    """
+    Importa o módulo na primeira chamada, registrando o tempo no perfil de inicialização.
+    """
+    return startup_profile.import_module(module_name)
+
+
+startup_profile = StartupProfile()
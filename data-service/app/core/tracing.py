@@ -0,0 +1,196 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from app.core.config import TRACING_EXPORTER, TRACING_OUTPUT_PATH
+
+REQUEST_ID_HEADER = "x-request-id"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+logger = logging.getLogger("app.tracing")
+
+_current_trace: ContextVar[Optional["_Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class _Trace:
+    def __init__(self, request_id: str):
+        self.trace_id = uuid.uuid4().hex
+        self.request_id = request_id
+
+
+class Span:
+    """
+    Trecho cronometrado de uma requisição, exportado com os nomes de campo do
+    formato JSON do OpenTelemetry (traceId, spanId, parentSpanId...).
+    """
+
+    def __init__(self, name: str, attributes: dict, trace: Optional[_Trace], parent: Optional["Span"]):
+        if trace is None:
+            trace = _Trace(uuid.uuid4().hex)
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_span_id = parent.span_id if parent is not None and parent.trace is trace else None
+        self.attributes = dict(attributes)
+        self.start_time_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self._ended = False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None):
+        if self._ended:
+            return
+        self._ended = True
+        duration = time.perf_counter() - self._started
+        status = {"code": "STATUS_CODE_OK"}
+        if error is not None:
+            status = {"code": "STATUS_CODE_ERROR", "message": f"{type(error).__name__}: {error}"}
+        _export({
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_time_ns,
+            "endTimeUnixNano": self.start_time_ns + int(duration * 1e9),
+            "durationMs": round(duration * 1000, 3),
+            "attributes": {"request.id": self.trace.request_id, "thread": threading.current_thread().name, **self.attributes},
+            "status": status
+        })
+
+
+def start_span(name: str, **attributes):
+    """
+    Abre um span sem torná-lo o span corrente. Usado em geradores e streams, que
+    podem ser consumidos em outra thread ou contexto; feche com `span.end()`.
+    """
+    return Span(name, attributes, _current_trace.get(), _current_span.get())
+
+
+@contextmanager
+def span(name: str, **attributes):
+    current = start_span(name, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        current.end(error)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def traced(name: str):
+    """
+    Decorador que envolve a função em um span.
+    """
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def request_trace(request_id: Optional[str] = None):
+    """
+    Associa um id de requisição a todos os spans abertos dentro do bloco
+    (inclusive em threads do threadpool, que herdam o contexto).
+    """
+    trace = _Trace(request_id or uuid.uuid4().hex)
+    token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace.request_id
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
+
+
+def current_request_id():
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+
+_configure_lock = threading.Lock()
+_file_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _export(record: dict):
+    if TRACING_EXPORTER == "none":
+        return
+    if not logger.handlers:
+        configure_tracing()
+    logger.info(json.dumps(record, default=str, ensure_ascii=False))
+
+
+def configure_tracing():
+    """
+    Prepara o destino dos spans no logger `app.tracing`: uma linha JSON por span no
+    log, ou no arquivo JSONL. No modo arquivo a requisição só enfileira a linha; uma
+    thread grava tudo por um único handle aberto (QueueListener + FileHandler).
+    """
+    global _file_listener
+    with _configure_lock:
+        if logger.handlers or TRACING_EXPORTER not in ("file", "log"):
+            return
+        if TRACING_EXPORTER == "file":
+            os.makedirs(os.path.dirname(TRACING_OUTPUT_PATH) or ".", exist_ok=True)
+            records = queue.SimpleQueue()
+            file_handler = logging.FileHandler(TRACING_OUTPUT_PATH, encoding="utf-8")
+            file_handler.setFormatter(logging.Formatter("%(message)s"))
+            _file_listener = logging.handlers.QueueListener(records, file_handler)
+            _file_listener.start()
+            handler = logging.handlers.QueueHandler(records)
+        else:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def shutdown_tracing():
+    """
+    Grava os spans ainda na fila e fecha o arquivo (modo arquivo).
+    """
+    global _file_listener
+    with _configure_lock:
+        if _file_listener is not None:
+            _file_listener.stop()
+            for handler in _file_listener.handlers:
+                handler.close()
+            _file_listener = None
+            logger.handlers.clear()
+
+
+async def trace_request(request, call_next):
+    """
+    Middleware: usa o X-Request-ID recebido (ou gera um), abre o span raiz da
+    requisição e devolve o id no header da resposta.
+    """
+    request_id = request.headers.get(REQUEST_ID_HEADER, "")
+    if not REQUEST_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+    with request_trace(request_id):
+        with span(f"{request.method} {request.url.path}", **{"http.method": request.method, "http.target": request.url.path}) as root:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            root.set(**{"http.status_code": response.status_code, "http.route": getattr(route, "path", None)})
+    response.headers["X-Request-ID"] = request_id
+    return response
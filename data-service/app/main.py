@@ -1,20 +1,50 @@
+import time
+_import_started = time.perf_counter()
+
 from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import companies, transactions, sectors, dashboard, ai, forecast, graph, graph_ai
+from app.api import companies, transactions, sectors, dashboard, ai, forecast, graph, graph_ai, profiling, jobs
+from app.core.config import PROFILING_ENABLED, COMPRESSION_ENABLED, JOB_WORKERS, THREADPOOL_SIZE
+from app.core.job_queue import JobWorker, job_queue
+from app.core.compression import CompressionMiddleware
+from app.core.profiling import profile_request
+from app.core.tracing import configure_tracing, shutdown_tracing, request_trace, trace_request
+from app.core.startup_profile import startup_profile
 from app.services.data_store import data_store
 from app.services.graph_service import graph_service
+from app.services.ai_jobs import schedule_precompute
+
+startup_profile.record_import("app.main", time.perf_counter() - _import_started)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    configure_tracing()
+    # O gateway do LLM dimensiona a fila por este valor (LLM_MAX_POOL_SHARE)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     try:
-        data_store.initialize_data()
+        # Dados já carregados (ex.: harness de carga com dados sintéticos) são mantidos
+        if not data_store.is_loaded():
+            with request_trace("startup"), startup_profile.stage("initialize_data"):
+                data_store.initialize_data()
     except Exception as error:
         raise ValueError(f"Error while initializing application: {error}")
+    startup_profile.print_report()
+
+    # Workers da fila de jobs dentro da API; outros podem rodar em processos separados (scripts/job_worker.py)
+    workers = [JobWorker(job_queue) for _ in range(JOB_WORKERS)]
+    for worker in workers:
+        worker.start()
+    schedule_precompute()
     
     yield
 
+    for worker in workers:
+        worker.stop()
+    shutdown_tracing()
+
 app = FastAPI(lifespan= lifespan)
 
 app.add_middleware(
@@ -25,6 +55,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# O profiling só é registrado quando habilitado, sem custo algum quando desligado
+if PROFILING_ENABLED:
+    app.middleware("http")(profile_request)
+    app.include_router(profiling.router)
+
+# Registrado por último para ser o middleware mais externo: o id e o span raiz
+# da requisição já existem quando o profiling e os endpoints rodam
+app.middleware("http")(trace_request)
+
 @app.get("/health")
 async def health_check():
     """
@@ -50,6 +92,13 @@ async def health_check():
             detail=f"Erro de conexão com Neo4j: {str(e)}. Verifique se o Neo4j está em execução e as credenciais estão corretas."
         )
 
+@app.get("/health/startup")
+async def startup_report():
+    """
+    Tempo de importação por módulo e tempo de cada etapa de inicialização
+    """
+    return startup_profile.report()
+
 app.include_router(companies.router)
 app.include_router(transactions.router)
 app.include_router(sectors.router)
@@ -58,3 +107,4 @@ app.include_router(ai.router)
 app.include_router(forecast.router)
 app.include_router(graph.router)
 app.include_router(graph_ai.router)
+app.include_router(jobs.router)
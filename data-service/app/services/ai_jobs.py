@@ -0,0 +1,106 @@
+import contextvars
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from fastapi import HTTPException
+
+from app.core.config import (
+    AI_PRECOMPUTE_ON_RELOAD, AI_PRECOMPUTE_LIMIT, AI_JOB_MAX_RETRIES, LLM_MAX_CONCURRENCY,
+    LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS
+)
+from app.core.job_queue import job_handler, job_queue
+from app.services.ai_results_store import ai_result_store
+from app.services.ai_service import get_company_diagnosis_service
+from app.services.data_store import data_store
+
+
+def _diagnose_with_retries(company_id):
+    """
+    Um 429 do gateway (fila cheia ou limite do provedor) não é falha da empresa:
+    o job espera o Retry-After, com backoff exponencial e jitter, e tenta de novo.
+    """
+    attempt = 0
+    while True:
+        try:
+            return get_company_diagnosis_service(company_id, store_now=True)
+        except HTTPException as error:
+            if error.status_code != 429 or attempt >= AI_JOB_MAX_RETRIES:
+                raise
+            retry_after = float((error.headers or {}).get("Retry-After", 0))
+            backoff = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+            attempt += 1
+            time.sleep(max(retry_after, backoff) + random.uniform(0, backoff))
+
+
+def _diagnose_companies(company_ids, report_progress):
+    """
+    Gera (ou reaproveita) o diagnóstico de cada empresa, com até LLM_MAX_CONCURRENCY
+    chamadas simultâneas; todas passam pelo gateway do LLM. Só entram em `failed`
+    as empresas com erro permanente ou que esgotaram AI_JOB_MAX_RETRIES.
+    """
+    company_ids = list(dict.fromkeys(company_ids))
+    report_progress(0, len(company_ids))
+    done = 0
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max(1, LLM_MAX_CONCURRENCY)) as executor:
+        # Cada chamada roda em uma cópia do contexto, para que os spans fiquem no trace do job
+        futures = {executor.submit(contextvars.copy_context().run, _diagnose_with_retries, company_id): company_id for company_id in company_ids}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except HTTPException as error:
+                failed[futures[future]] = str(error.detail)
+            except Exception as error:
+                failed[futures[future]] = str(error)
+            done += 1
+            report_progress(done)
+    return {
+        "kind": "diagnosis",
+        "snapshot": data_store.snapshot_version,
+        "company_ids": company_ids,
+        "succeeded": len(company_ids) - len(failed),
+        "failed": failed
+    }
+
+
+@job_handler("diagnose_companies")
+def diagnose_companies_job(params, report_progress):
+    return _diagnose_companies(params.get("company_ids", []), report_progress)
+
+
+@job_handler("diagnose_sector")
+def diagnose_sector_job(params, report_progress):
+    profiles_df = data_store.all_companies_profiles
+    sector_ids = profiles_df.loc[profiles_df["ds_cnae"] == params["sector"], "id"].unique().tolist()
+    return _diagnose_companies(sector_ids, report_progress)
+
+
+@job_handler("precompute_diagnoses")
+def precompute_diagnoses_job(params, report_progress):
+    profiles_df = data_store.all_companies_profiles
+    limit = params.get("limit", AI_PRECOMPUTE_LIMIT)
+    top_ids = profiles_df.drop_duplicates(subset="id").nlargest(limit, "receita_media_6m")["id"].tolist()
+    return _diagnose_companies(top_ids, report_progress)
+
+
+def get_job_results(job):
+    """
+    Resultado de um job concluído, com os textos gerados para cada empresa.
+    """
+    result = job.get("result") or {}
+    if result.get("kind") == "diagnosis":
+        result = {**result, "diagnoses": ai_result_store.get_many("diagnosis", result.get("company_ids", []))}
+    return result
+
+
+def schedule_precompute():
+    """
+    Enfileira o pré-cálculo dos diagnósticos após uma carga dos dados, se ainda
+    não houver um pendente.
+    """
+    if not AI_PRECOMPUTE_ON_RELOAD or AI_PRECOMPUTE_LIMIT <= 0:
+        return None
+    if any(job["type"] == "precompute_diagnoses" for job in job_queue.list(status="queued")):
+        return None
+    return job_queue.submit("precompute_diagnoses", {"limit": AI_PRECOMPUTE_LIMIT})
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.core.job_queue import job_queue
+from app.services.data_store import data_store
+
+# Limite de parâmetros por consulta (SQLITE_MAX_VARIABLE_NUMBER antigo é 999)
+QUERY_BATCH_SIZE = 500
+
+
+class AIResultStore:
+    """
+    Textos de IA já gerados, guardados no mesmo SQLite da fila de jobs. Cada
+    resultado é associado à versão do snapshot dos dados em que foi gerado, então
+    uma recarga com dados diferentes invalida os anteriores.
+
+    `put` grava na hora (jobs); `put_later` entrega a gravação a uma thread de
+    escrita própria, para que a requisição não espere o SQLite.
+    """
+
+    def __init__(self, queue=job_queue):
+        self.queue = queue
+        self._table_ready = False
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-results-writer")
+
+    def _connect(self):
+        connection = self.queue.connect()
+        if not self._table_ready:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS ai_results (
+                    kind TEXT NOT NULL,
+                    company_id TEXT NOT NULL,
+                    snapshot TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (kind, company_id, snapshot)
+                )
+            """)
+            self._table_ready = True
+        return connection
+
+    def get(self, kind: str, company_id: str, snapshot: Optional[str] = None):
+        return self.get_many(kind, [company_id], snapshot).get(company_id)
+
+    def get_many(self, kind: str, company_ids, snapshot: Optional[str] = None):
+        """
+        Resultados das empresas informadas para o snapshot (o atual, por padrão), em
+        uma conexão e uma consulta por bloco de QUERY_BATCH_SIZE ids.
+        """
+        snapshot = snapshot or data_store.snapshot_version
+        company_ids = list(dict.fromkeys(company_ids))
+        results = {}
+        if not company_ids:
+            return results
+        connection = self._connect()
+        try:
+            for start in range(0, len(company_ids), QUERY_BATCH_SIZE):
+                batch = company_ids[start:start + QUERY_BATCH_SIZE]
+                rows = connection.execute(
+                    f"SELECT company_id, content FROM ai_results WHERE kind = ? AND snapshot = ? AND company_id IN ({', '.join('?' * len(batch))})",
+                    (kind, snapshot, *batch)
+                ).fetchall()
+                results.update((row["company_id"], row["content"]) for row in rows)
+        finally:
+            connection.close()
+        return {company_id: results[company_id] for company_id in company_ids if company_id in results}
+
+    def put(self, kind: str, company_id: str, content: str, snapshot: Optional[str] = None):
+        connection = self._connect()
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO ai_results (kind, company_id, snapshot, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, company_id, snapshot or data_store.snapshot_version, content, datetime.now(timezone.utc).isoformat())
+            )
+        finally:
+            connection.close()
+
+    def put_later(self, kind: str, company_id: str, content: str, snapshot: Optional[str] = None):
+        # A versão é fixada agora: o snapshot pode mudar antes da gravação
+        return self._writer.submit(self.put, kind, company_id, content, snapshot or data_store.snapshot_version)
+
+
+ai_result_store = AIResultStore()
@@ -1,13 +1,38 @@
 from app.services.companies_service import get_company_details_service
-from app.core.ai_config import ai_config
 from fastapi import HTTPException
 from app.services.forecast_service import get_cashflow_forecast
+from app.services.llm_service import chat_completion, stream_chat_completion
+from app.services.ai_results_store import ai_result_store
+from app.services.data_store import data_store
 
-def get_company_diagnosis_service(company_id: str):
+def get_company_diagnosis_service(company_id: str, store_now: bool = False):
+    # Diagnósticos pré-calculados pelos jobs (ou gerados antes) para o snapshot atual saem direto do armazenamento
+    snapshot = data_store.snapshot_version
+    diagnosis = ai_result_store.get("diagnosis", company_id, snapshot)
+    if diagnosis is None:
+        diagnosis = chat_completion(**_company_diagnosis_request(company_id))
+        # Cada diagnóstico é uma chamada paga ao LLM, então os gerados na requisição também ficam
+        # guardados; a gravação sai do caminho da resposta, exceto nos jobs (`store_now`), cujo
+        # resultado é lido do armazenamento assim que terminam
+        if store_now:
+            ai_result_store.put("diagnosis", company_id, diagnosis, snapshot)
+        else:
+            ai_result_store.put_later("diagnosis", company_id, diagnosis, snapshot)
+    return diagnosis
+
+def stream_company_diagnosis_service(company_id: str):
+    return stream_chat_completion(**_company_diagnosis_request(company_id))
+
+def get_forecast_analysis_service(company_id: str, n_months: int):
+    return chat_completion(**_forecast_analysis_request(company_id, n_months))
+
+def stream_forecast_analysis_service(company_id: str, n_months: int):
+    return stream_chat_completion(**_forecast_analysis_request(company_id, n_months))
+
+def _company_diagnosis_request(company_id: str):
     details = get_company_details_service(company_id)
     if details is None:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
-    client = ai_config.client
     kpis = details["kpis"]
     benchmarking = details["benchmarking"]
     momento = kpis.get("moment", "N/A")
@@ -34,21 +59,18 @@ def get_company_diagnosis_service(company_id: str):
     \n3. Com base na tendência de crescimento, dar uma recomendação estratégica.
     \nSeja direto e foque em insights acionáveis para um gestor."
     """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    return {
+        "messages": [
             {"role": "system", "content": "Você é um analista financeiro sênior a escrever um diagnóstico para um cliente empresarial."},
             {"role": "user", "content": prompt}
         ],
-        max_tokens=250, temperature=0.5,
-    )
-    return response.choices[0].message.content.strip()
+        "max_tokens": 250, "temperature": 0.5,
+    }
 
-def get_forecast_analysis_service(company_id: str, n_months: int):
+def _forecast_analysis_request(company_id: str, n_months: int):
     forecast = get_cashflow_forecast(company_id, n_months)
     hist = forecast['historico']
     previsao = forecast['previsao']
-    client = ai_config.client
     import pandas as pd
     df_hist = pd.DataFrame(hist)
     df_prev = pd.DataFrame(previsao)
@@ -65,12 +87,10 @@ def get_forecast_analysis_service(company_id: str, n_months: int):
     Como um analista financeiro do Banco Santander, analise o seguinte resumo de previsão de fluxo de caixa de um cliente.\n\nDados da Previsão:\n{contexto}\n\nSua Tarefa:\nEscreva uma recomendação curta e direta em um único parágrafo. A sua recomendação deve:\n1. Interpretar a tendência prevista (superavitária ou deficitária).\n2. Com base na tendência, sugerir um tipo de produto financeiro do Santander (investimento PJ para superavit, crédito PJ para deficit).\nSeja direto e termine a sua resposta logo após a sugestão do produto. Não adicione frases de encerramento ou convites para discussão."
     """
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    return {
+        "messages": [
             {"role": "system", "content": "Você é um analista financeiro a oferecer uma recomendação objetiva a um cliente PJ."},
             {"role": "user", "content": prompt}
         ],
-        max_tokens=150, temperature=0.5,
-    )
-    return response.choices[0].message.content.strip()
+        "max_tokens": 150, "temperature": 0.5,
+    }
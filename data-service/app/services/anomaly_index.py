@@ -0,0 +1,139 @@
+import warnings
+from typing import Optional
+
+import numpy
+import pandas
+
+from app.core.config import ANOMALY_WINDOW_MONTHS, ANOMALY_MIN_HISTORY, ANOMALY_THRESHOLD
+
+ANOMALY_METRICS = ("receita", "despesa", "fluxo_liq")
+
+# Converte o MAD em desvio-padrão equivalente para dados normais
+MAD_SCALE = 1.4826
+# Escala mínima para janelas constantes (MAD e desvio-padrão nulos): fração de
+# |mediana|, com piso absoluto para janelas zeradas
+MIN_SCALE_RATIO = 0.01
+MIN_SCALE = 1.0
+
+
+class AnomalyIndex:
+    """
+    Meses atípicos de receita, despesa e fluxo líquido de todas as empresas,
+    calculados uma vez por snapshot do resumo mensal. Cada mês é comparado com a
+    janela dos `window` meses anteriores da própria empresa: z-score (média e
+    desvio-padrão) e z robusto (mediana e MAD), numa única passada vetorizada
+    sobre a matriz empresas x meses.
+    """
+
+    def __init__(self, monthly_df: pandas.DataFrame, window: int = ANOMALY_WINDOW_MONTHS,
+                 min_history: int = ANOMALY_MIN_HISTORY, threshold: float = ANOMALY_THRESHOLD):
+        self.window = window
+        self.min_history = min_history
+        self.threshold = threshold
+
+        codes, ids = pandas.factorize(monthly_df["id"])
+        month_codes, months = pandas.factorize(monthly_df["ano_mes"], sort=True)
+        self.ids = numpy.asarray(ids)
+        self.months = numpy.asarray(months)
+        self.known_ids = set(self.ids)
+
+        # Meses sem transações valem zero a partir do primeiro mês da empresa
+        n_companies, n_months = len(ids), len(months)
+        first_month = numpy.full(n_companies, n_months)
+        numpy.minimum.at(first_month, codes, month_codes)
+        active = numpy.arange(n_months)[None, :] >= first_month[:, None]
+
+        frames = []
+        for metric in ANOMALY_METRICS:
+            values = numpy.zeros((n_companies, n_months))
+            values[codes, month_codes] = monthly_df[metric].to_numpy(dtype=float)
+            values[~active] = numpy.nan
+            frames.append(self._score(metric, values))
+        anomalies = pandas.concat(frames, ignore_index=True)
+
+        self.latest_month = self.months[-1] if n_months else None
+        # Feed: mais recentes primeiro e, no mesmo mês, mais severas primeiro
+        anomalies["severity"] = anomalies["robust_zscore"].abs()
+        self.feed = anomalies.sort_values(["ano_mes", "severity"], ascending=[False, False], kind="stable").reset_index(drop=True)
+        self.by_company = {
+            company_id: group.sort_values(["ano_mes", "metric"], kind="stable")
+            for company_id, group in anomalies.groupby("id", sort=False)
+        }
+
+    def _score(self, metric: str, values: numpy.ndarray):
+        n_companies, n_months = values.shape
+        padded = numpy.concatenate([numpy.full((n_companies, self.window), numpy.nan), values], axis=1)
+        # history[:, t] são os `window` meses anteriores a t
+        history = numpy.lib.stride_tricks.sliding_window_view(padded, self.window, axis=1)[:, :n_months]
+
+        with warnings.catch_warnings(), numpy.errstate(invalid="ignore", divide="ignore"):
+            # nanmean/nanmedian avisam a cada janela ainda vazia (início das séries)
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            count = numpy.sum(~numpy.isnan(history), axis=2)
+            mean = numpy.nanmean(history, axis=2)
+            std = numpy.nanstd(history, axis=2, ddof=1)
+            median = numpy.nanmedian(history, axis=2)
+            mad = numpy.nanmedian(numpy.abs(history - median[:, :, None]), axis=2) * MAD_SCALE
+            # Com MAD nulo (janela quase constante) o desvio-padrão serve de escala; com
+            # a janela constante, uma escala mínima faz qualquer desvio relevante ser sinalizado
+            robust_scale = numpy.where(mad > 0, mad, std)
+            constant = (count > 0) & ~(robust_scale > 0)
+            robust_scale = numpy.where(constant, numpy.maximum(MIN_SCALE_RATIO * numpy.abs(median), MIN_SCALE), robust_scale)
+            zscore = numpy.where(std > 0, (values - mean) / std, numpy.nan)
+            robust_zscore = numpy.where(robust_scale > 0, (values - median) / robust_scale, numpy.nan)
+
+        flagged = (count >= self.min_history) & (numpy.abs(robust_zscore) >= self.threshold)
+        rows, columns = numpy.nonzero(flagged)
+        return pandas.DataFrame({
+            "id": self.ids[rows],
+            "ano_mes": self.months[columns],
+            "metric": metric,
+            "value": values[rows, columns],
+            "expected": median[rows, columns],
+            "zscore": zscore[rows, columns],
+            "robust_zscore": robust_zscore[rows, columns],
+            "direction": numpy.where(robust_zscore[rows, columns] > 0, "above", "below")
+        })
+
+    def company(self, company_id: str, metric: Optional[str] = None):
+        """
+        Anomalias da empresa em ordem cronológica; None se a empresa não existe no resumo.
+        """
+        if company_id not in self.known_ids:
+            return None
+        anomalies = self.by_company.get(company_id)
+        if anomalies is None:
+            return []
+        if metric is not None:
+            anomalies = anomalies[anomalies["metric"] == metric]
+        return _records(anomalies)
+
+    def latest(self, months: int = 1, metric: Optional[str] = None, company_ids=None, limit: int = 50):
+        """
+        Anomalias dos últimos `months` meses do snapshot em toda a carteira,
+        opcionalmente restritas a uma métrica ou a um conjunto de empresas.
+        """
+        if self.latest_month is None:
+            return 0, []
+        recent = self.feed[self.feed["ano_mes"].isin(self.months[-months:])]
+        if metric is not None:
+            recent = recent[recent["metric"] == metric]
+        if company_ids is not None:
+            recent = recent[recent["id"].isin(company_ids)]
+        return len(recent), _records(recent.head(limit))
+
+
+def _records(anomalies: pandas.DataFrame):
+    return [
+        {
+            "id": row.id,
+            "month": row.ano_mes,
+            "metric": row.metric,
+            "value": float(row.value),
+            "expected": float(row.expected),
+            "zscore": None if numpy.isnan(row.zscore) else float(row.zscore),
+            "robust_zscore": float(row.robust_zscore),
+            "direction": row.direction
+        }
+        for row in anomalies.itertuples(index=False)
+    ]
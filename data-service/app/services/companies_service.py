@@ -1,116 +1,284 @@
+import logging
 import pandas
 import numpy
-from sklearn.cluster import KMeans
-from sklearn.discriminant_analysis import StandardScaler
-from sklearn.linear_model import LinearRegression
+from datetime import date
+from typing import List, Optional
+from fastapi import HTTPException
+from app.core.startup_profile import lazy_module
 from app.services.data_store import data_store
+from app.services.forecast_models import LinearTrendModel, build_series_matrix
+from app.services.company_search import SORT_METRICS
+from app.services.time_index import add_cashflow_ratios, month_window
+from app.services.company_similarity import PROFILE_FEATURES
+from app.services.anomaly_index import ANOMALY_METRICS
+from app.core.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 def get_company_ids_service():
     profiles_df = data_store.all_companies_profiles
     ids = sorted(profiles_df["id"].unique())
     return {"company_ids": ids}
 
-def get_company_details_service(company_id: str):
-    profiles_df = data_store.all_companies_profiles
-    transactions_df = data_store.transactions_df
+@traced("companies.search")
+def search_companies_service(sort_by: str = "revenue", order: str = "desc", sector: Optional[str] = None,
+                            moment: Optional[str] = None, ranges: Optional[dict] = None, limit: int = 20, offset: int = 0):
+    if sort_by not in SORT_METRICS:
+        raise HTTPException(status_code=400, detail=f"Ordenação '{sort_by}' inválida. Opções: {', '.join(SORT_METRICS)}.")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Parâmetro 'order' deve ser 'asc' ou 'desc'.")
+    metric_ranges = {SORT_METRICS[name]: bounds for name, bounds in (ranges or {}).items() if bounds != (None, None)}
+    total, companies = data_store.company_search.search(sort_by, order == "desc", sector, moment, metric_ranges, limit, offset)
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "sort_by": sort_by,
+        "order": order,
+        "companies": companies
+    }
 
-    if company_id not in profiles_df["id"].values:
-        return None
-    profile = profiles_df[profiles_df["id"] == company_id].iloc[0]
-    sector = profile["ds_cnae"]
+@traced("companies.similar")
+def get_similar_companies_service(company_id: str, k: int = 10, sector: Optional[str] = None):
+    similar = data_store.company_similarity.similar(company_id, k, sector)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return {
+        "company_id": company_id,
+        "k": k,
+        "sector": sector,
+        "features": PROFILE_FEATURES,
+        "similar": similar
+    }
 
-    sector_profiles = profiles_df[profiles_df["ds_cnae"] == sector]
-    sector_means = sector_profiles[["receita_media_6m", "margem_media_6m"]].mean()
+def _check_anomaly_metric(metric: Optional[str]):
+    if metric is not None and metric not in ANOMALY_METRICS:
+        raise HTTPException(status_code=400, detail=f"Métrica '{metric}' inválida. Opções: {', '.join(ANOMALY_METRICS)}.")
 
-    kpis = {
-        "moment": profile["momento"],
-        "average_margin_6m": profile["margem_media_6m"]
+@traced("companies.anomalies")
+def get_company_anomalies_service(company_id: str, metric: Optional[str] = None):
+    _check_anomaly_metric(metric)
+    anomalies_index = data_store.anomalies
+    anomalies = anomalies_index.company(company_id, metric)
+    if anomalies is None:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return {
+        "company_id": company_id,
+        "window_months": anomalies_index.window,
+        "threshold": anomalies_index.threshold,
+        "anomalies": anomalies
     }
 
-    benchmarking = {
-        "company_average_revenue_6m": profile["receita_media_6m"],
-        "sector_average_revenue_6m": sector_means["receita_media_6m"],
-        "company_average_margin_6m": profile["margem_media_6m"],
-        "sector_average_margin_6m": sector_means["margem_media_6m"]
+@traced("companies.latest_anomalies")
+def get_latest_anomalies_service(months: int = 1, metric: Optional[str] = None, sector: Optional[str] = None, limit: int = 50):
+    _check_anomaly_metric(metric)
+    snapshot = data_store.snapshot
+    company_ids = None
+    if sector is not None:
+        profiles_df = snapshot.all_companies_profiles
+        company_ids = profiles_df.loc[profiles_df["ds_cnae"] == sector, "id"].unique()
+    anomalies_index = snapshot.anomalies
+    total, anomalies = anomalies_index.latest(months, metric, company_ids, limit)
+    return {
+        "latest_month": anomalies_index.latest_month,
+        "months": months,
+        "window_months": anomalies_index.window,
+        "threshold": anomalies_index.threshold,
+        "total": total,
+        "anomalies": anomalies
     }
 
-    monthly_cashflow = create_monthly_cashflow_summary(transactions_df)
-    hist_id = monthly_cashflow[monthly_cashflow["id"] == company_id].sort_values("ano_mes")
-    if not hist_id.empty:
-        history = hist_id[["ano_mes", "receita", "despesa", "fluxo_liq"]].rename(columns={"ano_mes": "date"}).to_dict(orient="records")
-        def linear_trend(col):
-            s = hist_id[col]
-            if len(s) < 2:
-                return 0
-            x = numpy.arange(len(s)).reshape(-1, 1)
-            y = s.values.reshape(-1, 1)
-            model = LinearRegression().fit(x, y)
-            return float(model.coef_[0][0])
-        cashflow_trends = {
-            "receita": linear_trend("receita"),
-            "despesa": linear_trend("despesa"),
-            "fluxo_liq": linear_trend("fluxo_liq")
+DETAIL_FIELDS = ("kpis", "benchmarking", "history", "cashflow_trends", "period_totals", "revenue_distribution", "expense_distribution")
+
+@traced("companies.details")
+def get_company_details_service(company_id: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    result = get_company_details_batch_service([company_id], date_from=date_from, date_to=date_to)
+    if not result["companies"]:
+        return None
+    return result["companies"][0]
+
+@traced("companies.details_batch")
+def get_company_details_batch_service(company_ids: List[str], fields: Optional[List[str]] = None,
+                                      date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """
+    Calcula os detalhes de várias empresas em uma única passada: médias setoriais,
+    mixes de receita/despesa e tendências são computados uma vez para o lote.
+
+    Com from/to, todos os campos usam a mesma janela, expandida para meses
+    inteiros; KPIs e benchmarking vêm dos perfis calculados com os meses da
+    janela (null para empresas sem movimento nela).
+    """
+    fields = DETAIL_FIELDS if fields is None else fields
+    invalid_fields = [field for field in fields if field not in DETAIL_FIELDS]
+    if invalid_fields:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalid_fields)}. Opções: {', '.join(DETAIL_FIELDS)}.")
+
+    date_from, date_to = month_window(date_from, date_to)
+    snapshot = data_store.snapshot
+    time_index = snapshot.time_index
+    profiles = snapshot.profiles_by_id
+
+    requested_ids = list(dict.fromkeys(company_ids))
+    found_ids = [company_id for company_id in requested_ids if company_id in profiles.index]
+    not_found_ids = [company_id for company_id in requested_ids if company_id not in profiles.index]
+    sectors = profiles["ds_cnae"].reindex(found_ids).tolist()
+
+    details = {
+        company_id: {"company_id": company_id, "sector": sector}
+        for company_id, sector in zip(found_ids, sectors)
+    }
+
+    if "kpis" in fields or "benchmarking" in fields:
+        selected = snapshot.window_profiles_by_id(date_from, date_to).reindex(found_ids)
+        margins = _optional_floats(selected["margem_media_6m"])
+
+    if "kpis" in fields:
+        moments = selected["momento"].astype(object).where(selected["momento"].notna(), None).tolist()
+        for company_id, moment, margin in zip(found_ids, moments, margins):
+            details[company_id]["kpis"] = {"moment": moment, "average_margin_6m": margin}
+
+    if "benchmarking" in fields:
+        benchmarks = snapshot.window_benchmarks(date_from, date_to)
+        sector_statistics = {
+            sector: {
+                "sector_average_revenue_6m": _sector_statistic(benchmarks, sector, "receita_media_6m"),
+                "sector_median_revenue_6m": _sector_statistic(benchmarks, sector, "receita_media_6m", "median"),
+                "sector_average_margin_6m": _sector_statistic(benchmarks, sector, "margem_media_6m"),
+                "sector_median_margin_6m": _sector_statistic(benchmarks, sector, "margem_media_6m", "median")
+            }
+            for sector in set(sectors)
         }
-    else:
-        history = []
-        cashflow_trends = {"receita": 0, "despesa": 0, "fluxo_liq": 0}
+        revenues = _optional_floats(selected["receita_media_6m"])
+        for company_id, sector, revenue, margin in zip(found_ids, sectors, revenues, margins):
+            statistics = sector_statistics[sector]
+            details[company_id]["benchmarking"] = {
+                "company_average_revenue_6m": revenue,
+                "sector_average_revenue_6m": statistics["sector_average_revenue_6m"],
+                "sector_median_revenue_6m": statistics["sector_median_revenue_6m"],
+                "company_average_margin_6m": margin,
+                "sector_average_margin_6m": statistics["sector_average_margin_6m"],
+                "sector_median_margin_6m": statistics["sector_median_margin_6m"],
+                "sector_percentile_ranks": benchmarks.company_percentiles(company_id)
+            }
+
+    if "history" in fields or "cashflow_trends" in fields:
+        months_df = time_index.companies_months(found_ids, date_from, date_to)
+
+        if "history" in fields:
+            history = months_df[["id", "ano_mes", "receita", "despesa", "fluxo_liq"]].rename(columns={"ano_mes": "date"})
+            history_by_id = {company_id: group.drop(columns="id").to_dict(orient="records") for company_id, group in history.groupby("id", sort=False)}
+            for company_id in found_ids:
+                details[company_id]["history"] = history_by_id.get(company_id, [])
 
-    revenue_mix = (transactions_df[transactions_df["id_rcbe"] == company_id]
-                   .groupby("ds_tran")["vl"].sum().sort_values(ascending=False).reset_index())
-    total_revenue = revenue_mix["vl"].sum()
-    revenue_mix["percentage"] = (revenue_mix["vl"] / total_revenue * 100) if total_revenue > 0 else 0
-    revenue_distribution = revenue_mix.to_dict(orient="records")
+        if "cashflow_trends" in fields:
+            trends = {company_id: {"receita": 0, "despesa": 0, "fluxo_liq": 0} for company_id in found_ids}
+            if not months_df.empty:
+                for column in ("receita", "despesa", "fluxo_liq"):
+                    ids, values, lengths = build_series_matrix(months_df, column)
+                    slopes = LinearTrendModel().fit(values, lengths)["slope"]
+                    for company_id, slope in zip(ids, slopes):
+                        trends[company_id][column] = float(slope)
+            for company_id in found_ids:
+                details[company_id]["cashflow_trends"] = trends[company_id]
 
-    expense_mix = (transactions_df[transactions_df["id_pgto"] == company_id]
-                   .groupby("ds_tran")["vl"].sum().sort_values(ascending=False).reset_index())
-    total_expense = expense_mix["vl"].sum()
-    expense_mix["percentage"] = (expense_mix["vl"] / total_expense * 100) if total_expense > 0 else 0
-    expense_distribution = expense_mix.to_dict(orient="records")
+    if "period_totals" in fields:
+        for company_id in found_ids:
+            details[company_id]["period_totals"] = time_index.company_totals(company_id, date_from, date_to)
+
+    if "revenue_distribution" in fields or "expense_distribution" in fields:
+        for field, id_column in (("revenue_distribution", "id_rcbe"), ("expense_distribution", "id_pgto")):
+            if field not in fields:
+                continue
+            mixes = _transaction_mixes(snapshot, id_column, found_ids, date_from, date_to)
+            for company_id in found_ids:
+                details[company_id][field] = mixes.get(company_id, [])
 
     return {
-        "company_id": company_id,
-        "sector": sector,
-        "kpis": kpis,
-        "benchmarking": benchmarking,
-        "history": history,
-        "cashflow_trends": cashflow_trends,
-        "revenue_distribution": revenue_distribution,
-        "expense_distribution": expense_distribution
+        "companies": [details[company_id] for company_id in found_ids],
+        "not_found": not_found_ids
     }
 
+def _optional_floats(values: pandas.Series):
+    return [None if numpy.isnan(value) else value for value in values.to_numpy(dtype=float).tolist()]
+
+def _sector_statistic(benchmarks, sector, metric, statistic="mean"):
+    # Setor sem empresas com movimento na janela
+    if benchmarks.sector(sector) is None:
+        return None
+    return benchmarks.sector_statistic(sector, metric, statistic)
+
+def _transaction_mixes(snapshot, id_column, company_ids, date_from=None, date_to=None):
+    if snapshot.analytics_db is not None:
+        mix = snapshot.analytics_db.mix_totals(id_column, company_ids, date_from, date_to)
+    else:
+        transactions_df = snapshot.time_index.transactions_between(date_from, date_to)
+        subset = transactions_df[transactions_df[id_column].isin(company_ids)]
+        mix = subset.groupby([id_column, "ds_tran"])["vl"].sum().reset_index()
+    if mix.empty:
+        return {}
+    totals = mix.groupby(id_column)["vl"].transform("sum")
+    mix["percentage"] = numpy.where(totals > 0, mix["vl"] / totals.where(totals > 0, 1) * 100, 0)
+    mix = mix.sort_values([id_column, "vl"], ascending=[True, False])
+    return {company_id: group.drop(columns=id_column).to_dict(orient="records") for company_id, group in mix.groupby(id_column, sort=False)}
+
 def segment_companies_by_moment(monthly_cashflow_df, companies_df):
+    return build_moment_segmentation(monthly_cashflow_df, companies_df)[0]
+
+def build_moment_segmentation(monthly_cashflow_df, companies_df):
     company_profiles = _create_company_profiles(monthly_cashflow_df, companies_df)
-    
-    features_for_model = company_profiles[['idade', 'receita_media_6m', 'despesa_media_6m', 'crescimento_receita_3m', 'margem_media_6m', 'volatilidade_receita']]
-    
-    scaler = StandardScaler()
-    scaled_features = scaler.fit_transform(features_for_model)
-    
-    kmeans_model = KMeans(n_clusters=4, random_state=42, n_init='auto')
-    company_profiles['cluster'] = kmeans_model.fit_predict(scaled_features)
-    
-    cluster_analysis_df = company_profiles.groupby('cluster')[['idade', 'crescimento_receita_3m', 'margem_media_6m', 'receita_media_6m']].mean().sort_values('receita_media_6m').reset_index()
-    
-    cluster_names_map = {
-        cluster_analysis_df.loc[0, 'cluster']: 'Início',
-        cluster_analysis_df.loc[1, 'cluster']: 'Declínio',
-        cluster_analysis_df.loc[2, 'cluster']: 'Crescimento',
-        cluster_analysis_df.loc[3, 'cluster']: 'Maturidade'
-    }
-    
-    company_profiles['momento'] = company_profiles['cluster'].map(cluster_names_map)
-    
-    return company_profiles
+    segmentation = MomentSegmentation(company_profiles)
+    return segmentation.assign(company_profiles), segmentation
+
+class MomentSegmentation:
+    """
+    Scaler e KMeans ajustados na carga completa dos dados. Guardados para atribuir
+    cluster e momento a perfis atualizados sem reajustar o modelo.
+    """
+
+    def __init__(self, company_profiles):
+        features_for_model = company_profiles[PROFILE_FEATURES]
+        
+        self.scaler = lazy_module("sklearn.preprocessing").StandardScaler()
+        scaled_features = self.scaler.fit_transform(features_for_model)
+        
+        self.kmeans_model = lazy_module("sklearn.cluster").KMeans(n_clusters=4, random_state=42, n_init='auto')
+        clusters = self.kmeans_model.fit_predict(scaled_features)
+        
+        cluster_analysis_df = company_profiles.assign(cluster=clusters).groupby('cluster')[['idade', 'crescimento_receita_3m', 'margem_media_6m', 'receita_media_6m']].mean().sort_values('receita_media_6m').reset_index()
+        
+        self.cluster_names_map = {
+            cluster_analysis_df.loc[0, 'cluster']: 'Início',
+            cluster_analysis_df.loc[1, 'cluster']: 'Declínio',
+            cluster_analysis_df.loc[2, 'cluster']: 'Crescimento',
+            cluster_analysis_df.loc[3, 'cluster']: 'Maturidade'
+        }
+
+    def assign(self, company_profiles):
+        if company_profiles.empty:
+            return company_profiles.assign(cluster=pandas.Series(dtype=int), momento=pandas.Series(dtype=object))
+        company_profiles['cluster'] = self.kmeans_model.predict(self.scaler.transform(company_profiles[PROFILE_FEATURES]))
+        company_profiles['momento'] = company_profiles['cluster'].map(self.cluster_names_map)
+        return company_profiles
+
+def build_company_profiles(monthly_cashflow_df, companies_df, segmentation):
+    """
+    Perfil, cluster e momento das empresas presentes em `monthly_cashflow_df`,
+    usando o modelo de segmentação já ajustado (sem refazer o KMeans).
+    """
+    return segmentation.assign(_create_company_profiles(monthly_cashflow_df, companies_df))
 
 def _create_company_profiles(monthly_cashflow_df, companies_df):
     try:
-        financial_profile = monthly_cashflow_df.groupby('id').agg(
-            receita_media_6m=('receita', lambda x: x.tail(6).mean()),
-            despesa_media_6m=('despesa', lambda x: x.tail(6).mean()),
-            crescimento_receita_3m=('receita', lambda x: _calculate_linear_trend(x.tail(3))),
-            margem_media_6m=('margem', lambda x: x.tail(6).mean()),
-            volatilidade_receita=('receita', lambda x: x.tail(6).std())
-        ).reset_index()
+        # Agregações vetorizadas sobre os últimos meses de cada empresa (o resumo está ordenado por id e ano_mes)
+        last_6 = monthly_cashflow_df.groupby('id', sort=False).tail(6)
+        financial_profile = last_6.groupby('id').agg(
+            receita_media_6m=('receita', 'mean'),
+            despesa_media_6m=('despesa', 'mean'),
+            margem_media_6m=('margem', 'mean'),
+            volatilidade_receita=('receita', 'std')
+        )
+        financial_profile.insert(2, 'crescimento_receita_3m', _linear_trends(monthly_cashflow_df.groupby('id', sort=False).tail(3), 'receita'))
+        financial_profile = financial_profile.reset_index()
 
         reference_date = pandas.to_datetime('2024-01-01')
         companies_copy = companies_df.copy()
@@ -129,14 +297,9 @@ def _create_company_profiles(monthly_cashflow_df, companies_df):
         
         return company_profiles_df
 
-    except Exception as e:
-        print(f"\n\n!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        print(f"!!!!!! AN ERROR OCCURRED INSIDE _create_company_profiles !!!!!!")
-        import traceback
-        print("!!!!!! The actual error traceback is:                        !!!!!!")
-        print(traceback.format_exc())
-        print(f"!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!\n\n")
-        raise e
+    except Exception:
+        logger.exception("Erro ao criar os perfis das empresas")
+        raise
 
 def create_monthly_cashflow_summary(transactions_df):
     cashflow_df = transactions_df.copy()
@@ -148,19 +311,18 @@ def create_monthly_cashflow_summary(transactions_df):
     
     monthly_summary = pandas.merge(monthly_revenue, monthly_expenses, on=['id', 'ano_mes'], how='outer').fillna(0)
     
-    monthly_summary['fluxo_liq'] = monthly_summary['receita'] - monthly_summary['despesa']
-    monthly_summary['margem'] = monthly_summary['fluxo_liq'] / monthly_summary['receita'].replace(0, numpy.nan)
-    monthly_summary['margem'] = monthly_summary['margem'].fillna(0)
-    
-    return monthly_summary.sort_values(['id', 'ano_mes'])
+    return add_cashflow_ratios(monthly_summary).sort_values(['id', 'ano_mes'])
 
-def _calculate_linear_trend(series):
-    if len(series) < 2:
-        return 0
-        
-    x = numpy.arange(len(series)).reshape(-1, 1)
-    y = series.values.reshape(-1, 1)
-    
-    model = LinearRegression().fit(x, y)
-    
-    return model.coef_[0][0]
\ No newline at end of file
+def _linear_trends(monthly_cashflow_df, column):
+    """
+    Inclinação da reta de mínimos quadrados de `column` contra o índice do mês,
+    para todas as empresas de uma vez; 0 para séries com menos de dois meses.
+    """
+    ids = monthly_cashflow_df['id']
+    x = monthly_cashflow_df.groupby('id', sort=False).cumcount().astype(float)
+    y = monthly_cashflow_df[column].astype(float)
+    x_centered = x - x.groupby(ids).transform('mean')
+    y_centered = y - y.groupby(ids).transform('mean')
+    numerator = (x_centered * y_centered).groupby(ids).sum()
+    denominator = (x_centered ** 2).groupby(ids).sum()
+    return (numerator / denominator.where(denominator > 0)).fillna(0)
\ No newline at end of file
@@ -0,0 +1,71 @@
+from typing import Dict, Optional, Tuple
+
+import numpy
+import pandas
+
+SORT_METRICS = {
+    "revenue": "receita_media_6m",
+    "margin": "margem_media_6m",
+    "growth": "crescimento_receita_3m",
+    "volatility": "volatilidade_receita",
+    "age": "idade"
+}
+
+
+class CompanySearchIndex:
+    """
+    Índices de ranking sobre os perfis das empresas. Para cada métrica guarda a
+    ordem decrescente global e a ordem dentro de cada setor, calculadas uma vez
+    por snapshot; uma consulta apenas filtra e fatia uma ordem já pronta.
+    """
+
+    def __init__(self, profiles_df: pandas.DataFrame):
+        profiles = profiles_df.drop_duplicates(subset="id").reset_index(drop=True)
+        self.ids = profiles["id"].to_numpy()
+        self.sectors = profiles["ds_cnae"].to_numpy()
+        self.moments = profiles["momento"].to_numpy()
+        self.values = {metric: profiles[metric].to_numpy(dtype=float) for metric in SORT_METRICS.values()}
+
+        self.orders = {metric: numpy.argsort(-values, kind="stable") for metric, values in self.values.items()}
+        self.sector_orders = {}
+        for sector, positions in profiles.groupby("ds_cnae").indices.items():
+            for metric, values in self.values.items():
+                self.sector_orders[(sector, metric)] = positions[numpy.argsort(-values[positions], kind="stable")]
+
+    def search(self, sort_by: str = "revenue", descending: bool = True, sector: Optional[str] = None,
+               moment: Optional[str] = None, ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+               limit: int = 20, offset: int = 0):
+        metric = SORT_METRICS[sort_by]
+        if sector is not None:
+            order = self.sector_orders.get((sector, metric), numpy.array([], dtype=int))
+        else:
+            order = self.orders[metric]
+        if not descending:
+            order = order[::-1]
+
+        mask = None
+        if moment is not None:
+            mask = self.moments[order] == moment
+        for range_metric, (low, high) in (ranges or {}).items():
+            values = self.values[range_metric][order]
+            if low is not None:
+                mask = values >= low if mask is None else mask & (values >= low)
+            if high is not None:
+                mask = values <= high if mask is None else mask & (values <= high)
+        if mask is not None:
+            order = order[mask]
+
+        page = order[offset:offset + limit]
+        return int(len(order)), [self._record(position) for position in page]
+
+    def _record(self, position):
+        return {
+            "id": self.ids[position],
+            "sector": self.sectors[position],
+            "moment": self.moments[position],
+            "age": float(self.values["idade"][position]),
+            "average_revenue_6m": float(self.values["receita_media_6m"][position]),
+            "average_margin_6m": float(self.values["margem_media_6m"][position]),
+            "revenue_growth_3m": float(self.values["crescimento_receita_3m"][position]),
+            "revenue_volatility": float(self.values["volatilidade_receita"][position])
+        }
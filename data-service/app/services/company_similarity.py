@@ -0,0 +1,70 @@
+from typing import Optional
+
+import numpy
+import pandas
+
+from app.core.startup_profile import lazy_module
+
+# Espaço de atributos usado na segmentação (KMeans) e na busca de empresas semelhantes
+PROFILE_FEATURES = ['idade', 'receita_media_6m', 'despesa_media_6m', 'crescimento_receita_3m', 'margem_media_6m', 'volatilidade_receita']
+
+
+class CompanySimilarityIndex:
+    """
+    Vizinhos mais próximos no espaço padronizado da segmentação (mesma escala do
+    StandardScaler usado antes do KMeans). Uma KD-tree global e uma por setor são
+    construídas uma vez por snapshot; cada consulta é uma busca k-NN na árvore.
+    """
+
+    def __init__(self, profiles_df: pandas.DataFrame):
+        spatial = lazy_module("scipy.spatial")
+        profiles = profiles_df.drop_duplicates(subset="id").reset_index(drop=True)
+        self.ids = profiles["id"].to_numpy()
+        self.sectors = profiles["ds_cnae"].to_numpy()
+        self.moments = profiles["momento"].to_numpy()
+        self.positions = {company_id: position for position, company_id in enumerate(self.ids)}
+
+        features = profiles[PROFILE_FEATURES].to_numpy(dtype=float)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+        self.features = numpy.ascontiguousarray((features - features.mean(axis=0)) / scale)
+        self.raw_features = features
+
+        self.tree = spatial.cKDTree(self.features) if len(self.features) else None
+        self.sector_trees = {
+            sector: (positions, spatial.cKDTree(self.features[positions]))
+            for sector, positions in profiles.groupby("ds_cnae").indices.items()
+        }
+
+    def similar(self, company_id: str, k: int = 10, sector: Optional[str] = None):
+        """
+        As `k` empresas mais próximas de `company_id`, opcionalmente restritas a um
+        setor. Retorna None se a empresa não existir.
+        """
+        position = self.positions.get(company_id)
+        if position is None:
+            return None
+        if sector is None:
+            candidates, tree = None, self.tree
+        else:
+            candidates, tree = self.sector_trees.get(sector, (None, None))
+        if tree is None:
+            return []
+
+        distances, neighbours = tree.query(self.features[position], k=min(k + 1, tree.n))
+        distances = numpy.atleast_1d(distances)
+        neighbours = numpy.atleast_1d(neighbours)
+        if candidates is not None:
+            neighbours = candidates[neighbours]
+        keep = neighbours != position
+        return [self._record(neighbour, distance) for neighbour, distance in list(zip(neighbours[keep], distances[keep]))[:k]]
+
+    def _record(self, position, distance):
+        record = {
+            "id": self.ids[position],
+            "sector": self.sectors[position],
+            "moment": self.moments[position],
+            "distance": float(distance)
+        }
+        record.update({feature: float(value) for feature, value in zip(PROFILE_FEATURES, self.raw_features[position])})
+        return record
@@ -1,18 +1,42 @@
+import numpy
 import pandas as pd
+from datetime import date
+from typing import Optional, Tuple
+from fastapi import HTTPException
 from app.services.data_store import data_store
+from app.services.time_index import month_window
+from app.core.tracing import traced
 
+SCATTER_MODES = ("points", "lod")
+SCATTER_GRID_SIZE = 64
+SCATTER_MAX_POINTS = 2000
 
-def get_dashboard_data(sector: str = "Todos os Setores"):
-    profiles_df = data_store.all_companies_profiles
-    companies_df = data_store.companies_df
-    transactions_df = data_store.transactions_df
 
-    filtered_profiles, filtered_transactions, filtered_companies = _filter_by_sector(profiles_df, transactions_df, companies_df, sector)
+@traced("dashboard.build")
+def get_dashboard_data(sector: str = "Todos os Setores", date_from: Optional[date] = None, date_to: Optional[date] = None,
+                       scatter_mode: str = "points", viewport: Optional[Tuple[float, float, float, float]] = None,
+                       grid_size: int = SCATTER_GRID_SIZE, max_points: int = SCATTER_MAX_POINTS):
+    """
+    Com from/to, todas as seções usam a mesma janela, expandida para meses
+    inteiros: perfis (KPIs, momentos, dispersão, maturidade e setores) calculados
+    com os meses da janela, saldo médio dos meses da janela e mix de transações.
+    """
+    if scatter_mode not in SCATTER_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo '{scatter_mode}' inválido. Opções: {', '.join(SCATTER_MODES)}.")
+    date_from, date_to = month_window(date_from, date_to)
+    snapshot = data_store.snapshot
+    profiles_df = snapshot.window_profiles(date_from, date_to)
+    companies_df = _companies_in_window(snapshot.companies_df, date_from, date_to)
+
+    filtered_profiles, filtered_companies = _filter_by_sector(profiles_df, companies_df, sector)
     kpis = _get_kpis(filtered_profiles, filtered_companies)
     moment_distribution = _get_moment_distribution(filtered_profiles)
-    clusters = _get_clusters(filtered_profiles)
+    if scatter_mode == "lod":
+        clusters = _get_scatter_lod(filtered_profiles, viewport, grid_size, max_points)
+    else:
+        clusters = _get_clusters(filtered_profiles)
     maturity_analysis = _get_maturity_analysis(filtered_profiles)
-    transaction_analysis = _get_transaction_analysis(filtered_transactions)
+    transaction_analysis = _get_transaction_analysis(_transaction_type_totals(snapshot, filtered_profiles, sector, date_from, date_to))
     sector_analysis = _get_sector_analysis(profiles_df)
 
     return {
@@ -27,14 +51,29 @@ def get_dashboard_data(sector: str = "Todos os Setores"):
 def _get_sector_list(profiles_df):
     return sorted(profiles_df['ds_cnae'].unique())
 
-def _filter_by_sector(profiles_df, transactions_df, companies_df, sector):
+def _filter_by_sector(profiles_df, companies_df, sector):
     if sector == "Todos os Setores":
-        return profiles_df, transactions_df, companies_df
+        return profiles_df, companies_df
     filtered_profiles = profiles_df[profiles_df['ds_cnae'] == sector]
     ids_in_sector = filtered_profiles['id'].unique()
-    filtered_transactions = transactions_df[(transactions_df['id_pgto'].isin(ids_in_sector)) | (transactions_df['id_rcbe'].isin(ids_in_sector))]
     filtered_companies = companies_df[companies_df['id'].isin(ids_in_sector)]
-    return filtered_profiles, filtered_transactions, filtered_companies
+    return filtered_profiles, filtered_companies
+
+def _companies_in_window(companies_df, date_from, date_to):
+    if date_from is not None:
+        companies_df = companies_df[companies_df['dt_refe'] >= pd.Timestamp(date_from)]
+    if date_to is not None:
+        companies_df = companies_df[companies_df['dt_refe'] <= pd.Timestamp(date_to)]
+    return companies_df
+
+def _transaction_type_totals(snapshot, filtered_profiles, sector, date_from, date_to):
+    ids_in_sector = None if sector == "Todos os Setores" else filtered_profiles['id'].unique()
+    if snapshot.analytics_db is not None:
+        return snapshot.analytics_db.type_totals(date_from, date_to, ids_in_sector)
+    transactions_df = snapshot.time_index.transactions_between(date_from, date_to)
+    if ids_in_sector is not None:
+        transactions_df = transactions_df[(transactions_df['id_pgto'].isin(ids_in_sector)) | (transactions_df['id_rcbe'].isin(ids_in_sector))]
+    return transactions_df.groupby('ds_tran')['vl'].sum()
 
 def _get_kpis(filtered_profiles, filtered_companies):
     total_companies = int(filtered_profiles['id'].nunique())
@@ -76,6 +115,66 @@ def _get_clusters(filtered_profiles):
             })
     return clusters
 
+def _symlog(values):
+    return numpy.sign(values) * numpy.log10(1 + numpy.abs(values))
+
+def _inverse_symlog(values):
+    return numpy.sign(values) * (10 ** numpy.abs(values) - 1)
+
+def _get_scatter_lod(filtered_profiles, viewport, grid_size, max_points):
+    """
+    Nível de detalhe do gráfico receita x despesa. Sem viewport, ou com mais
+    empresas no viewport do que `max_points`, devolve contagens por célula de uma
+    grade em escala log (com a quebra por momento); dentro de um viewport pequeno o
+    bastante, devolve os pontos. O tamanho da resposta fica limitado por
+    grid_size² células ou max_points pontos, qualquer que seja o número de empresas.
+    """
+    x = filtered_profiles['receita_media_6m'].to_numpy(dtype=float)
+    y = filtered_profiles['despesa_media_6m'].to_numpy(dtype=float)
+    inside = numpy.ones(len(x), dtype=bool)
+    if viewport is not None:
+        x_min, x_max, y_min, y_max = viewport
+        inside = (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+    total = int(inside.sum())
+
+    if viewport is not None and total <= max_points:
+        return {"mode": "points", "total": total, "points": _get_clusters(filtered_profiles[inside])}
+
+    moments = filtered_profiles['momento'].to_numpy()[inside]
+    log_x = _symlog(x[inside])
+    log_y = _symlog(y[inside])
+    if viewport is not None:
+        x_range = _symlog(numpy.array([viewport[0], viewport[1]], dtype=float))
+        y_range = _symlog(numpy.array([viewport[2], viewport[3]], dtype=float))
+    elif total:
+        x_range = numpy.array([log_x.min(), log_x.max()])
+        y_range = numpy.array([log_y.min(), log_y.max()])
+    else:
+        return {"mode": "bins", "total": 0, "grid_size": grid_size, "bins": []}
+
+    x_step = max(x_range[1] - x_range[0], 1e-12) / grid_size
+    y_step = max(y_range[1] - y_range[0], 1e-12) / grid_size
+    column = numpy.clip(((log_x - x_range[0]) / x_step).astype(int), 0, grid_size - 1)
+    row = numpy.clip(((log_y - y_range[0]) / y_step).astype(int), 0, grid_size - 1)
+    moment_codes, moment_names = pd.factorize(moments)
+    cell_counts = numpy.bincount((row * grid_size + column) * len(moment_names) + moment_codes,
+                                 minlength=grid_size * grid_size * max(len(moment_names), 1))
+    cell_counts = cell_counts.reshape(grid_size * grid_size, max(len(moment_names), 1))
+
+    bins = []
+    for cell in numpy.flatnonzero(cell_counts.sum(axis=1)):
+        cell_row, cell_column = divmod(int(cell), grid_size)
+        x_edges = _inverse_symlog(x_range[0] + numpy.array([cell_column, cell_column + 1]) * x_step)
+        y_edges = _inverse_symlog(y_range[0] + numpy.array([cell_row, cell_row + 1]) * y_step)
+        counts = cell_counts[cell]
+        bins.append({
+            "revenue_range": [float(x_edges[0]), float(x_edges[1])],
+            "expense_range": [float(y_edges[0]), float(y_edges[1])],
+            "count": int(counts.sum()),
+            "moments": {str(name): int(count) for name, count in zip(moment_names, counts) if count}
+        })
+    return {"mode": "bins", "total": total, "grid_size": grid_size, "bins": bins}
+
 def _get_maturity_analysis(filtered_profiles):
     maturity_analysis = []
     if not filtered_profiles.empty:
@@ -91,10 +190,10 @@ def _get_maturity_analysis(filtered_profiles):
             })
     return maturity_analysis
 
-def _get_transaction_analysis(filtered_transactions):
+def _get_transaction_analysis(type_totals):
     transaction_analysis = []
-    if not filtered_transactions.empty:
-        transactions_df = filtered_transactions.groupby('ds_tran')['vl'].sum().reset_index().sort_values('vl', ascending=False)
+    if not type_totals.empty:
+        transactions_df = type_totals.rename('vl').reset_index().sort_values('vl', ascending=False)
         for _, row in transactions_df.iterrows():
             transaction_analysis.append({
                 "transaction_type": row['ds_tran'],
@@ -1,29 +1,404 @@
+import logging
+import threading
+from datetime import date
 from typing import Optional
-from app.utils.excel_loader import load_companies_data, load_industries_data, load_transactions_data
 
+import numpy
 import pandas
 
+from app.core.config import ANALYTICS_BACKEND, DATA_SOURCE_FORMAT, COMPANIES_SOURCE_PATH, TRANSACTIONS_SOURCE_PATH
+from app.utils.excel_loader import load_industries_data, COMPANIES_COLUMNS, COMPANIES_DTYPES
+from app.utils.file_loader import load_source_data, load_file_columns
+from app.services.time_index import TimeIndex
+from app.services.sector_benchmarks import SectorBenchmarks
+from app.services.company_search import CompanySearchIndex
+from app.services.company_similarity import CompanySimilarityIndex
+from app.services.anomaly_index import AnomalyIndex
+from app.core.startup_profile import startup_profile
+from app.core.tracing import request_trace, span
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_HASH_COLUMNS = ['id', 'ano_mes', 'receita', 'despesa']
+# Janelas (from/to) com perfis e benchmarks guardados por versão do snapshot
+WINDOW_CACHE_SIZE = 16
+
+
+def _content_hash(frame: pandas.DataFrame):
+    """
+    Soma (módulo 2^64) do hash de cada linha: não depende da ordem das linhas e
+    pode ser atualizada subtraindo as linhas antigas e somando as novas.
+    """
+    if frame.empty:
+        return 0
+    floats = frame.select_dtypes('float').columns
+    if len(floats):
+        frame = frame.assign(**{column: frame[column].round(2) for column in floats})
+    return int(pandas.util.hash_pandas_object(frame, index=False).to_numpy().sum(dtype=numpy.uint64))
+
+
+class ProfileTable:
+    """
+    Perfis das empresas: um frame base mais os perfis recalculados pelas
+    inclusões seguintes. Imutável: o frame completo é montado sob demanda e
+    `compacted` devolve uma tabela que o tem como base.
+    """
+
+    def __init__(self, base: pandas.DataFrame, updates: Optional[pandas.DataFrame] = None):
+        self._state = (base, updates)
+
+    def updated(self, profiles: pandas.DataFrame):
+        base, updates = self._state
+        if updates is not None:
+            profiles = pandas.concat([updates[~updates['id'].isin(profiles['id'])], profiles], ignore_index=True)
+        return ProfileTable(base, profiles)
+
+    def frame(self):
+        base, updates = self._state
+        if updates is None:
+            return base
+        frame = pandas.concat([base[~base['id'].isin(updates['id'])], updates], ignore_index=True)
+        return frame.sort_values('id', kind='stable').reset_index(drop=True)
+
+    def compacted(self):
+        return self if self._state[1] is None else ProfileTable(self.frame())
+
+
+class SnapshotIndexes:
+    """
+    Estruturas derivadas dos perfis e do resumo completo, construídas para uma versão do snapshot.
+    """
+
+    def __init__(self, version, sector_benchmarks, company_search, company_similarity, anomalies):
+        self.version = version
+        self.sector_benchmarks = sector_benchmarks
+        self.company_search = company_search
+        self.company_similarity = company_similarity
+        self.anomalies = anomalies
+
+
+class Snapshot:
+    """
+    Estado dos dados em um instante. O DataStore publica um snapshot novo com uma
+    única atribuição; quem precisa de vários campos coerentes entre si lê
+    `data_store.snapshot` uma vez e usa só esse objeto.
+
+    Após uma inclusão de transações, os índices derivados (benchmarks, busca,
+    similaridade e anomalias) continuam os da versão anterior até serem
+    reconstruídos em segundo plano (`indexes_stale`).
+
+    Perfis e benchmarks de uma janela de datas são calculados na primeira
+    consulta e guardados neste snapshot (`window_profiles`, `window_benchmarks`),
+    assim como os demais dados derivados sob demanda (`derived`).
+    """
+
+    def __init__(self, companies_df, industries_df, time_index, profiles, moment_segmentation,
+                 companies_hash, summary_hash, analytics_db=None, indexes=None):
+        self.companies_df = companies_df
+        self.industries_df = industries_df
+        self.time_index = time_index
+        self.profiles = profiles
+        self.moment_segmentation = moment_segmentation
+        self.companies_hash = companies_hash
+        self.summary_hash = summary_hash
+        # Preenchido apenas com ANALYTICS_BACKEND=duckdb; nesse caso transactions_df fica vazio
+        self.analytics_db = analytics_db
+        self.indexes = indexes
+        # Linhas de cada empresa na base de empresas (as inclusões não a alteram)
+        self.company_rows = companies_df.groupby('id').indices
+        self._windows = {}
+        self._windows_lock = threading.Lock()
+        self._derived = {}
+        self._derived_locks = {}
+
+    def replace(self, **changes):
+        snapshot = Snapshot.__new__(Snapshot)
+        snapshot.__dict__.update(self.__dict__, **changes)
+        snapshot._windows = {}
+        snapshot._windows_lock = threading.Lock()
+        snapshot._derived = {}
+        snapshot._derived_locks = {}
+        return snapshot
+
+    def derived(self, key, build):
+        """
+        Valor calculado por `build(snapshot)` na primeira consulta e guardado neste
+        snapshot. Consultas simultâneas à mesma chave aguardam um único cálculo.
+        """
+        value = self._derived.get(key)
+        if value is not None:
+            return value
+        with self._windows_lock:
+            lock = self._derived_locks.setdefault(key, threading.Lock())
+        with lock:
+            value = self._derived.get(key)
+            if value is None:
+                value = self._derived[key] = build(self)
+        return value
+
+    @property
+    def snapshot_version(self):
+        # Identifica o conteúdo (empresas e resumo mensal); igual entre processos que carregam os mesmos dados
+        return f"{self.companies_hash:016x}{self.summary_hash:016x}"
+
+    @property
+    def indexes_stale(self):
+        return self.indexes is None or self.indexes.version != self.snapshot_version
+
+    @property
+    def transactions_df(self):
+        return self.time_index.transactions_df
+
+    @property
+    def monthly_cashflow_summary(self):
+        return self.time_index.monthly_cashflow_summary
+
+    @property
+    def all_companies_profiles(self):
+        return self.derived("profiles", lambda snapshot: snapshot.profiles.frame())
+
+    @property
+    def profiles_by_id(self):
+        return self.derived("profiles_by_id", lambda snapshot: _profiles_by_id(snapshot.all_companies_profiles))
+
+    @property
+    def sector_benchmarks(self):
+        return self.indexes.sector_benchmarks
+
+    @property
+    def company_search(self):
+        return self.indexes.company_search
+
+    @property
+    def company_similarity(self):
+        return self.indexes.company_similarity
+
+    @property
+    def anomalies(self):
+        return self.indexes.anomalies
+
+    def window_profiles(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        """
+        Perfis calculados só com os meses da janela (as médias de 6 meses são dos
+        últimos 6 meses da janela), com o momento atribuído pelo modelo já ajustado.
+        Empresas sem movimento na janela ficam de fora.
+        """
+        if date_from is None and date_to is None:
+            return self.all_companies_profiles
+        return self._window(date_from, date_to)["profiles"]
+
+    def window_profiles_by_id(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        """
+        Mesmos perfis de `window_profiles`, indexados por id.
+        """
+        if date_from is None and date_to is None:
+            return self.profiles_by_id
+        window = self._window(date_from, date_to)
+        if window.get("profiles_by_id") is None:
+            window["profiles_by_id"] = _profiles_by_id(window["profiles"])
+        return window["profiles_by_id"]
+
+    def window_benchmarks(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        if date_from is None and date_to is None:
+            return self.sector_benchmarks
+        window = self._window(date_from, date_to)
+        if window.get("benchmarks") is None:
+            window["benchmarks"] = SectorBenchmarks(window["profiles"])
+        return window["benchmarks"]
+
+    def _window(self, date_from, date_to):
+        key = (date_from, date_to)
+        window = self._windows.get(key)
+        if window is not None:
+            return window
+        from app.services.companies_service import build_company_profiles
+        with span("snapshot.window_profiles"):
+            months = self.time_index.months_between(date_from, date_to)
+            window = {"profiles": build_company_profiles(months, self.companies_df, self.moment_segmentation)}
+        with self._windows_lock:
+            while len(self._windows) >= WINDOW_CACHE_SIZE:
+                self._windows.pop(next(iter(self._windows)))
+            return self._windows.setdefault(key, window)
+
+    def companies_rows(self, company_ids):
+        positions = [self.company_rows[company_id] for company_id in company_ids if company_id in self.company_rows]
+        return self.companies_df.iloc[numpy.concatenate(positions) if positions else []]
+
+
+def _profiles_by_id(profiles: pandas.DataFrame):
+    return profiles.drop_duplicates(subset="id").set_index("id")
+
+
+def _snapshot_field(name):
+    return property(lambda self: getattr(self.snapshot, name) if self.snapshot is not None else None)
+
+
 class DataStore:
+    companies_df = _snapshot_field("companies_df")
+    industries_df = _snapshot_field("industries_df")
+    transactions_df = _snapshot_field("transactions_df")
+    monthly_cashflow_summary = _snapshot_field("monthly_cashflow_summary")
+    all_companies_profiles = _snapshot_field("all_companies_profiles")
+    time_index = _snapshot_field("time_index")
+    sector_benchmarks = _snapshot_field("sector_benchmarks")
+    company_search = _snapshot_field("company_search")
+    company_similarity = _snapshot_field("company_similarity")
+    anomalies = _snapshot_field("anomalies")
+    moment_segmentation = _snapshot_field("moment_segmentation")
+    snapshot_version = _snapshot_field("snapshot_version")
+    analytics_db = _snapshot_field("analytics_db")
+
     def __init__(self):
-        self.companies_df: Optional[pandas.DataFrame] = None
-        self.industries_df: Optional[pandas.DataFrame] = None
-        self.transactions_df: Optional[pandas.DataFrame] = None
-        self.monthly_cashflow_summary: Optional[pandas.DataFrame] = None
-        self.all_companies_profiles: Optional[pandas.DataFrame] = None
+        self.snapshot: Optional[Snapshot] = None
+        self._append_lock = threading.Lock()
+        self._refreshing = False
     
     def initialize_data(self):
-        from app.services.companies_service import create_monthly_cashflow_summary, segment_companies_by_moment
-        companies_df = load_companies_data()
-        industries_df = load_industries_data()
-        transactions_df = load_transactions_data()
-        monthly_cashflow_summary = create_monthly_cashflow_summary(transactions_df)
-        all_company_profiles = segment_companies_by_moment(monthly_cashflow_summary, companies_df)
-        self.companies_df = companies_df
-        self.industries_df = industries_df
-        self.transactions_df = transactions_df
-        self.monthly_cashflow_summary = monthly_cashflow_summary
-        self.all_companies_profiles = all_company_profiles
+        if ANALYTICS_BACKEND == "duckdb":
+            self._initialize_out_of_core()
+            return
+        with startup_profile.stage("load_source_data"):
+            companies_df, industries_df, transactions_df = load_source_data()
+        self.load_frames(companies_df, transactions_df, industries_df)
+
+    def is_loaded(self):
+        return self.snapshot is not None
+
+    def _initialize_out_of_core(self):
+        """
+        Modo DuckDB: apenas empresas e o resumo mensal ficam em memória; as
+        transações continuam nos arquivos e são consultadas sob demanda.
+        """
+        from app.services.duckdb_store import DuckDBTransactions
+        if DATA_SOURCE_FORMAT not in ("csv", "parquet"):
+            raise ValueError("ANALYTICS_BACKEND=duckdb requires DATA_SOURCE_FORMAT to be 'csv' or 'parquet'.")
+        with startup_profile.stage("load_companies"):
+            companies_df = load_file_columns(COMPANIES_SOURCE_PATH, DATA_SOURCE_FORMAT, COMPANIES_COLUMNS, COMPANIES_DTYPES)
+        with startup_profile.stage("open_duckdb_transactions"):
+            analytics_db = DuckDBTransactions(TRANSACTIONS_SOURCE_PATH, DATA_SOURCE_FORMAT)
+        with startup_profile.stage("create_monthly_cashflow_summary"):
+            monthly_cashflow_summary = analytics_db.monthly_cashflow_summary()
+        transactions_df = pandas.DataFrame({
+            "id_pgto": pandas.Series(dtype=object), "id_rcbe": pandas.Series(dtype=object), "vl": pandas.Series(dtype=float),
+            "dt_refe": pandas.Series(dtype="datetime64[ns]"), "ds_tran": pandas.Series(dtype=object)
+        })
+        self._set_snapshot(companies_df, transactions_df, monthly_cashflow_summary, analytics_db=analytics_db)
+
+    def load_frames(self, companies_df, transactions_df, industries_df=None):
+        """
+        Calcula os dados derivados a partir de frames já carregados (planilha,
+        outras fontes ou dados sintéticos) e substitui o snapshot atual.
+        """
+        from app.services.companies_service import create_monthly_cashflow_summary
+        with startup_profile.stage("sort_transactions"):
+            transactions_df = transactions_df.sort_values('dt_refe', kind='stable').reset_index(drop=True)
+        with startup_profile.stage("create_monthly_cashflow_summary"):
+            monthly_cashflow_summary = create_monthly_cashflow_summary(transactions_df).reset_index(drop=True)
+        self._set_snapshot(companies_df, transactions_df, monthly_cashflow_summary, industries_df)
+
+    def _set_snapshot(self, companies_df, transactions_df, monthly_cashflow_summary, industries_df=None, analytics_db=None):
+        from app.services.companies_service import build_moment_segmentation
+        if industries_df is None:
+            industries_df = load_industries_data(companies_df)
+        with startup_profile.stage("segment_companies_by_moment"):
+            all_company_profiles, moment_segmentation = build_moment_segmentation(monthly_cashflow_summary, companies_df)
+        with startup_profile.stage("build_time_index"):
+            time_index = TimeIndex(transactions_df, monthly_cashflow_summary)
+        with startup_profile.stage("hash_snapshot"):
+            companies_hash = _content_hash(companies_df)
+            summary_hash = _content_hash(monthly_cashflow_summary[SUMMARY_HASH_COLUMNS])
+        snapshot = Snapshot(companies_df, industries_df, time_index, ProfileTable(all_company_profiles), moment_segmentation,
+                            companies_hash, summary_hash, analytics_db)
+        snapshot.indexes = _build_indexes(snapshot)
+        with self._append_lock:
+            self.snapshot = snapshot
+
+    def append_transactions(self, new_transactions_df):
+        """
+        Acrescenta transações ao snapshot atual com custo proporcional às linhas
+        novas: as transações e as células (id, ano_mes) afetadas entram como runs
+        novos do TimeIndex, e perfil, cluster e momento são recalculados só para as
+        empresas envolvidas, pelo modelo já ajustado. O novo snapshot é publicado
+        de uma vez; os índices derivados são reconstruídos em segundo plano.
+        Retorna os ids afetados.
+        """
+        from app.services.companies_service import create_monthly_cashflow_summary, build_company_profiles
+        with span("data_store.append_transactions", rows=len(new_transactions_df)) as current, self._append_lock:
+            snapshot = self.snapshot
+            monthly_delta = create_monthly_cashflow_summary(new_transactions_df)
+            affected_ids = monthly_delta['id'].unique()
+            time_index = snapshot.time_index.appended(new_transactions_df, monthly_delta)
+
+            previous_months = snapshot.time_index.companies_months(affected_ids)
+            affected_months = time_index.companies_months(affected_ids)
+            updated_profiles = build_company_profiles(affected_months, snapshot.companies_rows(affected_ids), snapshot.moment_segmentation)
+            summary_hash = (snapshot.summary_hash - _content_hash(previous_months[SUMMARY_HASH_COLUMNS])
+                            + _content_hash(affected_months[SUMMARY_HASH_COLUMNS])) % 2 ** 64
+
+            self.snapshot = snapshot.replace(time_index=time_index, profiles=snapshot.profiles.updated(updated_profiles), summary_hash=summary_hash)
+            self._schedule_index_refresh()
+            current.set(affected_companies=len(affected_ids))
+            return affected_ids
+
+    def transactions_between(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        snapshot = self.snapshot
+        backend = "duckdb" if snapshot.analytics_db is not None else "pandas"
+        with span("data_store.transactions_between", backend=backend) as current:
+            if snapshot.analytics_db is not None:
+                transactions_df = snapshot.analytics_db.transactions_between(date_from, date_to)
+            else:
+                transactions_df = snapshot.time_index.transactions_between(date_from, date_to)
+            current.set(rows=len(transactions_df))
+            return transactions_df
+
+    def _schedule_index_refresh(self):
+        # Chamado com _append_lock; no máximo uma reconstrução em andamento
+        if not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh_indexes, name="snapshot-index-refresh", daemon=True).start()
+
+    def _refresh_indexes(self):
+        """
+        Compacta os runs e os perfis do snapshot atual e reconstrói os índices
+        derivados fora do caminho das requisições. O resultado tem o mesmo
+        conteúdo e só é publicado se nenhuma outra inclusão tiver publicado um
+        snapshot nesse meio tempo; se tiver, repete para o mais recente.
+        """
+        with request_trace("index-refresh"):
+            while True:
+                snapshot = self.snapshot
+                try:
+                    refreshed = snapshot.replace(time_index=snapshot.time_index.compacted(), profiles=snapshot.profiles.compacted())
+                    if refreshed.indexes_stale:
+                        refreshed.indexes = _build_indexes(refreshed)
+                except Exception:
+                    logger.exception("Erro ao reconstruir os índices do snapshot")
+                    with self._append_lock:
+                        self._refreshing = False
+                    return
+                with self._append_lock:
+                    if self.snapshot is snapshot:
+                        # Mesmo conteúdo: os dados derivados já calculados continuam válidos
+                        for key, value in list(snapshot._derived.items()):
+                            refreshed._derived.setdefault(key, value)
+                        self.snapshot = refreshed
+                        self._refreshing = False
+                        return
+
+
+def _build_indexes(snapshot: Snapshot):
+    """
+    Estruturas derivadas de cada versão do snapshot.
+    """
+    profiles = snapshot.all_companies_profiles
+    with startup_profile.stage("build_sector_benchmarks"):
+        sector_benchmarks = SectorBenchmarks(profiles)
+    with startup_profile.stage("build_company_search"):
+        company_search = CompanySearchIndex(profiles)
+    with startup_profile.stage("build_company_similarity"):
+        company_similarity = CompanySimilarityIndex(profiles)
+    with startup_profile.stage("build_anomaly_index"):
+        anomalies = AnomalyIndex(snapshot.monthly_cashflow_summary)
+    return SnapshotIndexes(snapshot.snapshot_version, sector_benchmarks, company_search, company_similarity, anomalies)
 
 data_store = DataStore()
-    
-    
\ No newline at end of file
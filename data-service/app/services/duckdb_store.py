@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from typing import Optional
+
+import pandas
+
+from app.core.config import CSV_SEPARATOR, DUCKDB_MEMORY_LIMIT, DUCKDB_THREADS, DUCKDB_TEMP_DIRECTORY
+from app.core.startup_profile import lazy_module
+
+TRANSACTIONS_VIEW = "transacoes"
+
+
+def _sql_literal(value: str):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class DuckDBTransactions:
+    """
+    Transações consultadas direto dos arquivos CSV/Parquet pelo DuckDB, sem
+    carregá-las na memória do processo. Filtros de período e de empresas e as
+    agregações são executados pelo banco; só os resultados voltam como DataFrame.
+    O consumo de memória do DuckDB é limitado por DUCKDB_MEMORY_LIMIT, com
+    transbordo para disco em DUCKDB_TEMP_DIRECTORY.
+    """
+
+    def __init__(self, file_path: str, file_format: str):
+        duckdb = lazy_module("duckdb")
+        self.file_path = file_path
+        self.connection = duckdb.connect(config={
+            "memory_limit": DUCKDB_MEMORY_LIMIT,
+            "threads": DUCKDB_THREADS,
+            "temp_directory": DUCKDB_TEMP_DIRECTORY
+        })
+        if file_format == "parquet":
+            source = f"read_parquet({_sql_literal(file_path)})"
+        else:
+            source = f"read_csv({_sql_literal(file_path)}, header=true, delim={_sql_literal(CSV_SEPARATOR)}, all_varchar=true)"
+        self.connection.execute(f"""
+            CREATE VIEW {TRANSACTIONS_VIEW} AS
+            SELECT CAST(id_pgto AS VARCHAR) AS id_pgto, CAST(id_rcbe AS VARCHAR) AS id_rcbe,
+                   CAST(vl AS DOUBLE) AS vl, CAST(dt_refe AS TIMESTAMP) AS dt_refe, CAST(ds_tran AS VARCHAR) AS ds_tran
+            FROM {source}
+        """)
+
+    def _execute(self, sql: str, parameters=None):
+        # Um cursor por chamada: cursores do DuckDB podem ser usados em threads diferentes
+        return self.connection.cursor().execute(sql, parameters or [])
+
+    def _window(self, date_from: Optional[date], date_to: Optional[date], company_ids=None, id_columns=()):
+        conditions, parameters = [], []
+        if date_from is not None:
+            conditions.append("dt_refe >= ?")
+            parameters.append(pandas.Timestamp(date_from).to_pydatetime())
+        if date_to is not None:
+            conditions.append("dt_refe < ?")
+            parameters.append(pandas.Timestamp(date_to + timedelta(days=1)).to_pydatetime())
+        if company_ids is not None:
+            ids = [str(company_id) for company_id in company_ids]
+            conditions.append("(" + " OR ".join(f"{column} IN (SELECT UNNEST(CAST(? AS VARCHAR[])))" for column in id_columns) + ")")
+            parameters.extend([ids] * len(id_columns))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, parameters
+
+    def count(self):
+        return int(self._execute(f"SELECT COUNT(*) FROM {TRANSACTIONS_VIEW}").fetchone()[0])
+
+    def monthly_cashflow_summary(self):
+        """
+        Mesmo resultado de `create_monthly_cashflow_summary`, agregado pelo DuckDB.
+        """
+        return self._execute(f"""
+            WITH receitas AS (
+                SELECT id_rcbe AS id, strftime(dt_refe, '%Y-%m') AS ano_mes, COALESCE(SUM(vl), 0) AS receita
+                FROM {TRANSACTIONS_VIEW} WHERE id_rcbe IS NOT NULL GROUP BY 1, 2
+            ), despesas AS (
+                SELECT id_pgto AS id, strftime(dt_refe, '%Y-%m') AS ano_mes, COALESCE(SUM(vl), 0) AS despesa
+                FROM {TRANSACTIONS_VIEW} WHERE id_pgto IS NOT NULL GROUP BY 1, 2
+            ), mensal AS (
+                SELECT COALESCE(r.id, d.id) AS id, COALESCE(r.ano_mes, d.ano_mes) AS ano_mes,
+                       COALESCE(r.receita, 0) AS receita, COALESCE(d.despesa, 0) AS despesa
+                FROM receitas r FULL OUTER JOIN despesas d ON r.id = d.id AND r.ano_mes = d.ano_mes
+            )
+            SELECT id, ano_mes, receita, despesa, receita - despesa AS fluxo_liq,
+                   CASE WHEN receita = 0 THEN 0 ELSE (receita - despesa) / receita END AS margem
+            FROM mensal
+            ORDER BY id, ano_mes
+        """).df()
+
+    def transactions_between(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        where, parameters = self._window(date_from, date_to)
+        return self._execute(f"SELECT * FROM {TRANSACTIONS_VIEW} {where} ORDER BY dt_refe", parameters).df()
+
+    def mix_totals(self, id_column: str, company_ids, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        """
+        Valor por empresa e tipo de transação, com as colunas (id_column, ds_tran, vl).
+        """
+        where, parameters = self._window(date_from, date_to, company_ids, (id_column,))
+        return self._execute(
+            f"SELECT {id_column}, ds_tran, SUM(vl) AS vl FROM {TRANSACTIONS_VIEW} {where} GROUP BY 1, 2", parameters
+        ).df()
+
+    def type_totals(self, date_from: Optional[date] = None, date_to: Optional[date] = None, company_ids=None):
+        """
+        Valor por tipo de transação; com `company_ids`, conta transações em que
+        qualquer das empresas é pagadora ou recebedora.
+        """
+        where, parameters = self._window(date_from, date_to, company_ids, ("id_pgto", "id_rcbe"))
+        totals = self._execute(f"SELECT ds_tran, SUM(vl) AS vl FROM {TRANSACTIONS_VIEW} {where} GROUP BY 1", parameters).df()
+        return totals.set_index("ds_tran")["vl"]
+
+    def edge_totals(self):
+        """
+        Arestas agregadas por par (pagador, recebedor), em arrays.
+        """
+        edges = self._execute(f"""
+            SELECT id_pgto, id_rcbe, COALESCE(SUM(vl), 0) AS vl FROM {TRANSACTIONS_VIEW}
+            WHERE id_pgto IS NOT NULL AND id_rcbe IS NOT NULL GROUP BY 1, 2
+        """).df()
+        return edges["id_pgto"].to_numpy(dtype=object), edges["id_rcbe"].to_numpy(dtype=object), edges["vl"].to_numpy(dtype=float)
+
+    def node_ids(self):
+        ids = self._execute(f"SELECT id_pgto FROM {TRANSACTIONS_VIEW} UNION SELECT id_rcbe FROM {TRANSACTIONS_VIEW}").df()
+        return ids.iloc[:, 0].dropna().to_numpy(dtype=object)
+
+    def iter_edges(self, chunk_size: int):
+        """
+        Transações em blocos de tuplas (source, target, value, type, data ISO), no
+        mesmo formato de `graph_service.iter_edges`.
+        """
+        cursor = self._execute(f"""
+            SELECT id_pgto, id_rcbe, vl, ds_tran, strftime(dt_refe, '%Y-%m-%d') FROM {TRANSACTIONS_VIEW}
+        """)
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,218 @@
+import time
+from typing import Optional
+
+import numpy
+import pandas
+from fastapi import HTTPException
+
+from app.core.config import ECOSYSTEM_EDGE_SOURCE, ECOSYSTEM_PAGERANK_BUDGET_SECONDS, ECOSYSTEM_COMMUNITIES_BUDGET_SECONDS, GRAPH_EXPORT_CHUNK_SIZE
+from app.core.startup_profile import lazy_module
+from app.core.tracing import span, traced
+from app.services.data_store import data_store
+from app.services.graph_service import graph_service
+
+EDGE_SOURCES = ("datastore", "neo4j")
+
+
+def load_edge_arrays(source: str = ECOSYSTEM_EDGE_SOURCE, limit: Optional[int] = None, snapshot=None):
+    """
+    Devolve as arestas como arrays (source, target, weight). Com `limit`, usa apenas
+    as maiores arestas por valor vindas do Neo4j, como o resumo fazia originalmente.
+    Da fonte "datastore" vêm já agregadas por par (pagador, recebedor).
+    """
+    if limit is not None:
+        edges = graph_service.get_edges(limit)
+        return (numpy.array([edge["source"] for edge in edges], dtype=object),
+                numpy.array([edge["target"] for edge in edges], dtype=object),
+                numpy.array([edge["value"] or 0.0 for edge in edges], dtype=float))
+    if source == "datastore":
+        snapshot = snapshot or data_store.snapshot
+        if snapshot.analytics_db is not None:
+            return snapshot.analytics_db.edge_totals()
+        return _pair_totals(snapshot.time_index.transaction_runs())
+    if source == "neo4j":
+        sources, targets, weights = [], [], []
+        for chunk in graph_service.iter_edges(GRAPH_EXPORT_CHUNK_SIZE):
+            columns = list(zip(*chunk))
+            sources.append(numpy.array(columns[0], dtype=object))
+            targets.append(numpy.array(columns[1], dtype=object))
+            weights.append(numpy.array([value or 0.0 for value in columns[2]], dtype=float))
+        if not sources:
+            return numpy.array([], dtype=object), numpy.array([], dtype=object), numpy.array([], dtype=float)
+        return numpy.concatenate(sources), numpy.concatenate(targets), numpy.concatenate(weights)
+    raise HTTPException(status_code=400, detail=f"Fonte '{source}' inválida. Opções: {', '.join(EDGE_SOURCES)}.")
+
+
+def _pair_totals(runs):
+    """
+    Soma o valor por par (pagador, recebedor) em cada run e depois entre os runs,
+    para que o CSR seja montado a partir das relações e não de cada transação.
+    """
+    parts = [run.groupby(["id_pgto", "id_rcbe"], sort=False)["vl"].sum() for run in runs]
+    totals = parts[0] if len(parts) == 1 else pandas.concat(parts).groupby(level=[0, 1], sort=False).sum()
+    return (totals.index.get_level_values(0).to_numpy(dtype=object), totals.index.get_level_values(1).to_numpy(dtype=object),
+            totals.to_numpy(dtype=float))
+
+
+def build_adjacency(sources, targets, weights):
+    """
+    Matriz de adjacência CSR dirigida (pagador -> recebedor), somando o valor de
+    arestas repetidas entre o mesmo par de empresas.
+    """
+    sparse = lazy_module("scipy.sparse")
+    codes, node_ids = pandas.factorize(numpy.concatenate([sources, targets]))
+    n_edges = len(sources)
+    n_nodes = len(node_ids)
+    valid = (codes[:n_edges] >= 0) & (codes[n_edges:] >= 0)
+    adjacency = sparse.csr_matrix((weights[valid], (codes[:n_edges][valid], codes[n_edges:][valid])), shape=(n_nodes, n_nodes))
+    adjacency.sum_duplicates()
+    return numpy.asarray(node_ids), adjacency
+
+
+def pagerank(adjacency, damping=0.85, tolerance=1e-8, max_iterations=100, time_budget=ECOSYSTEM_PAGERANK_BUDGET_SECONDS):
+    """
+    PageRank ponderado por iteração de potência com produtos matriz-vetor esparsos.
+    Para quando converge, atinge `max_iterations` ou estoura o orçamento de tempo.
+    """
+    sparse = lazy_module("scipy.sparse")
+    n_nodes = adjacency.shape[0]
+    if n_nodes == 0:
+        return numpy.array([]), 0, True
+    out_weight = numpy.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse = numpy.divide(1.0, out_weight, out=numpy.zeros_like(out_weight), where=~dangling)
+    transition = (sparse.diags(inverse) @ adjacency).T.tocsr()
+
+    deadline = time.perf_counter() + time_budget
+    ranks = numpy.full(n_nodes, 1.0 / n_nodes)
+    converged = False
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        updated = damping * (transition @ ranks + ranks[dangling].sum() / n_nodes) + (1 - damping) / n_nodes
+        delta = numpy.abs(updated - ranks).sum()
+        ranks = updated
+        if delta < tolerance:
+            converged = True
+            break
+        if time.perf_counter() > deadline:
+            break
+    return ranks, iterations, converged
+
+
+def label_propagation(adjacency, max_iterations=30, min_change=1e-3, time_budget=ECOSYSTEM_COMMUNITIES_BUDGET_SECONDS, seed=42):
+    """
+    Propagação de rótulos ponderada sobre o grafo não dirigido. Cada iteração é um
+    produto esparso W @ onehot(rótulos) seguido de argmax por linha; metade dos nós
+    (sorteada) é atualizada por rodada para evitar oscilação.
+    """
+    sparse = lazy_module("scipy.sparse")
+    n_nodes = adjacency.shape[0]
+    if n_nodes == 0:
+        return numpy.array([], dtype=int), 0, True
+    undirected = (adjacency + adjacency.T).tocsr()
+    rows = numpy.arange(n_nodes)
+    labels = rows.copy()
+    random = numpy.random.default_rng(seed)
+
+    deadline = time.perf_counter() + time_budget
+    converged = False
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        onehot = sparse.csr_matrix((numpy.ones(n_nodes), (rows, labels)), shape=(n_nodes, n_nodes))
+        votes = undirected @ onehot + onehot * 1e-9
+        candidates = numpy.asarray(votes.argmax(axis=1)).ravel()
+        update = random.random(n_nodes) < 0.5
+        new_labels = numpy.where(update, candidates, labels)
+        changed = numpy.count_nonzero(new_labels != labels)
+        labels = new_labels
+        if changed / n_nodes < min_change and iterations > 1:
+            converged = True
+            break
+        if time.perf_counter() > deadline:
+            break
+    _, labels = numpy.unique(labels, return_inverse=True)
+    return labels, iterations, converged
+
+
+@traced("ecosystem.analytics")
+def compute_ecosystem_analytics(source: str = ECOSYSTEM_EDGE_SOURCE, limit: Optional[int] = None, top_n: int = 10,
+                                pagerank_budget: float = ECOSYSTEM_PAGERANK_BUDGET_SECONDS,
+                                communities_budget: float = ECOSYSTEM_COMMUNITIES_BUDGET_SECONDS):
+    """
+    Métricas do ecossistema sobre o grafo completo de transações (ou sobre as
+    `limit` maiores arestas), com o tempo gasto em cada etapa. Com a fonte
+    "datastore" e o grafo completo, CSR, PageRank e comunidades são calculados
+    uma vez por snapshot dos dados; `runtime_ms` é o desse cálculo.
+    """
+    if source == "datastore" and limit is None:
+        analysis = data_store.snapshot.derived(
+            ("ecosystem", pagerank_budget, communities_budget),
+            lambda snapshot: _analyze(snapshot, source, None, pagerank_budget, communities_budget))
+    else:
+        analysis = _analyze(None, source, limit, pagerank_budget, communities_budget)
+    return _summarize(analysis, top_n)
+
+
+def _analyze(snapshot, source, limit, pagerank_budget, communities_budget):
+    runtime = {}
+
+    started = time.perf_counter()
+    with span("ecosystem.load_edges", source=source, limit=limit) as current:
+        sources, targets, weights = load_edge_arrays(source, limit, snapshot)
+        current.set(edges=len(sources))
+    runtime["load_edges"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with span("ecosystem.build_csr"):
+        node_ids, adjacency = build_adjacency(sources, targets, weights)
+    runtime["build_csr"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with span("ecosystem.pagerank") as current:
+        ranks, pagerank_iterations, pagerank_converged = pagerank(adjacency, time_budget=pagerank_budget)
+        current.set(iterations=pagerank_iterations, converged=pagerank_converged)
+    runtime["pagerank"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with span("ecosystem.label_propagation") as current:
+        labels, lpa_iterations, lpa_converged = label_propagation(adjacency, time_budget=communities_budget)
+        current.set(iterations=lpa_iterations, converged=lpa_converged)
+    runtime["label_propagation"] = time.perf_counter() - started
+
+    if snapshot is not None and snapshot.analytics_db is None:
+        num_transactions = snapshot.time_index.transaction_count()
+    else:
+        num_transactions = len(sources)
+    return {
+        "node_ids": node_ids,
+        "adjacency": adjacency,
+        "num_transactions": num_transactions,
+        "ranks": ranks,
+        "community_sizes": numpy.bincount(labels) if len(labels) else numpy.array([], dtype=int),
+        "pagerank": {"iterations": pagerank_iterations, "converged": pagerank_converged},
+        "communities": {"algorithm": "label_propagation", "iterations": lpa_iterations, "converged": lpa_converged},
+        "runtime_ms": {stage: round(seconds * 1000, 2) for stage, seconds in runtime.items()}
+    }
+
+
+def _summarize(analysis, top_n):
+    node_ids = analysis["node_ids"]
+    ranks = analysis["ranks"]
+    community_sizes = analysis["community_sizes"]
+    top_positions = numpy.argsort(-ranks, kind="stable")[:top_n]
+    largest_communities = numpy.argsort(-community_sizes, kind="stable")[:top_n]
+
+    return {
+        "num_nodes": int(analysis["adjacency"].shape[0]),
+        "num_edges": int(analysis["adjacency"].nnz),
+        "num_transactions": int(analysis["num_transactions"]),
+        "num_communities": int(len(community_sizes)),
+        "largest_community_size": int(community_sizes.max()) if len(community_sizes) else 0,
+        "largest_communities": [{"community": int(label), "size": int(community_sizes[label])} for label in largest_communities],
+        "top_central_nodes": [{"id": node_ids[position], "pagerank": float(ranks[position])} for position in top_positions],
+        "pagerank": analysis["pagerank"],
+        "communities": analysis["communities"],
+        "runtime_ms": analysis["runtime_ms"]
+    }
@@ -0,0 +1,200 @@
+import time
+
+import numpy
+import pandas
+from fastapi import HTTPException
+
+SEASON_LENGTH = 12
+
+
+class LinearTrendModel:
+    """
+    Reta de mínimos quadrados sobre o índice do mês, resolvida em forma fechada
+    para todas as séries de uma vez.
+    """
+    name = "linear"
+
+    def fit(self, values, lengths):
+        x = numpy.arange(values.shape[1], dtype=float)
+        mask = x[None, :] < lengths[:, None]
+        y = numpy.where(mask, values, 0.0)
+        n = lengths.astype(float)
+        sx = (mask * x).sum(axis=1)
+        sxx = (mask * x * x).sum(axis=1)
+        sy = y.sum(axis=1)
+        sxy = (y * x).sum(axis=1)
+        denominator = n * sxx - sx * sx
+        slope = numpy.divide(n * sxy - sx * sy, denominator, out=numpy.zeros_like(sy), where=denominator > 0)
+        intercept = numpy.divide(sy - slope * sx, n, out=numpy.zeros_like(sy), where=n > 0)
+        return {"slope": slope, "intercept": intercept, "lengths": lengths}
+
+    def predict(self, state, horizon):
+        steps = state["lengths"][:, None] - 1 + numpy.arange(1, horizon + 1)[None, :]
+        return state["intercept"][:, None] + state["slope"][:, None] * steps
+
+
+class SeasonalNaiveModel:
+    """
+    Repete o valor do mesmo mês do último ciclo sazonal. Séries mais curtas que
+    um ciclo repetem o último valor observado.
+    """
+    name = "seasonal_naive"
+
+    def __init__(self, season_length=SEASON_LENGTH):
+        self.season_length = season_length
+
+    def fit(self, values, lengths):
+        return {"values": values, "lengths": lengths}
+
+    def predict(self, state, horizon):
+        values = state["values"]
+        lengths = state["lengths"]
+        steps = numpy.arange(horizon)[None, :]
+        seasonal = lengths[:, None] - self.season_length + steps % self.season_length
+        last = numpy.broadcast_to(lengths[:, None] - 1, seasonal.shape)
+        columns = numpy.where(lengths[:, None] >= self.season_length, seasonal, last)
+        columns = numpy.clip(columns, 0, max(values.shape[1] - 1, 0))
+        return numpy.take_along_axis(values, columns, axis=1)
+
+
+class HoltWintersModel:
+    """
+    Suavização exponencial de Holt-Winters aditiva. A recursão percorre os meses
+    uma única vez e atualiza o estado de todas as séries em paralelo; séries com
+    menos de dois ciclos usam apenas nível e tendência (Holt).
+    """
+    name = "holt_winters"
+
+    def __init__(self, alpha=0.4, beta=0.1, gamma=0.3, season_length=SEASON_LENGTH):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.season_length = season_length
+
+    def fit(self, values, lengths):
+        m = self.season_length
+        n_series, n_months = values.shape
+        seasonal_rows = lengths >= 2 * m
+
+        level = numpy.nan_to_num(values[:, 0]) if n_months else numpy.zeros(n_series)
+        trend = numpy.zeros(n_series)
+        season = numpy.zeros((n_series, m))
+        if n_months >= 2 * m and seasonal_rows.any():
+            first_cycle = values[:, :m].mean(axis=1)
+            second_cycle = values[:, m:2 * m].mean(axis=1)
+            level = numpy.where(seasonal_rows, first_cycle, level)
+            trend = numpy.where(seasonal_rows, (second_cycle - first_cycle) / m, trend)
+            season = numpy.where(seasonal_rows[:, None], values[:, :m] - first_cycle[:, None], season)
+
+        rows = numpy.arange(n_series)
+        for t in range(n_months):
+            active = t < lengths
+            y = values[:, t]
+            s = season[:, t % m]
+            new_level = self.alpha * (y - s) + (1 - self.alpha) * (level + trend)
+            new_trend = self.beta * (new_level - level) + (1 - self.beta) * trend
+            new_season = numpy.where(seasonal_rows, self.gamma * (y - new_level) + (1 - self.gamma) * s, 0.0)
+            level = numpy.where(active, new_level, level)
+            trend = numpy.where(active, new_trend, trend)
+            season[rows, t % m] = numpy.where(active, new_season, s)
+        return {"level": level, "trend": trend, "season": season, "lengths": lengths}
+
+    def predict(self, state, horizon):
+        steps = numpy.arange(1, horizon + 1)[None, :]
+        positions = (state["lengths"][:, None] + steps - 1) % self.season_length
+        seasonal = numpy.take_along_axis(state["season"], positions, axis=1)
+        return state["level"][:, None] + state["trend"][:, None] * steps + seasonal
+
+
+FORECAST_MODELS = {
+    model.name: model
+    for model in (LinearTrendModel(), HoltWintersModel(), SeasonalNaiveModel())
+}
+
+
+def get_forecast_model(name: str):
+    model = FORECAST_MODELS.get(name)
+    if model is None:
+        raise HTTPException(status_code=400, detail=f"Modelo '{name}' inválido. Opções: {', '.join(FORECAST_MODELS)}.")
+    return model
+
+
+def _month_ordinals(months: pandas.Series):
+    text = months.astype(str)
+    return (text.str[:4].astype(int) * 12 + text.str[5:7].astype(int) - 1).to_numpy()
+
+
+def build_series_matrix(monthly_df: pandas.DataFrame, column: str):
+    """
+    Converte o resumo mensal em uma matriz empresas x meses alinhada à esquerda.
+    Cada série vai do primeiro mês da empresa até o último mês do resumo, mês a
+    mês: meses sem transações valem zero (como no AnomalyIndex), para que o
+    índice da coluna seja de fato o tempo. Após o fim de cada série, NaN.
+    """
+    codes, ids = pandas.factorize(monthly_df['id'])
+    if not len(ids):
+        return numpy.asarray(ids), numpy.empty((0, 0)), numpy.zeros(0, dtype=int)
+    ordinals = _month_ordinals(monthly_df['ano_mes'])
+    first_month = numpy.full(len(ids), ordinals.max())
+    numpy.minimum.at(first_month, codes, ordinals)
+    lengths = ordinals.max() - first_month + 1
+    values = numpy.where(numpy.arange(int(lengths.max()))[None, :] < lengths[:, None], 0.0, numpy.nan)
+    values[codes, ordinals - first_month[codes]] = monthly_df[column].to_numpy(dtype=float)
+    return numpy.asarray(ids), values, lengths
+
+
+def forecast_series(values, lengths, horizon: int, model_name: str = "linear"):
+    model = get_forecast_model(model_name)
+    return model.predict(model.fit(values, lengths), horizon)
+
+
+def run_backtest(monthly_df: pandas.DataFrame, horizon: int = 3, min_train: int = 6,
+                 columns=("receita", "despesa"), models=None):
+    """
+    Backtest com origem móvel: para cada origem k, ajusta cada modelo nos k primeiros
+    meses de todas as séries com histórico suficiente e compara as k+1..k+horizon
+    previsões com o realizado. Retorna MAE, MAPE e vazão de ajuste/previsão por modelo.
+    """
+    models = models or list(FORECAST_MODELS)
+    report = {}
+    for model_name in models:
+        model = get_forecast_model(model_name)
+        absolute_errors = []
+        percentage_errors = []
+        fitted_series = 0
+        fit_seconds = 0.0
+        predict_seconds = 0.0
+        for column in columns:
+            _, values, lengths = build_series_matrix(monthly_df, column)
+            for origin in range(min_train, values.shape[1] - horizon + 1):
+                eligible = lengths >= origin + horizon
+                if not eligible.any():
+                    continue
+                train = values[eligible, :origin]
+                train_lengths = numpy.full(train.shape[0], origin)
+                actual = values[eligible, origin:origin + horizon]
+
+                started = time.perf_counter()
+                state = model.fit(train, train_lengths)
+                fitted = time.perf_counter()
+                predicted = model.predict(state, horizon)
+                fit_seconds += fitted - started
+                predict_seconds += time.perf_counter() - fitted
+                fitted_series += train.shape[0]
+
+                errors = numpy.abs(predicted - actual)
+                absolute_errors.append(errors.ravel())
+                nonzero = actual != 0
+                percentage_errors.append((errors[nonzero] / numpy.abs(actual[nonzero])).ravel())
+
+        absolute_errors = numpy.concatenate(absolute_errors) if absolute_errors else numpy.array([])
+        percentage_errors = numpy.concatenate(percentage_errors) if percentage_errors else numpy.array([])
+        report[model_name] = {
+            "mae": float(absolute_errors.mean()) if absolute_errors.size else None,
+            "mape": float(percentage_errors.mean() * 100) if percentage_errors.size else None,
+            "evaluated_points": int(absolute_errors.size),
+            "fitted_series": fitted_series,
+            "fit_series_per_second": fitted_series / fit_seconds if fit_seconds > 0 else None,
+            "predict_series_per_second": fitted_series / predict_seconds if predict_seconds > 0 else None
+        }
+    return report
@@ -1,46 +1,65 @@
-import networkx as nx
-from app.core.ai_config import ai_config
 from app.services.graph_service import graph_service
+from app.services.ecosystem_analytics import compute_ecosystem_analytics
+from app.services.llm_service import chat_completion, stream_chat_completion
 from fastapi import HTTPException
 
-def generate_ecosystem_summary(limit=200, threshold=0.7):
+def generate_ecosystem_summary(limit=None, threshold=0.7):
     """
     Gera um resumo executivo do ecossistema completo com base nos dados do Neo4j
     """
+    request = _ecosystem_summary_request(limit, threshold)
     try:
-        # Obter dados para análise
-        edges = graph_service.get_edges(limit)
+        return chat_completion(**request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar resumo do ecossistema: {str(e)}")
+
+def stream_ecosystem_summary(limit=None, threshold=0.7):
+    """
+    Versão em streaming do resumo do ecossistema: o contexto é montado antes e os
+    trechos do texto são repassados conforme o modelo os gera
+    """
+    return stream_chat_completion(**_ecosystem_summary_request(limit, threshold))
+
+def generate_company_network_analysis(company_id: str):
+    """
+    Gera uma análise de cadeia de valor para uma empresa específica
+    """
+    request = _company_network_analysis_request(company_id)
+    try:
+        return chat_completion(**request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao gerar análise de cadeia de valor: {str(e)}")
+
+def stream_company_network_analysis(company_id: str):
+    """
+    Versão em streaming da análise de cadeia de valor de uma empresa
+    """
+    return stream_chat_completion(**_company_network_analysis_request(company_id))
+
+def _ecosystem_summary_request(limit, threshold):
+    try:
+        # Métricas calculadas sobre o grafo completo (ou sobre as `limit` maiores arestas)
+        analytics = compute_ecosystem_analytics(limit=limit, top_n=5)
         dependencies = graph_service.get_critical_dependencies(threshold)
         
-        # Criar um grafo do NetworkX para análise de comunidades
-        G = nx.DiGraph()
-        for edge in edges:
-            G.add_edge(edge['source'], edge['target'], weight=edge['value'])
-        
-        # Converter para grafo não direcionado para detecção de comunidades
-        G_undirected = G.to_undirected()
-        
-        # Detectar comunidades usando o algoritmo Louvain
-        communities = nx.community.louvain_communities(G_undirected, weight='weight', resolution=1.1)
-        
-        # Análises básicas
-        num_nodes = len(G.nodes())
-        num_edges = len(G.edges())
-        num_communities = len(communities)
-        largest_community_size = max(len(comm) for comm in communities)
-        
-        # Centralidade e importância de nós
-        betweenness = nx.betweenness_centrality(G, k=min(100, num_nodes), weight='weight')
-        top_central_nodes = sorted(betweenness.items(), key=lambda x: x[1], reverse=True)[:5]
+        num_nodes = analytics["num_nodes"]
+        num_edges = analytics["num_edges"]
+        num_communities = analytics["num_communities"]
+        largest_community_size = analytics["largest_community_size"]
+        top_central_nodes = [node["id"] for node in analytics["top_central_nodes"]]
         
         # Preparar contexto para a IA
         context = f"""
         Análise de Rede do Ecossistema Empresarial:
         - Total de empresas (nós): {num_nodes}
-        - Total de transações (arestas): {num_edges}
+        - Total de relações pagador-recebedor (arestas): {num_edges}
         - Número de clusters identificados: {num_communities}
         - Tamanho do maior cluster: {largest_community_size} empresas
-        - Empresas mais centrais na rede (maior intermediação): {[node for node, _ in top_central_nodes]}
+        - Empresas mais centrais na rede (maior PageRank ponderado por valor): {top_central_nodes}
         - Número de relações de dependência crítica (>{threshold*100:.0f}%): {len(dependencies)}
         """
         
@@ -64,27 +83,20 @@ def generate_ecosystem_summary(limit=200, threshold=0.7):
         Seja conciso, direto e foque em insights acionáveis. Use linguagem profissional adequada para executivos do setor bancário.
         """
         
-        client = ai_config.client
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        return {
+            "messages": [
                 {"role": "system", "content": "Você é um analista de risco sênior especializado em análise de redes e ecossistemas empresariais."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=450, 
-            temperature=0.4,
-        )
-        
-        return response.choices[0].message.content.strip()
+            "max_tokens": 450,
+            "temperature": 0.4,
+        }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao gerar resumo do ecossistema: {str(e)}")
 
 
-def generate_company_network_analysis(company_id: str):
-    """
-    Gera uma análise de cadeia de valor para uma empresa específica
-    """
+def _company_network_analysis_request(company_id: str):
     try:
         # Obter vizinhança da empresa
         neighborhood = graph_service.get_neighborhood(company_id)
@@ -133,18 +145,14 @@ def generate_company_network_analysis(company_id: str):
         Seja conciso e direto. Use linguagem profissional adequada para gestores financeiros.
         """
         
-        client = ai_config.client
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        return {
+            "messages": [
                 {"role": "system", "content": "Você é um analista financeiro especializado em análise de cadeia de valor empresarial."},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=300, 
-            temperature=0.4,
-        )
-        
-        return response.choices[0].message.content.strip()
+            "max_tokens": 300,
+            "temperature": 0.4,
+        }
         
     except HTTPException:
         raise
@@ -0,0 +1,192 @@
+import csv
+import io
+from xml.sax.saxutils import quoteattr
+
+import pandas
+from fastapi import HTTPException
+
+from app.core.config import GRAPH_EXPORT_CHUNK_SIZE
+from app.services.data_store import data_store
+from app.services.graph_service import graph_service
+
+EDGE_COLUMNS = ["source", "target", "value", "type", "date"]
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "graphml": ("application/xml", "graphml"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet")
+}
+EXPORT_SOURCES = ("neo4j", "datastore")
+
+
+def export_graph(export_format: str, source: str = "neo4j", chunk_size: int = GRAPH_EXPORT_CHUNK_SIZE):
+    """
+    Prepara a exportação completa das arestas no formato pedido. Retorna um gerador
+    de bytes (um bloco por vez), o media type e o nome do arquivo.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato '{export_format}' inválido. Opções: {', '.join(EXPORT_FORMATS)}.")
+    if source not in EXPORT_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Fonte '{source}' inválida. Opções: {', '.join(EXPORT_SOURCES)}.")
+    if export_format in ("arrow", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"O formato '{export_format}' requer o pacote pyarrow instalado.")
+
+    edge_chunks = _edge_chunks(source, chunk_size)
+    writers = {
+        "csv": lambda: _write_csv(edge_chunks),
+        "graphml": lambda: _write_graphml(_node_chunks(source, chunk_size), edge_chunks),
+        "arrow": lambda: _write_arrow(edge_chunks),
+        "parquet": lambda: _write_parquet(edge_chunks)
+    }
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return writers[export_format](), media_type, f"grafo_transacoes.{extension}"
+
+
+def _edge_chunks(source, chunk_size):
+    if source == "neo4j":
+        yield from graph_service.iter_edges(chunk_size)
+        return
+    snapshot = data_store.snapshot
+    if snapshot.analytics_db is not None:
+        yield from snapshot.analytics_db.iter_edges(chunk_size)
+        return
+    for run in snapshot.time_index.transaction_runs():
+        for start in range(0, len(run), chunk_size):
+            chunk = run.iloc[start:start + chunk_size]
+            dates = chunk["dt_refe"].dt.strftime("%Y-%m-%d").where(chunk["dt_refe"].notna(), None)
+            yield list(zip(chunk["id_pgto"], chunk["id_rcbe"], chunk["vl"].astype(float), chunk["ds_tran"], dates))
+
+
+def _node_chunks(source, chunk_size):
+    if source == "neo4j":
+        yield from graph_service.iter_node_ids(chunk_size)
+        return
+    snapshot = data_store.snapshot
+    if snapshot.analytics_db is not None:
+        transaction_ids = [pandas.Series(snapshot.analytics_db.node_ids(), dtype=object)]
+    else:
+        transaction_ids = [run[column] for run in snapshot.time_index.transaction_runs() for column in ("id_pgto", "id_rcbe")]
+    ids = pandas.unique(pandas.concat([snapshot.companies_df["id"], *transaction_ids]))
+    for start in range(0, len(ids), chunk_size):
+        yield list(ids[start:start + chunk_size])
+
+
+def _write_csv(edge_chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EDGE_COLUMNS)
+    for chunk in edge_chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _write_graphml(node_chunks, edge_chunks):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        '  <key id="value" for="edge" attr.name="value" attr.type="double"/>\n'
+        '  <key id="type" for="edge" attr.name="type" attr.type="string"/>\n'
+        '  <key id="date" for="edge" attr.name="date" attr.type="string"/>\n'
+        '  <graph id="transacoes" edgedefault="directed">\n'
+    ).encode("utf-8")
+    for chunk in node_chunks:
+        yield "".join(f"    <node id={quoteattr(str(node_id))}/>\n" for node_id in chunk).encode("utf-8")
+    for chunk in edge_chunks:
+        parts = []
+        for source, target, value, edge_type, date in chunk:
+            parts.append(f"    <edge source={quoteattr(str(source))} target={quoteattr(str(target))}>")
+            if value is not None:
+                parts.append(f'<data key="value">{float(value)}</data>')
+            if edge_type is not None:
+                parts.append(f"<data key=\"type\">{_escape(edge_type)}</data>")
+            if date is not None:
+                parts.append(f"<data key=\"date\">{_escape(date)}</data>")
+            parts.append("</edge>\n")
+        yield "".join(parts).encode("utf-8")
+    yield "  </graph>\n</graphml>\n".encode("utf-8")
+
+
+def _escape(value):
+    return str(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _arrow_schema():
+    import pyarrow
+    return pyarrow.schema([
+        ("source", pyarrow.string()),
+        ("target", pyarrow.string()),
+        ("value", pyarrow.float64()),
+        ("type", pyarrow.string()),
+        ("date", pyarrow.string())
+    ])
+
+
+def _arrow_batch(chunk, schema):
+    import pyarrow
+    columns = list(zip(*chunk))
+    arrays = [
+        pyarrow.array([None if v is None else str(v) for v in columns[0]], pyarrow.string()),
+        pyarrow.array([None if v is None else str(v) for v in columns[1]], pyarrow.string()),
+        pyarrow.array(columns[2], pyarrow.float64()),
+        pyarrow.array(columns[3], pyarrow.string()),
+        pyarrow.array(columns[4], pyarrow.string())
+    ]
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _DrainableSink(io.RawIOBase):
+    """
+    Destino somente de escrita que acumula bytes até serem drenados pelo gerador.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _write_arrow(edge_chunks):
+    import pyarrow
+    import pyarrow.ipc
+    schema = _arrow_schema()
+    sink = _DrainableSink()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for chunk in edge_chunks:
+            writer.write_batch(_arrow_batch(chunk, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _write_parquet(edge_chunks):
+    import pyarrow
+    import pyarrow.parquet
+    schema = _arrow_schema()
+    sink = _DrainableSink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for chunk in edge_chunks:
+            writer.write_table(pyarrow.Table.from_batches([_arrow_batch(chunk, schema)]))
+            yield sink.drain()
+    yield sink.drain()
@@ -1,75 +1,186 @@
-from neo4j import GraphDatabase
+import logging
 from fastapi import HTTPException
-import pandas as pd
-from app.core.config import NEO4J_URI, NEO4J_USER, NEO4J_PASS
+from app.core.config import NEO4J_URI, NEO4J_USER, NEO4J_PASS, GRAPH_BACKEND
+from app.core.startup_profile import lazy_module
+from app.core.tracing import span, start_span
+
+logger = logging.getLogger(__name__)
+
+# Consultas do GraphService, em um só lugar para que scripts/profile_graph_queries.py
+# possa rodar PROFILE em todas. Dependem dos índices criados em scripts/init_neo4j.py.
+NODES_QUERY = """
+MATCH (e:Empresa) WHERE e.id IS NOT NULL
+RETURN e.id AS id ORDER BY e.id
+"""
+
+# O filtro IS NOT NULL permite ao planner percorrer o índice de PAGOU_PARA(valor)
+# já em ordem decrescente e parar no LIMIT, sem ordenar todas as relações
+EDGES_QUERY = """
+MATCH (p:Empresa)-[r:PAGOU_PARA]->(c:Empresa)
+WHERE r.valor IS NOT NULL
+RETURN p.id AS source, c.id AS target, r.valor AS value, r.tipo AS type, r.data AS date
+ORDER BY r.valor DESC LIMIT $limit
+"""
+
+# Subconsultas separadas evitam o produto cartesiano clientes x fornecedores
+NEIGHBORHOOD_QUERY = """
+MATCH (foco:Empresa {id: $company_id})
+CALL {
+    WITH foco
+    OPTIONAL MATCH (foco)<-[:PAGOU_PARA]-(cliente:Empresa)
+    RETURN COLLECT(DISTINCT cliente.id) AS clientes
+}
+CALL {
+    WITH foco
+    OPTIONAL MATCH (foco)-[:PAGOU_PARA]->(fornecedor:Empresa)
+    RETURN COLLECT(DISTINCT fornecedor.id) AS fornecedores
+}
+RETURN foco.id AS id, clientes, fornecedores
+"""
+
+# Uma única passada pelas relações recebidas: soma por cliente e depois o total da empresa
+CRITICAL_DEPENDENCIES_QUERY = """
+MATCH (e:Empresa)<-[r:PAGOU_PARA]-(c:Empresa)
+WITH e, c, SUM(r.valor) AS valor_individual
+WITH e, COLLECT({cliente: c.id, valor: valor_individual}) AS clientes, SUM(valor_individual) AS receitaTotal
+WHERE receitaTotal > 0
+UNWIND clientes AS cliente
+WITH e, cliente, cliente.valor / receitaTotal AS participacao
+WHERE participacao >= $threshold
+RETURN e.id AS empresa_dependente, cliente.cliente AS cliente_chave, participacao * 100 AS dependencia
+ORDER BY dependencia DESC LIMIT 10
+"""
+
+CLUSTERS_QUERY = """
+MATCH (p:Empresa)-[r:PAGOU_PARA]->(c:Empresa)
+WHERE r.valor IS NOT NULL
+RETURN p.id AS source, c.id AS target, r.valor AS value
+ORDER BY r.valor DESC LIMIT $limit
+"""
+
+NODE_IDS_QUERY = "MATCH (e:Empresa) RETURN e.id AS id"
+
+ALL_EDGES_QUERY = """
+MATCH (p:Empresa)-[r:PAGOU_PARA]->(c:Empresa)
+RETURN p.id AS source, c.id AS target, r.valor AS value, r.tipo AS type, r.data AS date
+"""
+
+# Nome do método -> (consulta, parâmetros de exemplo); "$company_id" é resolvido pelo script de profiling
+GRAPH_QUERIES = {
+    "get_nodes": (NODES_QUERY, {}),
+    "get_edges": (EDGES_QUERY, {"limit": 500}),
+    "get_neighborhood": (NEIGHBORHOOD_QUERY, {"company_id": None}),
+    "get_critical_dependencies": (CRITICAL_DEPENDENCIES_QUERY, {"threshold": 0.7}),
+    "get_clusters": (CLUSTERS_QUERY, {"limit": 500}),
+    "iter_node_ids": (NODE_IDS_QUERY, {}),
+    "iter_edges": (ALL_EDGES_QUERY, {})
+}
 
 class GraphService:
     def __init__(self):
-        self.driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+        self._driver = None
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            neo4j = lazy_module("neo4j")
+            self._driver = neo4j.GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
+        return self._driver
+
+    def _run(self, name, query, **params):
+        """
+        Executa a consulta e materializa os registros dentro de um span com o
+        tempo até o primeiro resultado informado pelo servidor.
+        """
+        with span(f"neo4j.{name}", **{"db.system": "neo4j"}) as current:
+            with self.driver.session(database="neo4j") as session:
+                result = session.run(query, **params)
+                records = list(result)
+                summary = result.consume()
+            current.set(rows=len(records), result_available_after_ms=summary.result_available_after)
+            return records
+
+    def _stream(self, name, query, chunk_size):
+        """
+        Percorre os registros com o cursor do driver. O span é aberto e fechado
+        manualmente porque o gerador pode ser consumido em outro contexto.
+        """
+        current = start_span(f"neo4j.{name}", **{"db.system": "neo4j", "chunk_size": chunk_size})
+        rows = 0
+        try:
+            with self.driver.session(database="neo4j", fetch_size=chunk_size) as session:
+                for record in session.run(query):
+                    rows += 1
+                    yield record
+        except BaseException as error:
+            current.set(rows=rows)
+            current.end(error)
+            raise
+        current.set(rows=rows)
+        current.end()
 
     def get_nodes(self):
-        query = "MATCH (e:Empresa) RETURN e.id AS id ORDER BY id"
         try:
-            with self.driver.session(database="neo4j") as session:
-                result = session.run(query)
-                nodes = [record["id"] for record in result]
-                print(f"Neo4j: Encontrados {len(nodes)} nós de empresas")
-                return nodes
-        except Exception as e:
-            print(f"Erro ao conectar com Neo4j: {e}")
+            nodes = [record["id"] for record in self._run("get_nodes", NODES_QUERY)]
+            logger.info("Neo4j: Encontrados %d nós de empresas", len(nodes))
+            return nodes
+        except Exception:
+            logger.exception("Erro ao conectar com Neo4j")
             # Retornar lista vazia em vez de lançar exceção para evitar quebrar o frontend
             return []
 
     def get_edges(self, limit=500):
-        query = """
-        MATCH (p:Empresa)-[r:PAGOU_PARA]->(c:Empresa)
-        RETURN p.id AS source, c.id AS target, r.valor AS value, r.tipo AS type, r.data AS date
-        ORDER BY value DESC LIMIT $limit
-        """
         try:
-            with self.driver.session(database="neo4j") as session:
-                result = session.run(query, limit=limit)
-                edges = [dict(record) for record in result]
-                print(f"Neo4j: Encontradas {len(edges)} arestas com limite {limit}")
-                return edges
-        except Exception as e:
-            print(f"Erro ao buscar arestas do Neo4j: {e}")
+            edges = [dict(record) for record in self._run("get_edges", EDGES_QUERY, limit=limit)]
+            logger.info("Neo4j: Encontradas %d arestas com limite %d", len(edges), limit)
+            return edges
+        except Exception:
+            logger.exception("Erro ao buscar arestas do Neo4j")
             # Retornar lista vazia em vez de lançar exceção
             return []
 
     def get_neighborhood(self, company_id):
-        query = """
-        MATCH (foco:Empresa {id: $company_id})
-        OPTIONAL MATCH (foco)<-[r_in:PAGOU_PARA]-(cliente:Empresa)
-        OPTIONAL MATCH (foco)-[r_out:PAGOU_PARA]->(fornecedor:Empresa)
-        RETURN foco.id AS id, COLLECT(DISTINCT cliente.id) AS clientes, COLLECT(DISTINCT fornecedor.id) AS fornecedores
-        """
-        with self.driver.session(database="neo4j") as session:
-            result = session.run(query, company_id=company_id).single()
-            return dict(result) if result else {}
+        records = self._run("get_neighborhood", NEIGHBORHOOD_QUERY, company_id=company_id)
+        return dict(records[0]) if records else {}
 
     def get_critical_dependencies(self, threshold=0.7):
-        query = """
-        MATCH (e:Empresa)<-[r:PAGOU_PARA]-(c:Empresa)
-        WITH e, SUM(r.valor) AS receitaTotal
-        MATCH (e)<-[r_ind:PAGOU_PARA]-(c_ind:Empresa)
-        WITH e, receitaTotal, c_ind, SUM(r_ind.valor) AS valor_individual
-        WHERE receitaTotal > 0 AND (valor_individual / receitaTotal) >= $threshold
-        RETURN e.id AS empresa_dependente, c_ind.id AS cliente_chave, (valor_individual / receitaTotal) * 100 AS dependencia
-        ORDER BY dependencia DESC LIMIT 10
-        """
-        with self.driver.session(database="neo4j") as session:
-            result = session.run(query, threshold=threshold)
-            return [dict(record) for record in result]
+        return [dict(record) for record in self._run("get_critical_dependencies", CRITICAL_DEPENDENCIES_QUERY, threshold=threshold)]
 
     def get_clusters(self, limit=500):
-        query = """
-        MATCH (p:Empresa)-[r:PAGOU_PARA]->(c:Empresa)
-        RETURN p.id AS source, c.id AS target, r.valor AS value
-        ORDER BY value DESC LIMIT $limit
+        return [dict(record) for record in self._run("get_clusters", CLUSTERS_QUERY, limit=limit)]
+
+    def iter_node_ids(self, chunk_size=10000):
         """
-        with self.driver.session(database="neo4j") as session:
-            result = session.run(query, limit=limit)
-            return [dict(record) for record in result]
+        Percorre os ids das empresas em blocos, sem materializar o resultado completo.
+        """
+        batch = []
+        for record in self._stream("iter_node_ids", NODE_IDS_QUERY, chunk_size):
+            batch.append(record["id"])
+            if len(batch) >= chunk_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_edges(self, chunk_size=10000):
+        """
+        Percorre todas as relações PAGOU_PARA em blocos de tuplas
+        (source, target, value, type, date), usando o cursor do driver.
+        """
+        batch = []
+        for record in self._stream("iter_edges", ALL_EDGES_QUERY, chunk_size):
+            date = record["date"]
+            batch.append((record["source"], record["target"], record["value"], record["type"], date.iso_format() if date is not None else None))
+            if len(batch) >= chunk_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+def _create_graph_service():
+    if GRAPH_BACKEND == "memory":
+        from app.services.memory_graph_service import InMemoryGraphService
+        return InMemoryGraphService()
+    return GraphService()
 
-graph_service = GraphService()
+graph_service = _create_graph_service()
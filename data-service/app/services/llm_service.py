@@ -0,0 +1,70 @@
+import time
+
+from app.core.ai_config import ai_config
+from app.core.llm_gateway import llm_gateway
+from app.core.tracing import span, start_span
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+def chat_completion(messages, max_tokens, temperature, model=DEFAULT_MODEL):
+    client = ai_config.client
+    with span("llm.chat_completion", model=model, max_tokens=max_tokens) as current:
+        response = llm_gateway.call(lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        ))
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            current.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+    return response.choices[0].message.content.strip()
+
+def stream_chat_completion(messages, max_tokens, temperature, model=DEFAULT_MODEL):
+    """
+    Abre a chamada em streaming (stream=True) e devolve um gerador com os trechos de
+    texto à medida que o modelo os produz. A vaga no gateway é reservada aqui, antes
+    do primeiro trecho, e liberada quando o gerador termina.
+    """
+    client = ai_config.client
+    # O span vai até o fim do stream, que é consumido fora deste contexto
+    current = start_span("llm.stream_chat_completion", model=model, max_tokens=max_tokens)
+    try:
+        stream = llm_gateway.open_stream(lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            # O último evento do stream traz o uso de tokens (com choices vazio)
+            stream_options={"include_usage": True},
+        ))
+    except BaseException as error:
+        current.end(error)
+        raise
+    return _stream_content(stream, current)
+
+def _stream_content(stream, current):
+    started = time.perf_counter()
+    chunks = 0
+    error = None
+    try:
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage is not None:
+                current.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if chunks == 0:
+                    current.set(first_token_ms=round((time.perf_counter() - started) * 1000, 3))
+                chunks += 1
+                yield content
+    except Exception as exception:
+        error = exception
+        raise
+    finally:
+        stream.close()
+        current.set(chunks=chunks)
+        current.end(error)
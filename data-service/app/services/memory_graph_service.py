@@ -0,0 +1,72 @@
+import pandas as pd
+from app.services.data_store import data_store
+
+
+class InMemoryGraphService:
+    """
+    Substituto do GraphService que responde às mesmas consultas a partir das
+    transações em memória, sem Neo4j. Usado em testes de carga e ambientes locais.
+    Assim como a ingestão no Neo4j, considera apenas transações entre empresas cadastradas.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._edges = None
+
+    def edges_frame(self):
+        snapshot = data_store.snapshot
+        runs = snapshot.time_index.transaction_runs()
+        if self._snapshot is not runs:
+            company_ids = snapshot.companies_df['id'].unique()
+            parts = []
+            for run in runs:
+                known = run['id_pgto'].isin(company_ids) & run['id_rcbe'].isin(company_ids)
+                parts.append(run.loc[known, ['id_pgto', 'id_rcbe', 'vl', 'ds_tran', 'dt_refe']])
+            edges = pd.concat(parts, ignore_index=True)
+            edges.columns = ['source', 'target', 'value', 'type', 'date']
+            edges = edges.assign(date=edges['date'].dt.strftime('%Y-%m-%d'))
+            self._edges = edges
+            self._snapshot = runs
+        return self._edges
+
+    def get_nodes(self):
+        return sorted(data_store.companies_df['id'].unique())
+
+    def get_edges(self, limit=500):
+        return self.edges_frame().nlargest(limit, 'value').to_dict(orient='records')
+
+    def get_neighborhood(self, company_id):
+        if company_id not in set(data_store.companies_df['id']):
+            return {}
+        edges = self.edges_frame()
+        return {
+            "id": company_id,
+            "clientes": list(pd.unique(edges.loc[edges['target'] == company_id, 'source'])),
+            "fornecedores": list(pd.unique(edges.loc[edges['source'] == company_id, 'target']))
+        }
+
+    def get_critical_dependencies(self, threshold=0.7):
+        edges = self.edges_frame()
+        pairs = edges.groupby(['target', 'source'])['value'].sum().reset_index()
+        pairs['total'] = pairs.groupby('target')['value'].transform('sum')
+        pairs = pairs[pairs['total'] > 0]
+        pairs['dependencia'] = pairs['value'] / pairs['total']
+        critical = pairs[pairs['dependencia'] >= threshold].nlargest(10, 'dependencia')
+        return [
+            {"empresa_dependente": row.target, "cliente_chave": row.source, "dependencia": float(row.dependencia * 100)}
+            for row in critical.itertuples()
+        ]
+
+    def get_clusters(self, limit=500):
+        return self.edges_frame().nlargest(limit, 'value')[['source', 'target', 'value']].to_dict(orient='records')
+
+    def iter_node_ids(self, chunk_size=10000):
+        ids = self.get_nodes()
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+
+    def iter_edges(self, chunk_size=10000):
+        edges = self.edges_frame()
+        for start in range(0, len(edges), chunk_size):
+            chunk = edges.iloc[start:start + chunk_size]
+            yield list(zip(chunk['source'], chunk['target'], chunk['value'].astype(float), chunk['type'], chunk['date']))
@@ -0,0 +1,53 @@
+import pandas
+
+BENCHMARK_METRICS = ['receita_media_6m', 'despesa_media_6m', 'margem_media_6m', 'crescimento_receita_3m', 'volatilidade_receita', 'idade']
+BENCHMARK_QUANTILES = {'p10': 0.10, 'p25': 0.25, 'p75': 0.75, 'p90': 0.90}
+
+
+class SectorBenchmarks:
+    """
+    Tabela de benchmarks setoriais construída uma vez por snapshot dos perfis:
+    média, mediana e quantis por setor e métrica, além do percentil de cada
+    empresa dentro do próprio setor. Consultas são buscas em dicionário.
+    """
+
+    def __init__(self, profiles_df: pandas.DataFrame):
+        metrics = [metric for metric in BENCHMARK_METRICS if metric in profiles_df.columns]
+        grouped = profiles_df.groupby('ds_cnae')[metrics]
+
+        statistics = {
+            'mean': grouped.mean(),
+            'median': grouped.median(),
+            **{name: grouped.quantile(q) for name, q in BENCHMARK_QUANTILES.items()}
+        }
+        counts = grouped.size()
+
+        self.metrics = metrics
+        self.sectors = {}
+        for sector in counts.index:
+            self.sectors[sector] = {
+                'company_count': int(counts[sector]),
+                'metrics': {
+                    metric: {name: _to_float(frame.at[sector, metric]) for name, frame in statistics.items()}
+                    for metric in metrics
+                }
+            }
+
+        ranks = grouped.rank(pct=True, method='average') * 100
+        ranks.index = profiles_df['id'].values
+        ranks = ranks[~ranks.index.duplicated()]
+        self.company_ranks = ranks.to_dict(orient='index')
+
+    def sector(self, sector: str):
+        return self.sectors.get(sector)
+
+    def sector_statistic(self, sector: str, metric: str, statistic: str = 'mean'):
+        return self.sectors[sector]['metrics'][metric][statistic]
+
+    def company_percentiles(self, company_id: str):
+        ranks = self.company_ranks.get(company_id, {})
+        return {metric: _to_float(value) for metric, value in ranks.items()}
+
+
+def _to_float(value):
+    return None if pandas.isna(value) else float(value)
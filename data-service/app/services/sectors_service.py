@@ -0,0 +1,8 @@
+from fastapi import HTTPException
+from app.services.data_store import data_store
+
+def get_sector_benchmarks_service(cnae: str):
+    sector = data_store.sector_benchmarks.sector(cnae)
+    if sector is None:
+        raise HTTPException(status_code=404, detail=f"Setor '{cnae}' não encontrado.")
+    return {"sector": cnae, **sector}
@@ -0,0 +1,299 @@
+import calendar
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy
+import pandas
+from fastapi import HTTPException
+
+# Runs vizinhos são fundidos quando o anterior tem até RUN_MERGE_FACTOR vezes o tamanho do novo
+RUN_MERGE_FACTOR = 2
+
+
+def check_window(date_from: Optional[date], date_to: Optional[date]):
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(status_code=400, detail="Parâmetro 'from' deve ser anterior ou igual a 'to'.")
+
+
+def month_window(date_from: Optional[date], date_to: Optional[date]):
+    """
+    Expande a janela para meses inteiros. O resumo mensal só tem granularidade de
+    mês, então as transações também são recortadas assim para que histórico,
+    totais e mixes cubram o mesmo período.
+    """
+    if date_from is not None:
+        date_from = date_from.replace(day=1)
+    if date_to is not None:
+        date_to = date_to.replace(day=calendar.monthrange(date_to.year, date_to.month)[1])
+    return date_from, date_to
+
+
+def _month_key(value: date):
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def add_cashflow_ratios(monthly_summary):
+    monthly_summary['fluxo_liq'] = monthly_summary['receita'] - monthly_summary['despesa']
+    monthly_summary['margem'] = monthly_summary['fluxo_liq'] / monthly_summary['receita'].replace(0, numpy.nan)
+    monthly_summary['margem'] = monthly_summary['margem'].fillna(0)
+    return monthly_summary
+
+
+def _append_run(runs, run, merge):
+    """
+    Acrescenta um run e funde os do fim enquanto o penúltimo não for muito maior
+    que o último (como numa LSM tree): ficam O(log N) runs e cada linha é
+    regravada O(log N) vezes, então o custo de uma inclusão é proporcional às linhas novas.
+    """
+    runs = list(runs) + [run]
+    while len(runs) > 1 and len(runs[-2]) <= RUN_MERGE_FACTOR * len(runs[-1]):
+        last = runs.pop()
+        runs[-1] = merge(runs[-1], last)
+    return runs
+
+
+class TransactionRuns:
+    """
+    Transações em runs ordenados por `dt_refe`. Uma janela [from, to] é um
+    intervalo contíguo de cada run, encontrado por busca binária. Imutável:
+    `appended` e `compacted` devolvem outra instância que compartilha os runs antigos.
+    """
+
+    def __init__(self, runs):
+        self.runs = tuple(run for run in runs if len(run)) or tuple(runs[:1])
+        self._dates = tuple(run['dt_refe'].values for run in self.runs)
+        self._ordered = all(previous[-1] <= following[0] for previous, following in zip(self._dates, self._dates[1:]))
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def appended(self, new_transactions_df: pandas.DataFrame):
+        run = new_transactions_df.sort_values('dt_refe', kind='stable').reset_index(drop=True)
+        return TransactionRuns(_append_run(self.runs, run, _merge_transaction_runs))
+
+    def between(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        runs = self.runs
+        if len(runs) == 1 and date_from is None and date_to is None:
+            return runs[0]
+        start = pandas.Timestamp(date_from).to_datetime64() if date_from is not None else None
+        end = pandas.Timestamp(date_to + timedelta(days=1)).to_datetime64() if date_to is not None else None
+        parts = []
+        for run, run_dates in zip(runs, self._dates):
+            lo = int(numpy.searchsorted(run_dates, start, side='left')) if start is not None else 0
+            hi = int(numpy.searchsorted(run_dates, end, side='left')) if end is not None else len(run_dates)
+            if hi > lo:
+                parts.append(run.iloc[lo:hi])
+        if not parts:
+            return runs[0].iloc[0:0]
+        if len(parts) == 1:
+            return parts[0]
+        window = pandas.concat(parts, ignore_index=True)
+        return window if self._ordered else window.sort_values('dt_refe', kind='stable').reset_index(drop=True)
+
+    def compacted(self):
+        """
+        Mesmo conteúdo em um único run.
+        """
+        return self if len(self.runs) == 1 else TransactionRuns([self.between()])
+
+
+def _merge_transaction_runs(first, second):
+    merged = pandas.concat([first, second], ignore_index=True)
+    if len(first) and len(second) and second['dt_refe'].values[0] < first['dt_refe'].values[-1]:
+        merged = merged.sort_values('dt_refe', kind='stable').reset_index(drop=True)
+    return merged
+
+
+class _MonthlyRun:
+    """
+    Um trecho do resumo mensal ordenado por (id, ano_mes): blocos contíguos por
+    empresa, somas acumuladas para totais de período em O(1) e as linhas
+    ordenadas por mês (`month_order`) para recortar todas as empresas em uma janela.
+    """
+
+    def __init__(self, summary: pandas.DataFrame):
+        self.summary = summary
+        self.months = summary['ano_mes'].values.astype(str)
+        self.month_order = numpy.argsort(self.months, kind='stable')
+        self.sorted_months = self.months[self.month_order]
+        self.company_blocks = _company_blocks(summary['id'].values)
+        self.cumulative = {
+            column: numpy.concatenate(([0.0], numpy.cumsum(summary[column].to_numpy(dtype=float))))
+            for column in ('receita', 'despesa', 'fluxo_liq')
+        }
+
+    def __len__(self):
+        return len(self.summary)
+
+    def bounds(self, company_id: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        """
+        Intervalo de linhas de uma empresa. Um mês entra na janela quando se sobrepõe a [from, to].
+        """
+        block = self.company_blocks.get(company_id)
+        if block is None:
+            return 0, 0
+        start, stop = block
+        months = self.months[start:stop]
+        lo = start
+        hi = stop
+        if date_from is not None:
+            lo = start + int(numpy.searchsorted(months, _month_key(date_from), side='left'))
+        if date_to is not None:
+            hi = start + int(numpy.searchsorted(months, _month_key(date_to), side='right'))
+        return lo, max(lo, hi)
+
+    def month_positions(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        """
+        Linhas dos meses que se sobrepõem a [from, to], na ordem (id, ano_mes).
+        """
+        lo = int(numpy.searchsorted(self.sorted_months, _month_key(date_from), side='left')) if date_from is not None else 0
+        hi = int(numpy.searchsorted(self.sorted_months, _month_key(date_to), side='right')) if date_to is not None else len(self.sorted_months)
+        return numpy.sort(self.month_order[lo:max(lo, hi)])
+
+
+class MonthlyRuns:
+    """
+    Resumo mensal (id, ano_mes) em runs, com a mesma política de fusão das
+    transações. Uma célula pode aparecer em mais de um run (meses que receberam
+    transações novas); as leituras somam as partes.
+    """
+
+    def __init__(self, runs):
+        self._runs = tuple(runs)
+
+    def appended(self, monthly_delta: pandas.DataFrame):
+        runs = self._runs
+        summaries = _append_run([run.summary for run in runs], monthly_delta.reset_index(drop=True), _combine_monthly)
+        # Runs que não foram fundidos são reaproveitados com seus índices já prontos
+        kept = 0
+        while kept < min(len(runs), len(summaries)) and summaries[kept] is runs[kept].summary:
+            kept += 1
+        return MonthlyRuns(runs[:kept] + tuple(_MonthlyRun(summary) for summary in summaries[kept:]))
+
+    def companies_months(self, company_ids, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        runs = self._runs
+        parts = []
+        for run in runs:
+            bounds = [run.bounds(company_id, date_from, date_to) for company_id in company_ids]
+            positions = numpy.concatenate([numpy.arange(lo, hi) for lo, hi in bounds]) if bounds else numpy.array([], dtype=int)
+            if len(positions):
+                parts.append(run.summary.iloc[positions])
+        if not parts:
+            return runs[0].summary.iloc[0:0]
+        if len(parts) == 1:
+            return parts[0]
+        return _combine_monthly(*parts)
+
+    def months_between(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        """
+        Resumo de todas as empresas restrito aos meses da janela, ordenado por (id, ano_mes).
+        """
+        runs = self._runs
+        parts = []
+        for run in runs:
+            if date_from is None and date_to is None:
+                parts.append(run.summary)
+                continue
+            positions = run.month_positions(date_from, date_to)
+            if len(positions):
+                parts.append(run.summary.iloc[positions])
+        if not parts:
+            return runs[0].summary.iloc[0:0]
+        if len(parts) == 1:
+            return parts[0]
+        return _combine_monthly(*parts)
+
+    def company_totals(self, company_id: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        found = [(run, run.bounds(company_id, date_from, date_to)) for run in self._runs if company_id in run.company_blocks]
+        if len(found) > 1:
+            months = self.companies_months([company_id], date_from, date_to)
+            totals = {column: float(months[column].sum()) for column in ('receita', 'despesa', 'fluxo_liq')}
+            totals['months'] = len(months)
+            return totals
+        run, (lo, hi) = found[0] if found else (self._runs[0], (0, 0))
+        totals = {column: float(cumulative[hi] - cumulative[lo]) for column, cumulative in run.cumulative.items()}
+        totals['months'] = hi - lo
+        return totals
+
+    def frame(self):
+        runs = self._runs
+        return runs[0].summary if len(runs) == 1 else _combine_monthly(*[run.summary for run in runs])
+
+    def compacted(self):
+        return self if len(self._runs) == 1 else MonthlyRuns([_MonthlyRun(self.frame())])
+
+
+def _combine_monthly(*summaries):
+    combined = pandas.concat([summary[['id', 'ano_mes', 'receita', 'despesa']] for summary in summaries], ignore_index=True)
+    combined = combined.groupby(['id', 'ano_mes'], as_index=False, sort=True)[['receita', 'despesa']].sum()
+    return add_cashflow_ratios(combined)
+
+
+class TimeIndex:
+    """
+    Índice temporal sobre as transações e o resumo mensal. Imutável: uma inclusão
+    de transações devolve um novo TimeIndex (`appended`) com custo proporcional às
+    linhas novas, e `compacted` devolve o mesmo conteúdo em um run só (feito pela
+    reconstrução em segundo plano do DataStore).
+
+    Com mais de um run, `transactions_df` e `monthly_cashflow_summary` montam o
+    frame completo a cada acesso, sem guardá-lo; quem percorre todas as
+    transações deve usar `transaction_runs`.
+    """
+
+    def __init__(self, transactions_df: pandas.DataFrame, monthly_cashflow_summary: pandas.DataFrame):
+        self.transactions = TransactionRuns([transactions_df])
+        self.monthly = MonthlyRuns([_MonthlyRun(monthly_cashflow_summary)])
+
+    def appended(self, new_transactions_df: pandas.DataFrame, monthly_delta: pandas.DataFrame):
+        return self._with_runs(self.transactions.appended(new_transactions_df), self.monthly.appended(monthly_delta))
+
+    def compacted(self):
+        return self._with_runs(self.transactions.compacted(), self.monthly.compacted())
+
+    def _with_runs(self, transactions: TransactionRuns, monthly: MonthlyRuns):
+        instance = TimeIndex.__new__(TimeIndex)
+        instance.transactions = transactions
+        instance.monthly = monthly
+        return instance
+
+    @property
+    def transactions_df(self):
+        return self.transactions.between()
+
+    @property
+    def monthly_cashflow_summary(self):
+        return self.monthly.frame()
+
+    def transaction_runs(self):
+        """
+        Runs de transações (cada um ordenado por data); juntos formam `transactions_df`.
+        """
+        return self.transactions.runs
+
+    def transaction_count(self):
+        return len(self.transactions)
+
+    def transactions_between(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        return self.transactions.between(date_from, date_to)
+
+    def company_months(self, company_id: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        return self.monthly.companies_months([company_id], date_from, date_to)
+
+    def companies_months(self, company_ids, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        return self.monthly.companies_months(company_ids, date_from, date_to)
+
+    def months_between(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        return self.monthly.months_between(date_from, date_to)
+
+    def company_totals(self, company_id: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        return self.monthly.company_totals(company_id, date_from, date_to)
+
+
+def _company_blocks(ids):
+    if len(ids) == 0:
+        return {}
+    changes = numpy.flatnonzero(ids[1:] != ids[:-1]) + 1
+    starts = numpy.concatenate(([0], changes))
+    stops = numpy.concatenate((changes, [len(ids)]))
+    return {ids[start]: (int(start), int(stop)) for start, stop in zip(starts, stops)}
@@ -0,0 +1,66 @@
+import io
+
+import pandas
+from fastapi import HTTPException
+
+from app.services.ai_jobs import schedule_precompute
+from app.services.data_store import data_store
+from app.utils.excel_loader import TRANSACTIONS_COLUMNS, TRANSACTIONS_DTYPES, _convert_chunk
+
+APPEND_FILE_FORMATS = {
+    "text/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet"
+}
+
+
+def append_transactions_service(transactions_df: pandas.DataFrame):
+    """
+    Valida e acrescenta transações ao snapshot em memória, atualizando o resumo
+    mensal, os perfis e os momentos só das empresas envolvidas. Benchmarks,
+    busca, similaridade e anomalias são reconstruídos em segundo plano.
+    """
+    if data_store.analytics_db is not None:
+        raise HTTPException(status_code=501, detail="Inclusão incremental não é suportada com ANALYTICS_BACKEND=duckdb; acrescente ao arquivo de origem.")
+    missing_columns = [column for column in TRANSACTIONS_COLUMNS if column not in transactions_df.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"Colunas ausentes: {', '.join(missing_columns)}.")
+    if transactions_df.empty:
+        return {"appended": 0, "affected_companies": 0, "total_transactions": data_store.time_index.transaction_count()}
+
+    columns = {}
+    for column in TRANSACTIONS_COLUMNS:
+        try:
+            columns[column] = _convert_chunk(transactions_df[column].to_numpy(dtype=object), TRANSACTIONS_DTYPES[column])
+        except (ValueError, TypeError) as error:
+            raise HTTPException(status_code=400, detail=f"Valor inválido na coluna '{column}': {error}")
+    new_transactions_df = pandas.DataFrame(columns, columns=TRANSACTIONS_COLUMNS)
+    incomplete = new_transactions_df[['id_pgto', 'id_rcbe', 'dt_refe']].isna().any(axis=1)
+    if incomplete.any():
+        raise HTTPException(status_code=400, detail=f"{int(incomplete.sum())} transações sem pagador, recebedor ou data.")
+
+    affected_ids = data_store.append_transactions(new_transactions_df)
+    # A versão do snapshot mudou: os diagnósticos guardados não valem mais
+    schedule_precompute()
+    return {
+        "appended": int(len(new_transactions_df)),
+        "affected_companies": int(len(affected_ids)),
+        "total_transactions": data_store.time_index.transaction_count()
+    }
+
+
+def read_transactions_file(content: bytes, content_type: str):
+    """
+    Lê o corpo de um upload CSV ou Parquet com as colunas da base de transações.
+    """
+    file_format = APPEND_FILE_FORMATS.get((content_type or "").split(";")[0].strip().lower())
+    if file_format is None:
+        raise HTTPException(status_code=415, detail=f"Content-Type não suportado. Opções: {', '.join(APPEND_FILE_FORMATS)}.")
+    if file_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Uploads Parquet requerem o pacote pyarrow instalado.")
+        return pandas.read_parquet(io.BytesIO(content), columns=TRANSACTIONS_COLUMNS)
+    text_columns = {column: str for column in TRANSACTIONS_COLUMNS if TRANSACTIONS_DTYPES[column] == 'object'}
+    return pandas.read_csv(io.BytesIO(content), dtype=text_columns)
@@ -1,69 +1,112 @@
+import os
+
+import numpy
 import pandas as pandas
-from app.core.config import DATA_FILE_PATH
+from app.core.config import DATA_FILE_PATH, EXCEL_LOADER_CHUNK_SIZE
 
 COMPANIES_SHEET_NAME = "Base 1 - ID"
 COMPANIES_COLUMNS = ['id', 'dt_abrt', 'dt_refe', 'vl_fatu', 'vl_sldo', 'ds_cnae']
+COMPANIES_DTYPES = {'id': 'object', 'dt_abrt': 'datetime', 'dt_refe': 'datetime', 'vl_fatu': 'float', 'vl_sldo': 'float', 'ds_cnae': 'object'}
 
 TRANSACTIONS_SHEET_NAME = "Base 2 - Transações"
 TRANSACTIONS_COLUMNS = ['id_pgto', 'id_rcbe', 'vl', 'dt_refe', 'ds_tran']
+TRANSACTIONS_DTYPES = {'id_pgto': 'object', 'id_rcbe': 'object', 'vl': 'float', 'dt_refe': 'datetime', 'ds_tran': 'object'}
 
-def load_companies_data():
-    try:
-        companies_data_frame = pandas.read_excel(DATA_FILE_PATH, sheet_name=COMPANIES_SHEET_NAME)
-
-        for column in COMPANIES_COLUMNS:
-            if column not in companies_data_frame.columns:
-                raise ValueError(f"Columns '{column}' not found in '{COMPANIES_SHEET_NAME}' sheet. Check your Excel file.")
-            
-        
-        companies_data_frame['dt_abrt'] = pandas.to_datetime(companies_data_frame['dt_abrt'])
-        companies_data_frame['dt_refe'] = pandas.to_datetime(companies_data_frame['dt_refe'])
-
-        return companies_data_frame
-    except FileNotFoundError:
-        raise ValueError(f"Excel file '{DATA_FILE_PATH}' not found.")
-    except ValueError as error:
-        if f"Worksheet name '{COMPANIES_SHEET_NAME}' not found" in str(error):
-            raise ValueError(f"Sheet not found. '{COMPANIES_SHEET_NAME} is not among Excel file sheets'")
-        else:
-            raise ValueError(f"Error while reading '{COMPANIES_SHEET_NAME}': {error}")
-        
-def load_industries_data():
-    industries_column_name = "ds_cnae"
-    
+# Tipo numpy do buffer de cada tipo de coluna
+BUFFER_DTYPES = {'datetime': 'datetime64[ns]', 'float': float, 'object': object}
+
+def _convert_chunk(values, kind):
+    if kind == 'datetime':
+        return pandas.to_datetime(pandas.Series(values, dtype=object)).to_numpy(dtype='datetime64[ns]')
+    if kind == 'float':
+        return pandas.to_numeric(pandas.Series(values, dtype=object)).to_numpy(dtype=float)
+    return numpy.array(values, dtype=object)
+
+def _read_sheet_columns(file_path, sheet_name, columns, dtypes, chunk_size):
+    """
+    Lê uma planilha em modo streaming (openpyxl read-only) no próprio processo,
+    validando o cabeçalho e convertendo as linhas a cada `chunk_size` direto para
+    arrays tipados por coluna. Os arrays são alocados com o número de linhas
+    declarado na planilha e só crescem se ela declarar menos do que tem.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
     try:
-        industries_data_frame = pandas.read_excel(DATA_FILE_PATH, sheet_name=COMPANIES_SHEET_NAME, usecols=[industries_column_name])
-        
-        if industries_column_name not in industries_data_frame.columns:
-            raise ValueError(f"Columns '{industries_column_name}' not found in '{COMPANIES_SHEET_NAME}' sheet. Check your Excel file.")
-        
-        sorted_unique_indutries_list = sorted(industries_data_frame[industries_column_name].unique())
-        sorted_unique_industries_df = pandas.DataFrame(sorted_unique_indutries_list, columns=[industries_column_name])
-        
-        return sorted_unique_industries_df
-    except FileNotFoundError:
+        if sheet_name not in workbook.sheetnames:
+            raise ValueError(f"Sheet not found. '{sheet_name} is not among Excel file sheets'")
+        worksheet = workbook[sheet_name]
+        rows = worksheet.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        positions = {}
+        for column in columns:
+            if column not in header:
+                raise ValueError(f"Columns '{column}' not found in '{sheet_name}' sheet. Check your Excel file.")
+            positions[column] = header.index(column)
+
+        capacity = max((worksheet.max_row or 1) - 1, 0)
+        buffers = {column: numpy.empty(capacity, dtype=BUFFER_DTYPES[dtypes[column]]) for column in columns}
+        filled = 0
+
+        def flush(chunk):
+            nonlocal buffers, capacity, filled
+            stop = filled + len(chunk)
+            if stop > capacity:
+                capacity = max(stop, 2 * capacity)
+                buffers = {column: numpy.resize(buffer, capacity) for column, buffer in buffers.items()}
+            for column in columns:
+                position = positions[column]
+                values = [row[position] if position < len(row) else None for row in chunk]
+                try:
+                    buffers[column][filled:stop] = _convert_chunk(values, dtypes[column])
+                except (ValueError, TypeError) as error:
+                    raise ValueError(f"Invalid value in column '{column}' of '{sheet_name}' sheet: {error}")
+            filled = stop
+
+        chunk = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        return {column: buffer[:filled] for column, buffer in buffers.items()}
+    finally:
+        workbook.close()
+
+def _load_sheet(sheet_name, columns, dtypes):
+    if not os.path.exists(DATA_FILE_PATH):
         raise ValueError(f"Excel file '{DATA_FILE_PATH}' not found.")
-    except ValueError as error:
-        if f"Worksheet name '{COMPANIES_SHEET_NAME}' not found" in str(error):
-            raise ValueError(f"Sheet not found. '{COMPANIES_SHEET_NAME} is not among Excel file sheets'")
-        else:
-            raise ValueError(f"Error while reading '{COMPANIES_SHEET_NAME}': {error}")
+    buffers = _read_sheet_columns(DATA_FILE_PATH, sheet_name, columns, dtypes, EXCEL_LOADER_CHUNK_SIZE)
+    return pandas.DataFrame(buffers, columns=columns, copy=False)
 
-def load_transactions_data():
-    try:
-        transactions_data_frame = pandas.read_excel(DATA_FILE_PATH, sheet_name=TRANSACTIONS_SHEET_NAME)
+def _industries_from_companies(companies_data_frame):
+    sorted_unique_indutries_list = sorted(companies_data_frame['ds_cnae'].unique())
+    return pandas.DataFrame(sorted_unique_indutries_list, columns=['ds_cnae'])
 
-        for column in TRANSACTIONS_COLUMNS:
-            if column not in transactions_data_frame.columns:
-                raise ValueError(f"Columns '{column}' not found in '{TRANSACTIONS_SHEET_NAME}' sheet. Check your Excel file.")
-            
-        transactions_data_frame['dt_refe'] = pandas.to_datetime(transactions_data_frame['dt_refe'])
+def load_companies_data():
+    return _load_sheet(COMPANIES_SHEET_NAME, COMPANIES_COLUMNS, COMPANIES_DTYPES)
 
-        return transactions_data_frame
-    except FileNotFoundError:
+def load_industries_data(companies_data_frame=None):
+    if companies_data_frame is None:
+        companies_data_frame = _load_sheet(COMPANIES_SHEET_NAME, ['ds_cnae'], COMPANIES_DTYPES)
+    return _industries_from_companies(companies_data_frame)
+
+def load_transactions_data():
+    return _load_sheet(TRANSACTIONS_SHEET_NAME, TRANSACTIONS_COLUMNS, TRANSACTIONS_DTYPES)
+
+def load_workbook_data():
+    """
+    Lê as planilhas de empresas e de transações uma única vez cada, no próprio
+    processo, e deriva a lista de setores do frame de empresas.
+    """
+    if not os.path.exists(DATA_FILE_PATH):
         raise ValueError(f"Excel file '{DATA_FILE_PATH}' not found.")
-    except ValueError as error:
-        if f"Worksheet name '{TRANSACTIONS_SHEET_NAME}' not found"  in str(error):
-            raise ValueError(f"Sheet not found. '{TRANSACTIONS_SHEET_NAME} is not among Excel file sheets'")
-        else:
-            raise ValueError(f"Error while reading '{TRANSACTIONS_SHEET_NAME}': {error}")
\ No newline at end of file
+
+    companies_data_frame = _load_sheet(COMPANIES_SHEET_NAME, COMPANIES_COLUMNS, COMPANIES_DTYPES)
+    transactions_data_frame = _load_sheet(TRANSACTIONS_SHEET_NAME, TRANSACTIONS_COLUMNS, TRANSACTIONS_DTYPES)
+    return companies_data_frame, _industries_from_companies(companies_data_frame), transactions_data_frame
@@ -0,0 +1,104 @@
+import os
+
+import numpy
+import pandas as pandas
+from app.core.config import DATA_SOURCE_FORMAT, COMPANIES_SOURCE_PATH, TRANSACTIONS_SOURCE_PATH, SOURCE_CHUNK_SIZE, CSV_SEPARATOR
+from app.utils.excel_loader import (
+    COMPANIES_COLUMNS, COMPANIES_DTYPES, TRANSACTIONS_COLUMNS, TRANSACTIONS_DTYPES, BUFFER_DTYPES,
+    load_workbook_data, load_industries_data
+)
+
+DATA_SOURCE_FORMATS = ("excel", "csv", "parquet")
+
+# Bloco lido para contar as linhas de um CSV
+LINE_COUNT_BLOCK_SIZE = 1 << 20
+
+def _convert_column(values, kind, column, file_path):
+    """
+    Converte uma coluna do bloco a partir do tipo em que foi lida: colunas já
+    numéricas ou de data só mudam de tipo; texto passa por to_numeric/to_datetime
+    vetorizados.
+    """
+    try:
+        if kind == 'datetime':
+            if not pandas.api.types.is_datetime64_any_dtype(values.dtype):
+                values = pandas.to_datetime(values)
+            return values.to_numpy(dtype='datetime64[ns]')
+        if kind == 'float':
+            if not pandas.api.types.is_numeric_dtype(values.dtype):
+                values = pandas.to_numeric(values)
+            return values.to_numpy(dtype=float)
+        return values.to_numpy(dtype=object)
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Invalid value in column '{column}' of '{file_path}': {error}")
+
+def _check_columns(available_columns, columns, file_path):
+    for column in columns:
+        if column not in available_columns:
+            raise ValueError(f"Columns '{column}' not found in '{file_path}'. Check your data file.")
+
+def _count_csv_rows(file_path):
+    """
+    Limite superior do número de linhas de dados (quebras de linha dentro de aspas
+    e linhas vazias só fazem a conta sobrar).
+    """
+    lines = 0
+    last = b"\n"
+    with open(file_path, "rb") as source:
+        while block := source.read(LINE_COUNT_BLOCK_SIZE):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(0, lines - 1)
+
+def _csv_chunks(file_path, columns, dtypes, chunk_size):
+    header = pandas.read_csv(file_path, sep=CSV_SEPARATOR, nrows=0).columns
+    _check_columns(header, columns, file_path)
+    text_columns = {column: str for column in columns if dtypes[column] == 'object'}
+    return _count_csv_rows(file_path), pandas.read_csv(file_path, sep=CSV_SEPARATOR, usecols=columns, dtype=text_columns, chunksize=chunk_size)
+
+def _parquet_chunks(file_path, columns, dtypes, chunk_size):
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Reading Parquet sources requires the pyarrow package.")
+    parquet_file = pyarrow.parquet.ParquetFile(file_path)
+    _check_columns(parquet_file.schema_arrow.names, columns, file_path)
+    batches = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns))
+    return parquet_file.metadata.num_rows, batches
+
+def load_file_columns(file_path, file_format, columns, dtypes, chunk_size=SOURCE_CHUNK_SIZE):
+    """
+    Lê um arquivo CSV ou Parquet em blocos de `chunk_size` linhas, convertendo cada
+    bloco direto para buffers tipados por coluna, alocados uma vez com o número de
+    linhas do arquivo (metadados do Parquet ou contagem de linhas do CSV). Cada
+    bloco pode ser descartado assim que copiado, sem concatenação no final.
+    """
+    if not os.path.exists(file_path):
+        raise ValueError(f"Data file '{file_path}' not found.")
+    chunks = _csv_chunks if file_format == 'csv' else _parquet_chunks
+    capacity, chunk_iterator = chunks(file_path, columns, dtypes, chunk_size)
+    buffers = {column: numpy.empty(capacity, dtype=BUFFER_DTYPES[dtypes[column]]) for column in columns}
+    filled = 0
+    for chunk in chunk_iterator:
+        stop = filled + len(chunk)
+        if stop > capacity:
+            capacity = max(stop, 2 * capacity)
+            buffers = {column: numpy.resize(buffer, capacity) for column, buffer in buffers.items()}
+        for column in columns:
+            buffers[column][filled:stop] = _convert_column(chunk[column], dtypes[column], column, file_path)
+        filled = stop
+    return pandas.DataFrame({column: buffer[:filled] for column, buffer in buffers.items()}, columns=columns, copy=False)
+
+def load_source_data(source_format=DATA_SOURCE_FORMAT):
+    """
+    Carrega empresas, setores e transações da fonte configurada em DATA_SOURCE_FORMAT.
+    """
+    if source_format == 'excel':
+        return load_workbook_data()
+    if source_format not in DATA_SOURCE_FORMATS:
+        raise ValueError(f"Invalid data source format '{source_format}'. Options: {', '.join(DATA_SOURCE_FORMATS)}.")
+    companies_data_frame = load_file_columns(COMPANIES_SOURCE_PATH, source_format, COMPANIES_COLUMNS, COMPANIES_DTYPES)
+    transactions_data_frame = load_file_columns(TRANSACTIONS_SOURCE_PATH, source_format, TRANSACTIONS_COLUMNS, TRANSACTIONS_DTYPES)
+    return companies_data_frame, load_industries_data(companies_data_frame), transactions_data_frame
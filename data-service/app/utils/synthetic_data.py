@@ -0,0 +1,52 @@
+import numpy
+import pandas
+
+SYNTHETIC_SECTORS = [
+    "Comércio varejista", "Comércio atacadista", "Construção civil", "Indústria de alimentos",
+    "Transporte rodoviário de carga", "Serviços de tecnologia da informação", "Saúde", "Agronegócio"
+]
+SYNTHETIC_TRANSACTION_TYPES = ["PIX", "TED", "BOLETO", "SISPAG", "CARTAO"]
+
+
+def generate_synthetic_data(n_companies=2000, n_transactions=200000, n_months=12, end_month="2023-12", seed=42):
+    """
+    Gera frames com o mesmo esquema das planilhas (empresas e transações) para
+    testes de carga locais. Pagadores e recebedores seguem uma distribuição de
+    cauda longa, como numa rede real de pagamentos.
+    """
+    random = numpy.random.default_rng(seed)
+    ids = numpy.array([f"CNPJ_{index:06d}" for index in range(n_companies)], dtype=object)
+    months = pandas.period_range(end=end_month, periods=n_months, freq="M")
+    month_starts = months.to_timestamp()
+
+    opening_days = random.integers(0, 25 * 365, n_companies)
+    opening_dates = pandas.Timestamp(end_month) - pandas.to_timedelta(opening_days, unit="D")
+    sectors = random.choice(SYNTHETIC_SECTORS, n_companies)
+    scale = random.lognormal(mean=12, sigma=1.2, size=n_companies)
+
+    companies_df = pandas.DataFrame({
+        "id": numpy.repeat(ids, n_months),
+        "dt_abrt": numpy.repeat(opening_dates.values, n_months),
+        "dt_refe": numpy.tile(month_starts.values, n_companies),
+        "vl_fatu": numpy.repeat(scale, n_months) * random.uniform(0.7, 1.3, n_companies * n_months),
+        "vl_sldo": numpy.repeat(scale, n_months) * random.normal(0.3, 0.4, n_companies * n_months),
+        "ds_cnae": numpy.repeat(sectors, n_months)
+    })
+
+    popularity = 1.0 / numpy.arange(1, n_companies + 1) ** 0.8
+    popularity /= popularity.sum()
+    payers = random.choice(n_companies, n_transactions, p=popularity)
+    receivers = random.choice(n_companies, n_transactions, p=random.permutation(popularity))
+    same = payers == receivers
+    receivers[same] = (receivers[same] + 1) % n_companies
+
+    start = month_starts[0]
+    total_days = (month_starts[-1] + pandas.offsets.MonthEnd(0) - start).days + 1
+    transactions_df = pandas.DataFrame({
+        "id_pgto": ids[payers],
+        "id_rcbe": ids[receivers],
+        "vl": numpy.round(random.lognormal(mean=8, sigma=1.5, size=n_transactions), 2),
+        "dt_refe": start + pandas.to_timedelta(random.integers(0, total_days, n_transactions), unit="D"),
+        "ds_tran": random.choice(SYNTHETIC_TRANSACTION_TYPES, n_transactions)
+    })
+    return companies_df, transactions_df
@@ -0,0 +1,31 @@
+# Backtest dos modelos de previsão de fluxo de caixa sobre o resumo mensal completo
+# Uso: python scripts/backtest_forecast.py --horizon 3 --min-train 6
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importação de módulos
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from app.services.data_store import data_store
+from app.services.forecast_models import FORECAST_MODELS, run_backtest
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest com origem móvel dos modelos de previsão")
+    parser.add_argument("--horizon", type=int, default=3, help="Número de meses previstos a cada origem")
+    parser.add_argument("--min-train", type=int, default=6, help="Meses mínimos de histórico na primeira origem")
+    parser.add_argument("--models", nargs="+", default=list(FORECAST_MODELS), choices=list(FORECAST_MODELS))
+    args = parser.parse_args()
+
+    print("Carregando dados...")
+    data_store.initialize_data()
+    summary = data_store.monthly_cashflow_summary
+    print(f"{summary['id'].nunique()} empresas, {len(summary)} meses-empresa\n")
+
+    report = run_backtest(summary, horizon=args.horizon, min_train=args.min_train, models=args.models)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
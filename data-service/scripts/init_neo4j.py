@@ -19,9 +19,19 @@ NOME_PLANILHA_TRANSACOES = "Base 2 - Transações"
 def criar_constraints(tx):
     """
     Cria uma regra no banco de dados para garantir que não haverá
-    empresas com o mesmo ID.
+    empresas com o mesmo ID, e os índices usados pelas consultas do GraphService.
     """
+    # Também serve como índice de e.id: buscas por empresa e ORDER BY e.id em get_nodes
     tx.run("CREATE CONSTRAINT unique_empresa_id IF NOT EXISTS FOR (e:Empresa) REQUIRE e.id IS UNIQUE")
+    # Índices de token para varrer só nós :Empresa e relações :PAGOU_PARA (padrão no Neo4j 5, recriados se removidos)
+    tx.run("CREATE LOOKUP INDEX node_label_lookup IF NOT EXISTS FOR (n) ON EACH labels(n)")
+    tx.run("CREATE LOOKUP INDEX rel_type_lookup IF NOT EXISTS FOR ()-[r]-() ON EACH type(r)")
+    # Maiores relações por valor (get_edges e get_clusters) lidas do índice já ordenado, parando no LIMIT
+    tx.run("CREATE INDEX pagou_para_valor IF NOT EXISTS FOR ()-[r:PAGOU_PARA]-() ON (r.valor)")
+    # Nenhuma consulta filtra por data ou setor no grafo: remove índices criados por versões anteriores
+    # deste script, que só custavam escrita na carga
+    tx.run("DROP INDEX pagou_para_data IF EXISTS")
+    tx.run("DROP INDEX empresa_cnae IF EXISTS")
 
 def carregar_empresas(tx, empresas_records):
     """
@@ -81,13 +91,16 @@ def init_neo4j():
                 session.run("MATCH (n) DETACH DELETE n")
 
                 session.execute_write(criar_constraints)
-                print("Constraint de unicidade criada.")
+                print("Constraint de unicidade e índices criados.")
                 
                 session.execute_write(carregar_empresas, empresas_records)
                 print(f"{len(empresas_records)} nós de Empresa carregados.")
                 
                 session.execute_write(carregar_transacoes, trans_records)
                 print(f"{len(trans_records)} relações de Pagamento carregadas.")
+
+                session.run("CALL db.awaitIndexes(300)").consume()
+                print("Índices online.")
                 
         print("\nIngestão de dados concluída com sucesso!")
         return True
@@ -0,0 +1,36 @@
+# Worker da fila de jobs em processo separado (carrega os dados e consome a mesma fila SQLite da API)
+# Uso: python scripts/job_worker.py --workers 2
+import argparse
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importação de módulos
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from app.core.job_queue import JobWorker, job_queue
+from app.services.data_store import data_store
+import app.services.ai_jobs  # noqa: F401  (registra os handlers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker da fila local de jobs")
+    parser.add_argument("--workers", type=int, default=1, help="Número de workers (threads) neste processo")
+    args = parser.parse_args()
+
+    print("Carregando dados...")
+    data_store.initialize_data()
+    print(f"Dados carregados (snapshot {data_store.snapshot_version}). Iniciando {args.workers} worker(s)...")
+
+    workers = [JobWorker(job_queue) for _ in range(args.workers)]
+    threads = [worker.start() for worker in workers]
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Teste de carga reproduzível da API com substitutos locais (sem Neo4j e sem OpenAI)
+# Uso: python scripts/load_test.py --concurrency 32 --duration 30 --llm-latency 0.5
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importação de módulos
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+DEFAULT_MIX = "dashboard=3,details=5,forecast=3,graph_edges=1,graph_neighborhood=2,graph_dependencies=1,ai_diagnosis=1,ai_forecast=1"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Teste de carga com LLM falso e grafo em memória")
+    parser.add_argument("--concurrency", type=int, default=16, help="Número de clientes simultâneos")
+    parser.add_argument("--duration", type=float, default=30, help="Duração do teste em segundos")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos por rota, ex.: dashboard=3,details=5")
+    parser.add_argument("--companies", type=int, default=2000, help="Empresas nos dados sintéticos")
+    parser.add_argument("--transactions", type=int, default=200000, help="Transações nos dados sintéticos")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Latência até o primeiro token do LLM falso (s)")
+    parser.add_argument("--llm-token-latency", type=float, default=0.0, help="Latência por token do LLM falso (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+def configure_environment(args):
+    # Precisa acontecer antes de importar a aplicação, que lê a configuração na importação
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["GRAPH_BACKEND"] = "memory"
+    os.environ["FAKE_LLM_FIRST_TOKEN_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_TOKEN_LATENCY"] = str(args.llm_token_latency)
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.concurrency))
+    os.environ.setdefault("LLM_RATE_PER_SECOND", "1000")
+    os.environ.setdefault("LLM_BURST", str(args.concurrency))
+    # Sem pré-cálculo de diagnósticos nem workers de jobs durante a medição
+    os.environ["AI_PRECOMPUTE_ON_RELOAD"] = "false"
+    os.environ["JOB_WORKERS"] = "0"
+
+def build_routes(company_ids, sectors):
+    return {
+        "dashboard": lambda: f"/dashboard?cnae={random.choice(sectors + ['Todos os Setores'])}",
+        "details": lambda: f"/companies/{random.choice(company_ids)}/details",
+        "forecast": lambda: f"/forecast/{random.choice(company_ids)}?n_months=6",
+        "graph_edges": lambda: "/graph/edges?limit=500",
+        "graph_neighborhood": lambda: f"/graph/neighborhood/{random.choice(company_ids)}",
+        "graph_dependencies": lambda: "/graph/dependencies",
+        "ai_diagnosis": lambda: f"/ai/diagnosis/{random.choice(company_ids)}",
+        "ai_forecast": lambda: f"/ai/forecast/{random.choice(company_ids)}"
+    }
+
+def start_server(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+async def run_load(base_url, routes, weights, concurrency, duration):
+    import httpx
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    names = list(weights)
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client):
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights=[weights[n] for n in names])[0]
+            started = time.perf_counter()
+            try:
+                response = await client.get(routes[name]())
+                if response.status_code >= 400:
+                    errors[name] += 1
+            except httpx.HTTPError:
+                errors[name] += 1
+            latencies[name].append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+def print_report(latencies, errors, elapsed):
+    import numpy
+    print(f"\n{'rota':<20} {'reqs':>7} {'req/s':>8} {'erros':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    total = 0
+    for name in sorted(latencies):
+        values = numpy.array(latencies[name]) * 1000
+        total += len(values)
+        p50, p95, p99 = numpy.percentile(values, [50, 95, 99])
+        error_rate = errors[name] / len(values) * 100
+        print(f"{name:<20} {len(values):>7} {len(values) / elapsed:>8.1f} {error_rate:>6.1f}% {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+    print(f"\nTotal: {total} requisições em {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+    configure_environment(args)
+
+    from app.main import app
+    from app.services.data_store import data_store
+    from app.utils.synthetic_data import generate_synthetic_data
+
+    print(f"Gerando dados sintéticos: {args.companies} empresas, {args.transactions} transações...")
+    companies_df, transactions_df = generate_synthetic_data(args.companies, args.transactions, seed=args.seed)
+    data_store.load_frames(companies_df, transactions_df)
+
+    weights = {}
+    for item in args.mix.split(","):
+        name, weight = item.split("=")
+        weights[name.strip()] = float(weight)
+    routes = build_routes(sorted(data_store.all_companies_profiles["id"].unique()), sorted(data_store.industries_df["ds_cnae"]))
+    unknown = set(weights) - set(routes)
+    if unknown:
+        raise SystemExit(f"Rotas desconhecidas no mix: {', '.join(sorted(unknown))}. Opções: {', '.join(routes)}")
+
+    server, thread = start_server(app, args.port)
+    print(f"Executando {args.duration:.0f}s com {args.concurrency} clientes simultâneos...")
+    try:
+        latencies, errors, elapsed = asyncio.run(run_load(f"http://127.0.0.1:{args.port}", routes, weights, args.concurrency, args.duration))
+    finally:
+        server.should_exit = True
+        thread.join()
+    print_report(latencies, errors, elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Roda PROFILE em todas as consultas do GraphService e reporta db hits, linhas e tempo.
+# Uso: python scripts/profile_graph_queries.py [--save baseline.json] [--baseline baseline.json --tolerance 0.2]
+# Com --baseline, termina com código 1 se alguma consulta piorar (db hits acima da tolerância
+# ou operadores de varredura completa/ordenação que não existiam no plano de referência).
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Adicionar o diretório raiz ao path para importação de módulos
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from neo4j import GraphDatabase
+from app.core.config import NEO4J_URI, NEO4J_USER, NEO4J_PASS
+from app.services.graph_service import GRAPH_QUERIES
+
+COSTLY_OPERATORS = ("AllNodesScan", "NodeByLabelScan", "DirectedAllRelationshipsScan", "UndirectedAllRelationshipsScan",
+                       "DirectedRelationshipTypeScan", "UndirectedRelationshipTypeScan", "Sort", "Top", "PartialTop")
+
+
+def walk_plan(plan):
+    """
+    Soma os db hits da árvore do plano e lista os operadores usados.
+    """
+    db_hits = plan.get("dbHits", 0)
+    operators = [plan.get("operatorType", "").split("@")[0]]
+    for child in plan.get("children", []):
+        child_hits, child_operators = walk_plan(child)
+        db_hits += child_hits
+        operators += child_operators
+    return db_hits, operators
+
+
+def sample_company_id(session):
+    record = session.run("MATCH (e:Empresa)<-[:PAGOU_PARA]-() RETURN e.id AS id LIMIT 1").single()
+    return record["id"] if record else None
+
+
+def profile_queries(session, repeat):
+    company_id = sample_company_id(session)
+    report = {}
+    for name, (query, parameters) in GRAPH_QUERIES.items():
+        parameters = {key: (company_id if key == "company_id" and value is None else value) for key, value in parameters.items()}
+        best_ms = None
+        for _ in range(repeat):
+            result = session.run("PROFILE " + query, **parameters)
+            rows = sum(1 for _ in result)
+            summary = result.consume()
+            elapsed = (summary.result_available_after or 0) + (summary.result_consumed_after or 0)
+            best_ms = elapsed if best_ms is None else min(best_ms, elapsed)
+        db_hits, operators = walk_plan(summary.profile)
+        report[name] = {"db_hits": db_hits, "rows": rows, "time_ms": best_ms, "operators": operators}
+    return report
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for name, current in report.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if current["db_hits"] > reference["db_hits"] * (1 + tolerance):
+            regressions.append(f"{name}: db hits {reference['db_hits']} -> {current['db_hits']}")
+        new_scans = sorted(set(current["operators"]) & set(COSTLY_OPERATORS) - set(reference["operators"]))
+        if new_scans:
+            regressions.append(f"{name}: novos operadores custosos no plano: {', '.join(new_scans)}")
+    return regressions
+
+
+def print_report(report, baseline):
+    print(f"\n{'consulta':<28} {'db hits':>12} {'ref.':>12} {'linhas':>8} {'tempo ms':>9}  operadores")
+    for name, entry in report.items():
+        reference = baseline.get(name, {}).get("db_hits", "") if baseline else ""
+        print(f"{name:<28} {entry['db_hits']:>12} {reference:>12} {entry['rows']:>8} {entry['time_ms']:>9}  {' > '.join(entry['operators'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PROFILE das consultas do GraphService")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por consulta (reporta o menor tempo)")
+    parser.add_argument("--save", help="Grava o relatório como referência neste arquivo JSON")
+    parser.add_argument("--baseline", help="Compara com um relatório de referência salvo com --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Aumento relativo de db hits aceito antes de acusar regressão")
+    args = parser.parse_args()
+
+    with GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS)) as driver:
+        with driver.session(database="neo4j") as session:
+            report = profile_queries(session, max(1, args.repeat))
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_report(report, baseline)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2))
+        print(f"\nReferência gravada em {args.save}")
+
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressões de plano:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNenhuma regressão em relação à referência.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Precisa acontecer antes de importar a aplicação, que lê a configuração na importação
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["GRAPH_BACKEND"] = "memory"
+os.environ["TRACING_EXPORTER"] = "none"
+os.environ["AI_PRECOMPUTE_ON_RELOAD"] = "false"
+os.environ["JOB_WORKERS"] = "0"
+os.environ["JOBS_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="data-service-tests-"), "jobs.sqlite3")
+
+# Adicionar o diretório raiz ao path para importação de módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.data_store import data_store
+    from app.utils.synthetic_data import generate_synthetic_data
+
+    # Com os dados já carregados, a inicialização da API não lê a planilha
+    companies_df, transactions_df = generate_synthetic_data(n_companies=50, n_transactions=3000, seed=7)
+    data_store.load_frames(companies_df, transactions_df)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def company_id():
+    from app.services.data_store import data_store
+    return data_store.all_companies_profiles["id"].iloc[0]
@@ -0,0 +1,43 @@
+from fastapi import HTTPException
+
+from app.services import ai_jobs
+
+
+def overloaded(retry_after="2"):
+    return HTTPException(status_code=429, detail="Muitas análises de IA na fila.", headers={"Retry-After": retry_after})
+
+
+def test_job_retries_rate_limited_companies(monkeypatch):
+    calls = {}
+    sleeps = []
+
+    def diagnosis(company_id, store_now=False):
+        assert store_now
+        calls[company_id] = calls.get(company_id, 0) + 1
+        if company_id == "A" and calls[company_id] <= 2:
+            raise overloaded()
+        if company_id == "B":
+            raise HTTPException(status_code=404, detail="Company not found")
+        return {"diagnosis": company_id}
+
+    monkeypatch.setattr(ai_jobs, "get_company_diagnosis_service", diagnosis)
+    monkeypatch.setattr(ai_jobs.time, "sleep", sleeps.append)
+    result = ai_jobs._diagnose_companies(["A", "B"], lambda done, total=None: None)
+
+    assert calls == {"A": 3, "B": 1}
+    assert result["succeeded"] == 1
+    assert result["failed"] == {"B": "Company not found"}
+    # Nunca antes do Retry-After pedido pelo gateway
+    assert len(sleeps) == 2 and all(delay >= 2 for delay in sleeps)
+
+
+def test_job_gives_up_after_max_retries(monkeypatch):
+    def diagnosis(company_id, store_now=False):
+        raise overloaded("1")
+
+    monkeypatch.setattr(ai_jobs, "get_company_diagnosis_service", diagnosis)
+    monkeypatch.setattr(ai_jobs, "AI_JOB_MAX_RETRIES", 2)
+    monkeypatch.setattr(ai_jobs.time, "sleep", lambda delay: None)
+    result = ai_jobs._diagnose_companies(["A"], lambda done, total=None: None)
+
+    assert result["failed"] == {"A": "Muitas análises de IA na fila."}
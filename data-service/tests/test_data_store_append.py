@@ -0,0 +1,154 @@
+import math
+import time
+from datetime import date
+
+import numpy
+import pandas
+import pytest
+
+from app.services.companies_service import build_company_profiles, create_monthly_cashflow_summary
+from app.services.data_store import DataStore
+from app.services.time_index import TimeIndex
+from app.utils.synthetic_data import generate_synthetic_data
+
+BASE_ROWS = 8000
+CHUNK_ROWS = 250
+SUMMARY_COLUMNS = ['id', 'ano_mes', 'receita', 'despesa', 'fluxo_liq']
+PROFILE_COLUMNS = ['receita_media_6m', 'despesa_media_6m', 'crescimento_receita_3m', 'margem_media_6m', 'volatilidade_receita']
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    return generate_synthetic_data(n_companies=120, n_transactions=12000, seed=11)
+
+
+def chunks(transactions_df):
+    extra = transactions_df.iloc[BASE_ROWS:]
+    for start in range(0, len(extra), CHUNK_ROWS):
+        yield extra.iloc[start:start + CHUNK_ROWS].reset_index(drop=True)
+
+
+def sorted_summary(summary):
+    return summary[SUMMARY_COLUMNS].sort_values(['id', 'ano_mes']).reset_index(drop=True)
+
+
+def wait_for_refresh(store, timeout=30):
+    deadline = time.monotonic() + timeout
+    while store._refreshing:
+        assert time.monotonic() < deadline, "reconstrução dos índices não terminou"
+        time.sleep(0.05)
+
+
+def appended_index(transactions_df):
+    """
+    TimeIndex da base com as demais transações incluídas em blocos, sem compactar.
+    """
+    base = transactions_df.iloc[:BASE_ROWS].sort_values('dt_refe', kind='stable').reset_index(drop=True)
+    index = TimeIndex(base, create_monthly_cashflow_summary(base).reset_index(drop=True))
+    for chunk in chunks(transactions_df):
+        index = index.appended(chunk, create_monthly_cashflow_summary(chunk))
+    return index
+
+
+def full_index(transactions_df):
+    transactions_df = transactions_df.sort_values('dt_refe', kind='stable').reset_index(drop=True)
+    return TimeIndex(transactions_df, create_monthly_cashflow_summary(transactions_df).reset_index(drop=True))
+
+
+def test_runs_merge_to_logarithmic_count(synthetic):
+    _, transactions_df = synthetic
+    index = appended_index(transactions_df)
+
+    appends = math.ceil((len(transactions_df) - BASE_ROWS) / CHUNK_ROWS)
+    assert 1 < len(index.transaction_runs()) <= math.log2(appends) + 2
+    assert index.transaction_count() == len(transactions_df)
+
+
+def test_appended_index_matches_full_reload(synthetic):
+    _, transactions_df = synthetic
+    index = appended_index(transactions_df)
+    expected = full_index(transactions_df)
+
+    pandas.testing.assert_frame_equal(sorted_summary(index.monthly_cashflow_summary),
+                                      sorted_summary(expected.monthly_cashflow_summary), check_dtype=False)
+    window = (date(2023, 4, 10), date(2023, 7, 20))
+    pandas.testing.assert_frame_equal(sorted_summary(index.months_between(*window)),
+                                      sorted_summary(expected.months_between(*window)), check_dtype=False)
+
+    transactions = index.transactions_between(*window)
+    expected_transactions = expected.transactions_between(*window)
+    assert transactions['dt_refe'].is_monotonic_increasing
+    assert len(transactions) == len(expected_transactions)
+    assert transactions['vl'].sum() == pytest.approx(expected_transactions['vl'].sum())
+
+    company_id = expected.monthly_cashflow_summary['id'].iloc[0]
+    totals = index.company_totals(company_id, *window)
+    expected_totals = expected.company_totals(company_id, *window)
+    assert totals['months'] == expected_totals['months']
+    for column in ('receita', 'despesa', 'fluxo_liq'):
+        assert totals[column] == pytest.approx(expected_totals[column])
+
+
+@pytest.mark.parametrize("window", [(date(2023, 4, 10), date(2023, 7, 20)), (None, date(2023, 2, 1)),
+                                    (date(2023, 11, 30), None), (date(2024, 3, 1), None)])
+def test_months_between_matches_month_filter(synthetic, window):
+    _, transactions_df = synthetic
+    summary = full_index(transactions_df).monthly_cashflow_summary
+    inside = numpy.ones(len(summary), dtype=bool)
+    if window[0] is not None:
+        inside &= summary['ano_mes'] >= window[0].strftime('%Y-%m')
+    if window[1] is not None:
+        inside &= summary['ano_mes'] <= window[1].strftime('%Y-%m')
+
+    for index in (full_index(transactions_df), appended_index(transactions_df)):
+        pandas.testing.assert_frame_equal(index.months_between(*window)[SUMMARY_COLUMNS].reset_index(drop=True),
+                                          summary.loc[inside, SUMMARY_COLUMNS].reset_index(drop=True), check_dtype=False)
+
+
+def test_full_frames_do_not_compact_in_place(synthetic):
+    _, transactions_df = synthetic
+    index = appended_index(transactions_df)
+    runs = index.transaction_runs()
+
+    assert len(index.transactions_df) == len(transactions_df)
+    index.monthly_cashflow_summary
+    assert index.transaction_runs() is runs
+
+    compacted = index.compacted()
+    assert len(compacted.transaction_runs()) == 1
+    assert index.transaction_runs() is runs
+    assert compacted.compacted().transaction_runs() is compacted.transaction_runs()
+
+
+def test_append_matches_full_reload(synthetic):
+    companies_df, transactions_df = synthetic
+    store = DataStore()
+    store.load_frames(companies_df, transactions_df.iloc[:BASE_ROWS])
+    segmentation = store.moment_segmentation
+    for chunk in chunks(transactions_df):
+        store.append_transactions(chunk)
+
+    reloaded = DataStore()
+    reloaded.load_frames(companies_df, transactions_df)
+
+    # Versão atualizada pelo hash incremental (subtrai as células antigas, soma as novas)
+    assert store.snapshot_version == reloaded.snapshot_version
+
+    # Perfis e momento das empresas afetadas pelo modelo ajustado na carga original
+    expected = build_company_profiles(reloaded.monthly_cashflow_summary, companies_df, segmentation)
+    profiles = store.all_companies_profiles.set_index('id').sort_index()
+    expected = expected.set_index('id').sort_index()
+    assert list(profiles.index) == list(expected.index)
+    numpy.testing.assert_allclose(profiles[PROFILE_COLUMNS], expected[PROFILE_COLUMNS])
+    assert (profiles['cluster'] == expected['cluster']).all()
+    assert (profiles['momento'] == expected['momento']).all()
+
+    wait_for_refresh(store)
+    snapshot = store.snapshot
+    assert not snapshot.indexes_stale
+    assert len(snapshot.time_index.transaction_runs()) == 1
+    assert snapshot.snapshot_version == reloaded.snapshot_version
+    pandas.testing.assert_frame_equal(sorted_summary(store.monthly_cashflow_summary),
+                                      sorted_summary(reloaded.monthly_cashflow_summary), check_dtype=False)
+    assert store.transactions_df['dt_refe'].is_monotonic_increasing
+    assert len(store.transactions_df) == len(transactions_df)
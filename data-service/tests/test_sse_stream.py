@@ -0,0 +1,76 @@
+import json
+from itertools import islice
+
+import pytest
+
+from app.core.ai_config import ai_config
+from app.core.fake_llm import DEFAULT_TEXT, FakeLLMClient
+
+
+def parse_events(body: str):
+    """
+    Separa o corpo SSE em eventos (nome, dados). Cada evento termina com uma linha em branco.
+    """
+    assert body.endswith("\n\n")
+    events = []
+    for block in body[:-2].split("\n\n"):
+        name = "message"
+        data = []
+        for line in block.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == "event":
+                name = value
+            elif field == "data":
+                data.append(value)
+            else:
+                pytest.fail(f"Linha SSE inesperada: {line!r}")
+        events.append((name, json.loads("\n".join(data))))
+    return events
+
+
+class FailingLLMClient(FakeLLMClient):
+    """
+    Cliente falso cujo stream falha depois dos primeiros trechos.
+    """
+
+    def _stream(self, tokens, usage=None):
+        yield from islice(super()._stream(tokens, usage), 3)
+        raise RuntimeError("conexão com o provedor perdida")
+
+
+@pytest.fixture
+def failing_llm():
+    previous = ai_config.client
+    ai_config.set_client(FailingLLMClient())
+    yield
+    ai_config.set_client(previous)
+
+
+def test_stream_sends_tokens_then_done(client, company_id):
+    response = client.get(f"/ai/diagnosis/{company_id}/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    events = parse_events(response.text)
+    assert events[-1] == ("done", {})
+    tokens = events[:-1]
+    assert tokens and all(name == "message" and set(data) == {"token"} for name, data in tokens)
+    assert "".join(data["token"] for _, data in tokens) == DEFAULT_TEXT
+
+
+def test_stream_error_becomes_error_event(client, company_id, failing_llm):
+    response = client.get(f"/graph-ai/company-analysis/{company_id}/stream")
+
+    # O status já foi enviado com o primeiro trecho; o erro chega como evento
+    assert response.status_code == 200
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["message"] * 3 + ["error"]
+    assert events[-1][1] == {"detail": "conexão com o provedor perdida"}
+
+
+def test_stream_unknown_company_fails_before_streaming(client):
+    response = client.get("/ai/diagnosis/EMPRESA_INEXISTENTE/stream")
+
+    assert response.status_code == 404
+    assert response.headers["content-type"].startswith("application/json")